@@ -34,6 +34,10 @@ from src.models.User_model import User
 from src.models.Printer_model import Printer
 from src.models.repartidores_model import Repartidor
 from src.models.Compra_model import Compra
+from src.models.TableroVersion_model import TableroVersion
+from src.models.CarritoSesion_model import CarritoSesion
+from src.models.PrintJob_model import PrintJob
+from src.models.SecuenciaComprobante_model import SecuenciaComprobante
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
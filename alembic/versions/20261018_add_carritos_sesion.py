@@ -0,0 +1,35 @@
+"""add carritos_sesion table
+
+Revision ID: 20261018_add_carritos_sesion
+Revises: 20261018_add_tablero_versiones
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_add_carritos_sesion'
+down_revision = '20261018_add_tablero_versiones'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Carritos en el servidor (CARRITO_STORE = 'sql')
+    op.create_table(
+        'carritos_sesion',
+        sa.Column('clave', sa.String(120), nullable=False),
+        sa.Column('datos', sa.Text(), nullable=False),
+        sa.Column('expira_en', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('clave')
+    )
+    op.create_index('ix_carritos_sesion_expira_en', 'carritos_sesion', ['expira_en'])
+
+
+def downgrade():
+    op.drop_index('ix_carritos_sesion_expira_en', table_name='carritos_sesion')
+    op.drop_table('carritos_sesion')
@@ -0,0 +1,31 @@
+"""add composite indexes on ventas for the order boards
+
+Revision ID: 20261018_add_indices_tableros
+Revises: 20261018_add_secuencias_comprobante
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_add_indices_tableros'
+down_revision = '20261018_add_secuencias_comprobante'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tablero de mostrador: en preparación / listos del día (utils/tableros.py)
+    op.create_index('ix_ventas_mostrador', 'ventas', ['tipoventa_id', 'estado_mostrador', 'fecha_hora'])
+    # Tablero de delivery: por estado, entregados del día
+    op.create_index('ix_ventas_delivery', 'ventas', ['tipoventa_id', 'estado_delivery', 'fecha_hora'])
+    # Pagados del día (cualquier estado_mostrador)
+    op.create_index('ix_ventas_tipo_fecha', 'ventas', ['tipoventa_id', 'fecha_hora'])
+
+
+def downgrade():
+    op.drop_index('ix_ventas_tipo_fecha', table_name='ventas')
+    op.drop_index('ix_ventas_delivery', table_name='ventas')
+    op.drop_index('ix_ventas_mostrador', table_name='ventas')
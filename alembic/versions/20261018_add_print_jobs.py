@@ -0,0 +1,45 @@
+"""add print_jobs table
+
+Revision ID: 20261018_add_print_jobs
+Revises: 20261018_add_carritos_sesion
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_add_print_jobs'
+down_revision = '20261018_add_carritos_sesion'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Cola de impresión en segundo plano (utils/print_queue.py)
+    op.create_table(
+        'print_jobs',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('tipo', sa.String(30), nullable=False),
+        sa.Column('pedido_id', sa.BigInteger(), nullable=True),
+        sa.Column('perfil', sa.String(30), nullable=True),
+        sa.Column('tipo_impresora', sa.String(30), nullable=True),
+        sa.Column('datos', sa.Text(), nullable=True),
+        sa.Column('estado', sa.String(15), nullable=False, server_default='pendiente'),
+        sa.Column('intentos', sa.SmallInteger(), nullable=False, server_default='0'),
+        sa.Column('max_intentos', sa.SmallInteger(), nullable=False, server_default='3'),
+        sa.Column('error', sa.String(255), nullable=True),
+        sa.Column('proximo_intento', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_print_jobs_pedido_id', 'print_jobs', ['pedido_id'])
+    op.create_index('ix_print_jobs_estado', 'print_jobs', ['estado'])
+
+
+def downgrade():
+    op.drop_index('ix_print_jobs_estado', table_name='print_jobs')
+    op.drop_index('ix_print_jobs_pedido_id', table_name='print_jobs')
+    op.drop_table('print_jobs')
@@ -0,0 +1,104 @@
+"""add secuencias_comprobante and unique ventas.numero_comprobante
+
+Revision ID: 20261018_add_secuencias_comprobante
+Revises: 20261018_add_print_jobs
+Create Date: 2026-10-18
+
+"""
+import logging
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_add_secuencias_comprobante'
+down_revision = '20261018_add_print_jobs'
+branch_labels = None
+depends_on = None
+
+# Números 'B-000123' ya emitidos; los 'V-AAAAMMDDHHMMSS' antiguos no entran
+NUMERO_SECUENCIA = re.compile(r'^([VBF])-(\d{1,12})$')
+# 'V-AAAAMMDDHHMMSS-<id>': duplicado renumerado por upgrade (downgrade lo revierte)
+NUMERO_RENUMERADO = re.compile(r'^(V-\d{14})-(\d+)$')
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+def upgrade():
+    conn = op.get_bind()
+
+    # 1. Números repetidos (V- por segundo): el más antiguo lo conserva,
+    #    el resto queda con el id de la venta como sufijo. Esos números pueden
+    #    estar impresos en comandas y boletas, así que cada cambio va al log
+    duplicados = conn.execute(sa.text("""
+        SELECT v.id, v.numero_comprobante
+        FROM ventas v
+        JOIN (
+            SELECT numero_comprobante, MIN(id) AS primer_id
+            FROM ventas
+            WHERE numero_comprobante IS NOT NULL
+            GROUP BY numero_comprobante
+            HAVING COUNT(*) > 1
+        ) d ON d.numero_comprobante = v.numero_comprobante
+        WHERE v.id <> d.primer_id
+    """)).fetchall()
+    for venta_id, numero in duplicados:
+        nuevo = f"{numero}-{venta_id}"
+        conn.execute(
+            sa.text("UPDATE ventas SET numero_comprobante = :numero WHERE id = :id"),
+            {'numero': nuevo, 'id': venta_id}
+        )
+        logger.warning(f"Venta {venta_id}: numero_comprobante {numero} -> {nuevo}")
+    if duplicados:
+        logger.warning(f"{len(duplicados)} ventas con numero_comprobante repetido renumeradas")
+
+    op.create_index('uq_ventas_numero_comprobante', 'ventas', ['numero_comprobante'], unique=True)
+
+    # 2. Secuencias por prefijo, a continuación del mayor número emitido
+    op.create_table(
+        'secuencias_comprobante',
+        sa.Column('prefijo', sa.String(5), nullable=False),
+        sa.Column('siguiente', sa.BigInteger(), nullable=False, server_default='1'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('prefijo')
+    )
+
+    maximos = {'V': 0, 'B': 0, 'F': 0}
+    numeros = conn.execute(sa.text("""
+        SELECT numero_comprobante FROM ventas
+        WHERE numero_comprobante LIKE 'V-%'
+           OR numero_comprobante LIKE 'B-%'
+           OR numero_comprobante LIKE 'F-%'
+    """)).scalars()
+    for numero in numeros:
+        coincide = NUMERO_SECUENCIA.match(numero)
+        if coincide:
+            prefijo, valor = coincide.group(1), int(coincide.group(2))
+            maximos[prefijo] = max(maximos[prefijo], valor)
+
+    for prefijo, maximo in maximos.items():
+        conn.execute(
+            sa.text("INSERT INTO secuencias_comprobante (prefijo, siguiente, updated_at) VALUES (:prefijo, :siguiente, NOW())"),
+            {'prefijo': prefijo, 'siguiente': maximo + 1}
+        )
+
+
+def downgrade():
+    conn = op.get_bind()
+
+    op.drop_index('uq_ventas_numero_comprobante', table_name='ventas')
+    op.drop_table('secuencias_comprobante')
+
+    # Los duplicados renumerados vuelven a su número original
+    renumerados = conn.execute(sa.text(
+        "SELECT id, numero_comprobante FROM ventas WHERE numero_comprobante LIKE 'V-%-%'"
+    )).fetchall()
+    for venta_id, numero in renumerados:
+        coincide = NUMERO_RENUMERADO.match(numero)
+        if coincide and int(coincide.group(2)) == venta_id:
+            conn.execute(
+                sa.text("UPDATE ventas SET numero_comprobante = :numero WHERE id = :id"),
+                {'numero': coincide.group(1), 'id': venta_id}
+            )
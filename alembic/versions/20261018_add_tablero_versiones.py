@@ -0,0 +1,43 @@
+"""add tablero_versiones table
+
+Revision ID: 20261018_add_tablero_versiones
+Revises: 20251220_add_atributos_notas
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_add_tablero_versiones'
+down_revision = '20251220_add_atributos_notas'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Contador de cambios por tablero (ETag de /pedidos_estado)
+    op.create_table(
+        'tablero_versiones',
+        sa.Column('canal', sa.String(20), nullable=False),
+        sa.Column('estado', sa.SmallInteger(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('canal', 'estado')
+    )
+
+    op.execute("""
+        INSERT INTO tablero_versiones (canal, estado, version, updated_at)
+        VALUES
+            ('mostrador', 1, 0, NOW()),
+            ('mostrador', 2, 0, NOW()),
+            ('mostrador', 3, 0, NOW()),
+            ('delivery', 1, 0, NOW()),
+            ('delivery', 2, 0, NOW()),
+            ('delivery', 3, 0, NOW())
+    """)
+
+
+def downgrade():
+    op.drop_table('tablero_versiones')
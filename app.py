@@ -4,6 +4,8 @@ import platform
 from config import config
 from utils.db import db
 from utils.filters import register_filters
+from utils.print_queue import init_cola_impresion, registrar_comandos as registrar_comandos_impresion
+from utils.tableros import registrar_comandos as registrar_comandos_tableros
 
 # Importar los blueprints
 from routes.marcas import marcas_bp
@@ -69,6 +71,13 @@ db.init_app(app)
 
 register_filters(app)
 
+# Cola de impresión (comandas y comprobantes); sus hilos arrancan en cada worker
+init_cola_impresion(app)
+
+# Comandos de consola (flask plan-tableros, flask cola-impresion)
+registrar_comandos_tableros(app)
+registrar_comandos_impresion(app)
+
 
 # Registrar los blueprints
 app.register_blueprint(marcas_bp)
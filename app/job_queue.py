@@ -0,0 +1,305 @@
+"""
+Cola persistente de trabajos del PrintHost (SQLite).
+
+/print/job y /print/batch ya no imprimen dentro de la request: guardan el
+documento generado en la base local y un hilo por impresora (driver) lo
+imprime. Si la impresora falla se reintenta con espera creciente; si el
+PrintHost se reinicia, los trabajos pendientes siguen en el archivo.
+
+Cada trabajo puede traer una clave de idempotencia: si el servidor reintenta
+una request que ya llegó (timeout en la respuesta), se devuelve el trabajo
+existente y no se imprime dos veces. Si ese trabajo había terminado en error,
+el reintento lo vuelve a poner en cola.
+
+Este módulo no importa win32print: la función que imprime se recibe en el
+constructor, así la cola se puede probar en Linux con un stub.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ESTADOS = ('pendiente', 'imprimiendo', 'ok', 'error')
+
+MAX_INTENTOS = 5
+# Segundos de espera antes de cada reintento
+ESPERAS = (2, 5, 15, 30, 60)
+# Documentos de una misma impresora que se juntan en un trabajo de spool
+LOTE_MAX = 20
+# Días que se guardan los trabajos terminados (ventana de idempotencia)
+DIAS_HISTORIAL = 7
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    clave TEXT UNIQUE,
+    tipo TEXT NOT NULL,
+    driver TEXT,
+    titulo TEXT NOT NULL,
+    contenido BLOB NOT NULL,
+    feed INTEGER NOT NULL DEFAULT 0,
+    cut INTEGER NOT NULL DEFAULT 1,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    proximo_intento REAL NOT NULL DEFAULT 0,
+    creado TEXT NOT NULL,
+    actualizado TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_driver_estado ON jobs (driver, estado, id);
+"""
+
+_COLUMNAS_PUBLICAS = ('id', 'clave', 'tipo', 'driver', 'titulo', 'estado', 'intentos', 'error', 'creado', 'actualizado')
+
+
+def _ahora() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class JobQueue:
+    """
+    Cola de impresión persistente con un hilo por impresora.
+
+    `imprimir(driver, documentos, titulo) -> {'ok': bool, 'error'?}` recibe
+    una lista de (contenido: bytes, feed, cut) y los imprime en un solo
+    trabajo de spool.
+    """
+
+    def __init__(self,
+                 path: str,
+                 imprimir: Callable[[str, List[tuple], str], Dict[str, Any]],
+                 max_intentos: int = MAX_INTENTOS,
+                 esperas: tuple = ESPERAS,
+                 lote_max: int = LOTE_MAX):
+        self.path = path
+        self.imprimir = imprimir
+        self.max_intentos = max_intentos
+        self.esperas = esperas
+        self.lote_max = lote_max
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_ESQUEMA)
+
+        # Un solo lock para la conexión; `_cambio` avisa a quien espera resultados
+        self._lock = threading.RLock()
+        self._cambio = threading.Condition(self._lock)
+        self._workers: Dict[Optional[str], threading.Event] = {}
+        self._activa = True
+
+    # ===== Arranque =====
+    def start(self):
+        """Retoma lo que quedó a medias y arranca un hilo por impresora con trabajos"""
+        with self._lock:
+            # Un trabajo 'imprimiendo' al arrancar se cortó con el proceso: reintentar
+            self._conn.execute(
+                "UPDATE jobs SET estado = 'pendiente', actualizado = ? WHERE estado = 'imprimiendo'",
+                (_ahora(),)
+            )
+            self.purge()
+            drivers = [fila['driver'] for fila in self._conn.execute(
+                "SELECT DISTINCT driver FROM jobs WHERE estado = 'pendiente'"
+            )]
+        for driver in drivers:
+            self._despertar(driver)
+
+    def stop(self):
+        self._activa = False
+        with self._lock:
+            eventos = list(self._workers.values())
+        for evento in eventos:
+            evento.set()
+
+    def purge(self, dias: int = DIAS_HISTORIAL) -> int:
+        limite = (datetime.now() - timedelta(days=dias)).isoformat(timespec='seconds')
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE estado IN ('ok', 'error') AND actualizado < ?", (limite,)
+            ).rowcount
+
+    # ===== Encolar / consultar =====
+    def enqueue(self, documentos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Guarda documentos ya generados y despierta a sus hilos.
+        Cada documento: {tipo, driver, titulo, content: bytes, feed, cut, clave?}.
+        Con una clave ya registrada se devuelve ese trabajo sin volver a
+        encolarlo (salvo que haya terminado en error: entonces se reintenta).
+        """
+        resultado = []
+        drivers = set()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                for doc in documentos:
+                    clave = doc.get('clave') or None
+                    if clave:
+                        existente = self._conn.execute('SELECT * FROM jobs WHERE clave = ?', (clave,)).fetchone()
+                        if existente and existente['estado'] == 'error':
+                            self._conn.execute(
+                                "UPDATE jobs SET estado = 'pendiente', intentos = 0, proximo_intento = 0, "
+                                "actualizado = ? WHERE id = ?",
+                                (_ahora(), existente['id'])
+                            )
+                            drivers.add(existente['driver'])
+                            existente = self._fila(existente['id'])
+                        if existente:
+                            resultado.append(dict(self._publico(existente), duplicado=True))
+                            continue
+                    ahora = _ahora()
+                    cursor = self._conn.execute(
+                        "INSERT INTO jobs (clave, tipo, driver, titulo, contenido, feed, cut, creado, actualizado) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (clave, doc['tipo'], doc.get('driver'), doc['titulo'], doc['content'],
+                         int(doc.get('feed') or 0), 1 if doc.get('cut') else 0, ahora, ahora)
+                    )
+                    drivers.add(doc.get('driver'))
+                    resultado.append(self._publico(self._fila(cursor.lastrowid)))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        for driver in drivers:
+            self._despertar(driver)
+        return resultado
+
+    def wait(self, ids: List[int], timeout: float) -> List[Dict[str, Any]]:
+        """Espera hasta `timeout` segundos a que los trabajos terminen (ok o error)"""
+        fin = time.monotonic() + timeout
+        with self._cambio:
+            while True:
+                jobs = [self.get(job_id) for job_id in ids]
+                restante = fin - time.monotonic()
+                if restante <= 0 or all(j and j['estado'] in ('ok', 'error') for j in jobs):
+                    return jobs
+                self._cambio.wait(restante)
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            fila = self._fila(job_id)
+        return self._publico(fila) if fila else None
+
+    def list_jobs(self, estado: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        sql = 'SELECT * FROM jobs'
+        params: list = []
+        if estado:
+            sql += ' WHERE estado = ?'
+            params.append(estado)
+        sql += ' ORDER BY id DESC LIMIT ?'
+        params.append(limit)
+        with self._lock:
+            filas = self._conn.execute(sql, params).fetchall()
+        return [self._publico(fila) for fila in filas]
+
+    def retry(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Vuelve a poner en cola un trabajo en error"""
+        with self._lock:
+            actualizados = self._conn.execute(
+                "UPDATE jobs SET estado = 'pendiente', intentos = 0, error = NULL, proximo_intento = 0, "
+                "actualizado = ? WHERE id = ? AND estado = 'error'",
+                (_ahora(), job_id)
+            ).rowcount
+            fila = self._fila(job_id)
+        if not actualizados:
+            return None
+        self._despertar(fila['driver'])
+        return self._publico(fila)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            filas = self._conn.execute('SELECT estado, COUNT(*) AS n FROM jobs GROUP BY estado').fetchall()
+        return {fila['estado']: fila['n'] for fila in filas}
+
+    # ===== Worker por impresora =====
+    def _despertar(self, driver: Optional[str]):
+        with self._lock:
+            evento = self._workers.get(driver)
+            if evento is None:
+                evento = self._workers[driver] = threading.Event()
+                hilo = threading.Thread(target=self._worker, args=(driver, evento),
+                                        name=f'printhost-{driver}', daemon=True)
+                hilo.start()
+        evento.set()
+
+    def _tomar_lote(self, driver: Optional[str]) -> List[sqlite3.Row]:
+        """Marca como 'imprimiendo' los pendientes vencidos de la impresora (en orden)"""
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT * FROM jobs WHERE driver IS ? AND estado = 'pendiente' AND proximo_intento <= ? "
+                "ORDER BY id LIMIT ?",
+                (driver, time.time(), self.lote_max)
+            ).fetchall()
+            if filas:
+                self._conn.executemany(
+                    "UPDATE jobs SET estado = 'imprimiendo', intentos = intentos + 1, actualizado = ? WHERE id = ?",
+                    [(_ahora(), fila['id']) for fila in filas]
+                )
+            return filas
+
+    def _proxima_espera(self, driver: Optional[str]) -> Optional[float]:
+        """Segundos hasta el próximo reintento pendiente de la impresora (None si no hay)"""
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT MIN(proximo_intento) AS proximo FROM jobs WHERE driver IS ? AND estado = 'pendiente'",
+                (driver,)
+            ).fetchone()
+        if fila['proximo'] is None:
+            return None
+        return max(0.0, fila['proximo'] - time.time())
+
+    def _worker(self, driver: Optional[str], evento: threading.Event):
+        while self._activa:
+            filas = self._tomar_lote(driver)
+            if filas:
+                self._imprimir_lote(driver, filas)
+                continue
+            evento.wait(self._proxima_espera(driver))
+            evento.clear()
+
+    def _imprimir_lote(self, driver: Optional[str], filas: List[sqlite3.Row]):
+        documentos = [(fila['contenido'], fila['feed'], bool(fila['cut'])) for fila in filas]
+        titulo = filas[0]['titulo'] if len(filas) == 1 else f"Lote ({len(filas)})"
+        try:
+            resultado = self.imprimir(driver, documentos, titulo)
+        except Exception as e:
+            resultado = {'ok': False, 'error': str(e)}
+
+        ahora = _ahora()
+        with self._cambio:
+            if resultado.get('ok'):
+                self._conn.executemany(
+                    "UPDATE jobs SET estado = 'ok', error = NULL, actualizado = ? WHERE id = ?",
+                    [(ahora, fila['id']) for fila in filas]
+                )
+            else:
+                error = str(resultado.get('error') or 'Error de impresión')[:500]
+                for fila in filas:
+                    intentos = fila['intentos'] + 1
+                    if intentos >= self.max_intentos:
+                        self._conn.execute(
+                            "UPDATE jobs SET estado = 'error', error = ?, actualizado = ? WHERE id = ?",
+                            (error, ahora, fila['id'])
+                        )
+                    else:
+                        espera = self.esperas[min(intentos, len(self.esperas)) - 1]
+                        self._conn.execute(
+                            "UPDATE jobs SET estado = 'pendiente', error = ?, proximo_intento = ?, actualizado = ? "
+                            "WHERE id = ?",
+                            (error, time.time() + espera, ahora, fila['id'])
+                        )
+                logger.warning(f"⚠️ Falló impresión en {driver} ({len(filas)} trabajos): {error}")
+            self._cambio.notify_all()
+
+    # ===== Utilidades =====
+    def _fila(self, job_id: int) -> Optional[sqlite3.Row]:
+        return self._conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+    @staticmethod
+    def _publico(fila: sqlite3.Row) -> Dict[str, Any]:
+        return {columna: fila[columna] for columna in _COLUMNAS_PUBLICAS}
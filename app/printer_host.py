@@ -1,15 +1,32 @@
 """
 PrintHost - El cliente Windows hace todo el trabajo de impresión.
-El servidor Flask (PythonAnywhere) solo envía instrucciones a /print/job.
+El servidor Flask (PythonAnywhere) solo envía instrucciones a /print/job
+(o varios documentos juntos a /print/batch).
+
+Los documentos se guardan en una cola local persistente (job_queue.py) y un
+hilo por impresora los imprime; la request solo espera unos segundos.
+
+Modo pull (PRINTHOST_SERVIDOR y PRINTHOST_TOKEN definidos): además el
+PrintHost consulta /api/print/pull cada `intervalo_pull` segundos y confirma
+en /api/print/ack, así el local no necesita IP pública.
 """
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import win32print
+import gzip
+import json
 import logging
+import os
+import sys
+import threading
+import time
+import requests
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 
+from job_queue import JobQueue
+
 app = Flask(__name__)
 CORS(app)
 
@@ -19,10 +36,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def _data_path(nombre: str) -> str:
+    """Archivo junto al .exe (PyInstaller) o junto a este script"""
+    if getattr(sys, 'frozen', False):
+        base = os.path.dirname(sys.executable)
+    else:
+        base = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base, nombre)
+
+
 CONFIG = {
     'puerto': 8765,
     'host': '0.0.0.0',
-    'version': '4.0.0',
+    'version': '4.4.0',
+    # Funciones opcionales que el servidor puede usar (ver /health)
+    'capacidades': ['batch', 'cola', 'idempotencia', 'gzip'],
+    'max_batch': 20,
+    # Cola local de trabajos y segundos que una request espera el resultado
+    'cola_db': os.environ.get('PRINTHOST_COLA_DB') or _data_path('printhost_jobs.db'),
+    'espera_job': 5,
+    # Modo pull: URL del servidor (ej. https://usuario.pythonanywhere.com) y token
+    'servidor_url': os.environ.get('PRINTHOST_SERVIDOR'),
+    'token': os.environ.get('PRINTHOST_TOKEN'),
+    # Segundos entre consultas sin trabajos (el servidor responde enseguida)
+    'intervalo_pull': float(os.environ.get('PRINTHOST_INTERVALO_PULL', 3)),
 }
 
 
@@ -46,7 +83,19 @@ def select_printer(preferred: Optional[str]) -> Optional[str]:
         return printers[0] if printers else None
 
 
-def _print_bytes(driver: str, content: bytes, feed: int = 3, cut: bool = True, title: str = "RAW") -> Dict[str, Any]:
+def _write_document(handle, content: bytes, feed: int, cut: bool):
+    win32print.WritePrinter(handle, content)
+    if feed and feed > 0:
+        win32print.WritePrinter(handle, ("\n" * feed).encode('utf-8'))
+    if cut:
+        win32print.WritePrinter(handle, b'\x1dV\x01')
+
+
+def _print_documents(driver: str, documents: List[tuple], title: str = "RAW") -> Dict[str, Any]:
+    """
+    Imprime varios documentos (content, feed, cut) en un solo trabajo de
+    spool, uno tras otro, cada uno con su propio avance y corte.
+    """
     if not driver:
         return {'ok': False, 'error': 'No hay impresora disponible'}
 
@@ -55,11 +104,8 @@ def _print_bytes(driver: str, content: bytes, feed: int = 3, cut: bool = True, t
         try:
             win32print.StartDocPrinter(handle, 1, (title, None, "RAW"))
             win32print.StartPagePrinter(handle)
-            win32print.WritePrinter(handle, content)
-            if feed and feed > 0:
-                win32print.WritePrinter(handle, ("\n" * feed).encode('utf-8'))
-            if cut:
-                win32print.WritePrinter(handle, b'\x1dV\x01')
+            for content, feed, cut in documents:
+                _write_document(handle, content, feed, cut)
             win32print.EndPagePrinter(handle)
             win32print.EndDocPrinter(handle)
             logger.info(f"✅ Impreso en {driver}")
@@ -72,11 +118,15 @@ def _print_bytes(driver: str, content: bytes, feed: int = 3, cut: bool = True, t
 
 
 # ===== Generadores de texto =====
-def _center(text: str, width: int = 42) -> str:
+# Caracteres por línea si el servidor no envía 'ancho' (impresora de 80mm)
+ANCHO_DEFAULT = 42
+
+
+def _center(text: str, width: int = ANCHO_DEFAULT) -> str:
     return text.center(width)
 
 
-def _line(char: str = '-', width: int = 42) -> str:
+def _line(char: str = '-', width: int = ANCHO_DEFAULT) -> str:
     return char * width
 
 
@@ -103,11 +153,10 @@ def _format_precio(valor) -> str:
         return "$0"
 
 
-def build_recibo_mostrador(payload: Dict[str, Any]) -> str:
+def build_recibo_mostrador(payload: Dict[str, Any], ancho: int = ANCHO_DEFAULT) -> str:
     """Genera el recibo para venta en mostrador - SIN cliente ni envío"""
     pedido = payload.get('pedido', {})
     items = payload.get('items', [])
-    ancho = 42
 
     lineas = []
     lineas.append(_center("MUNDO WAFFLES", ancho))
@@ -155,13 +204,12 @@ def build_recibo_mostrador(payload: Dict[str, Any]) -> str:
     return "\n".join(lineas)
 
 
-def build_recibo_delivery(payload: Dict[str, Any]) -> str:
+def build_recibo_delivery(payload: Dict[str, Any], ancho: int = ANCHO_DEFAULT) -> str:
     """Genera el recibo para entrega a domicilio - CON cliente y envío"""
     pedido = payload.get('pedido', {})
     cliente = payload.get('cliente', {})
     items = payload.get('items', [])
     total_con_envio = payload.get('total_con_envio')
-    ancho = 42
 
     lineas = []
     lineas.append(_center("MUNDO WAFFLES", ancho))
@@ -235,15 +283,15 @@ def build_recibo_delivery(payload: Dict[str, Any]) -> str:
     return "\n".join(lineas)
 
 
-def build_recibo(payload: Dict[str, Any]) -> str:
+def build_recibo(payload: Dict[str, Any], ancho: int = ANCHO_DEFAULT) -> str:
     """Wrapper para compatibilidad - detecta el tipo por presencia de cliente"""
     cliente = payload.get('cliente')
     if cliente and (cliente.get('razon_social') or cliente.get('telefono') or cliente.get('direccion')):
-        return build_recibo_delivery(payload)
-    return build_recibo_mostrador(payload)
+        return build_recibo_delivery(payload, ancho)
+    return build_recibo_mostrador(payload, ancho)
 
 
-def build_comanda(payload: Dict[str, Any]) -> str:
+def build_comanda(payload: Dict[str, Any], ancho: int = ANCHO_DEFAULT) -> str:
     """
     Genera el contenido de la comanda para cocina - IDÉNTICO a utils/printer.py
     Formato:
@@ -255,7 +303,6 @@ def build_comanda(payload: Dict[str, Any]) -> str:
     pedido = payload.get('pedido', {})
     items = payload.get('items', [])
     tipo_pedido = payload.get('tipo', 'MOSTRADOR')
-    ancho = 42
     
     lineas = []
     
@@ -314,11 +361,10 @@ def build_comanda(payload: Dict[str, Any]) -> str:
     return "\n".join(lineas)
 
 
-def build_agregados(payload: Dict[str, Any]) -> str:
+def build_agregados(payload: Dict[str, Any], ancho: int = ANCHO_DEFAULT) -> str:
     """Imprime comanda con productos AGREGADOS - IDÉNTICO a utils/printer.py"""
     pedido_id = payload.get('pedido_id', '')
     productos = payload.get('productos', [])
-    ancho = 42
     
     lineas = []
     lineas.append("")
@@ -344,11 +390,10 @@ def build_agregados(payload: Dict[str, Any]) -> str:
     return "\n".join(lineas)
 
 
-def build_eliminados(payload: Dict[str, Any]) -> str:
+def build_eliminados(payload: Dict[str, Any], ancho: int = ANCHO_DEFAULT) -> str:
     """Imprime comanda con productos ELIMINADOS - IDÉNTICO a utils/printer.py"""
     pedido_id = payload.get('pedido_id', '')
     productos = payload.get('productos', [])
-    ancho = 42
     
     lineas = []
     lineas.append("")
@@ -374,12 +419,11 @@ def build_eliminados(payload: Dict[str, Any]) -> str:
     return "\n".join(lineas)
 
 
-def build_delivery(payload: Dict[str, Any]) -> str:
+def build_delivery(payload: Dict[str, Any], ancho: int = ANCHO_DEFAULT) -> str:
     """Genera el contenido del comprobante de delivery - IDÉNTICO a utils/printer.py"""
     pedido = payload.get('pedido', {})
     cliente = payload.get('cliente', {})
     productos = payload.get('productos', [])
-    ancho = 42
     
     lineas = []
     
@@ -488,52 +532,198 @@ def build_delivery(payload: Dict[str, Any]) -> str:
 
 
 # ===== Procesador de trabajos =====
-def process_job(job_type: str, payload: Dict[str, Any], driver: Optional[str], feed: Optional[int], cut: Optional[bool]):
-    resolved_driver = select_printer(driver)
+def build_job(job_type: str, payload: Dict[str, Any], feed: Optional[int], cut: Optional[bool],
+              ancho: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Genera un documento sin imprimirlo. `ancho`: caracteres por línea de la
+    impresora (Printer.ancho_caracteres en el servidor).
+    Retorna {'ok': True, 'content': bytes, 'feed', 'cut', 'title'} o {'ok': False, 'error'}.
+    """
     feed_val = 5 if feed is None else feed
     cut_val = True if cut is None else cut
+    ancho = ancho or ANCHO_DEFAULT
+
+    def _doc(texto, feed_doc, cut_doc, title):
+        return {'ok': True, 'content': texto.encode('utf-8', errors='replace'),
+                'feed': feed_doc, 'cut': cut_doc, 'title': title}
 
     if job_type == 'raw':
         content = payload.get('content') or payload.get('contenido', '')
         if not content:
             return {'ok': False, 'error': 'content requerido'}
-        return _print_bytes(resolved_driver, content.encode('utf-8', errors='replace'), feed_val, cut_val, title='RAW')
+        return _doc(content, feed_val, cut_val, 'RAW')
 
     if job_type == 'pedido':
-        contenido = payload.get('contenido') or build_recibo(payload)
-        return _print_bytes(resolved_driver, contenido.encode('utf-8', errors='replace'), 5, True, title='Pedido')
+        contenido = payload.get('contenido') or build_recibo(payload, ancho)
+        return _doc(contenido, 5, True, 'Pedido')
 
     if job_type == 'comanda':
-        contenido = build_comanda(payload)
+        contenido = build_comanda(payload, ancho)
         logger.info(f"🔍 COMANDA GENERADA:\n{contenido}")
         logger.info(f"🔍 PAYLOAD RECIBIDO: {payload}")
         # Comanda siempre corta, aunque llegue cut=False (porque puede ser la única)
         # Si hay agregados/eliminados, ellos manejan su propio corte
-        return _print_bytes(resolved_driver, contenido.encode('utf-8', errors='replace'), feed_val, True, title='Comanda')
+        return _doc(contenido, feed_val, True, 'Comanda')
 
     if job_type == 'agregados':
-        contenido = build_agregados(payload)
+        contenido = build_agregados(payload, ancho)
         # Agregados es normalmente el último documento de la secuencia, siempre corta
-        return _print_bytes(resolved_driver, contenido.encode('utf-8', errors='replace'), feed_val, True, title='Agregados')
+        return _doc(contenido, feed_val, True, 'Agregados')
 
     if job_type == 'eliminados':
-        contenido = build_eliminados(payload)
+        contenido = build_eliminados(payload, ancho)
         # Eliminados es normalmente el último documento de la secuencia, siempre corta
-        return _print_bytes(resolved_driver, contenido.encode('utf-8', errors='replace'), feed_val, True, title='Eliminados')
+        return _doc(contenido, feed_val, True, 'Eliminados')
 
     if job_type == 'delivery':
-        contenido = build_delivery(payload)
-        return _print_bytes(resolved_driver, contenido.encode('utf-8', errors='replace'), feed_val, cut_val, title='Delivery')
+        contenido = build_delivery(payload, ancho)
+        return _doc(contenido, feed_val, cut_val, 'Delivery')
 
     return {'ok': False, 'error': f'Tipo de trabajo no soportado: {job_type}'}
 
 
+cola = JobQueue(CONFIG['cola_db'], _print_documents, lote_max=CONFIG['max_batch'])
+
+
+def _job_result(job: Dict[str, Any]) -> Dict[str, Any]:
+    if job['estado'] == 'ok':
+        return {'ok': True, 'driver': job['driver'], 'job_id': job['id'], 'estado': 'ok'}
+    if job['estado'] == 'error':
+        return {'ok': False, 'error': job['error'], 'job_id': job['id'], 'estado': 'error'}
+    # Aceptado: la cola local lo imprime (y reintenta) aunque la request ya terminó
+    return {'ok': True, 'driver': job['driver'], 'job_id': job['id'], 'estado': job['estado'], 'error': job['error']}
+
+
+def enqueue_jobs(jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Genera los documentos, los guarda en la cola y espera hasta
+    CONFIG['espera_job'] segundos a que se impriman. Retorna un resultado
+    por trabajo, en el mismo orden. Cada trabajo: {type, payload, driver,
+    feed, cut, idempotency_key}.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+    drivers: Dict[Optional[str], Optional[str]] = {}
+    documents = []
+    positions = []
+
+    for i, job in enumerate(jobs):
+        doc = build_job(job.get('type', 'raw'), job.get('payload') or {}, job.get('feed'), job.get('cut'),
+                        job.get('ancho'))
+        if not doc.get('ok'):
+            results[i] = doc
+            continue
+        preferred = job.get('driver')
+        if preferred not in drivers:
+            drivers[preferred] = select_printer(preferred)
+        if not drivers[preferred]:
+            results[i] = {'ok': False, 'error': 'No hay impresora disponible'}
+            continue
+        documents.append({
+            'tipo': job.get('type', 'raw'),
+            'driver': drivers[preferred],
+            'titulo': doc['title'],
+            'content': doc['content'],
+            'feed': doc['feed'],
+            'cut': doc['cut'],
+            'clave': job.get('idempotency_key'),
+        })
+        positions.append(i)
+
+    if documents:
+        queued = cola.enqueue(documents)
+        finished = cola.wait([job['id'] for job in queued], CONFIG['espera_job'])
+        for i, job in zip(positions, finished):
+            results[i] = _job_result(job)
+    return results
+
+
+def _job_response(result: Dict[str, Any]):
+    if not result.get('ok'):
+        return jsonify(result), 400
+    return jsonify(result), 200 if result.get('estado') == 'ok' else 202
+
+
+# ===== Modo pull =====
+def _process_pulled(jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Encola los documentos de los trabajos retirados; un resultado por trabajo del servidor"""
+    documents = []
+    spans = []
+    for job in jobs:
+        start = len(documents)
+        documents.extend(job.get('trabajos') or [])
+        spans.append((job.get('id'), start, len(documents)))
+
+    results = enqueue_jobs(documents) if documents else []
+    resultados = []
+    for job_id, start, end in spans:
+        parciales = results[start:end]
+        errores = [r.get('error') or 'Error de impresión' for r in parciales if not r.get('ok')]
+        resultados.append({
+            'id': job_id,
+            'ok': bool(parciales) and not errores,
+            'error': '; '.join(errores) or (None if parciales else 'Sin documentos'),
+        })
+    return resultados
+
+
+def pull_loop():
+    """
+    Consulta trabajos al servidor, los guarda en la cola local y confirma.
+    Sin trabajos espera `intervalo_pull`; con trabajos vuelve a consultar
+    enseguida. Si la confirmación se pierde el servidor los reentrega y la
+    clave de idempotencia evita imprimirlos dos veces.
+    """
+    base = CONFIG['servidor_url'].rstrip('/')
+    headers = {'X-PrintHost-Token': CONFIG['token']}
+    session = requests.Session()
+    pausa = 0
+    while True:
+        if pausa:
+            time.sleep(pausa)
+        try:
+            resp = session.get(
+                f"{base}/api/print/pull",
+                params={'max': CONFIG['max_batch']},
+                headers=headers,
+                timeout=(5, 15),
+            )
+            if resp.status_code != 200:
+                logger.warning(f"⚠️ /api/print/pull respondió {resp.status_code}")
+                pausa = 10
+                continue
+            jobs = resp.json().get('jobs', [])
+            if not jobs:
+                pausa = CONFIG['intervalo_pull']
+                continue
+            pausa = 0
+            resultados = _process_pulled(jobs)
+            session.post(f"{base}/api/print/ack", json={'resultados': resultados}, headers=headers, timeout=(5, 15))
+        except Exception as e:
+            logger.warning(f"⚠️ Error en modo pull: {e}")
+            pausa = 10
+
+
 # ===== Endpoints =====
+def _request_json() -> Dict[str, Any]:
+    """Cuerpo JSON de la request, comprimido o no (Content-Encoding: gzip)"""
+    if request.headers.get('Content-Encoding', '').lower() != 'gzip':
+        return request.get_json(force=True, silent=True) or {}
+    try:
+        data = json.loads(gzip.decompress(request.get_data()).decode('utf-8'))
+    except (OSError, EOFError, ValueError) as e:
+        logger.warning(f"⚠️ Cuerpo gzip inválido: {e}")
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
 @app.get('/health')
 def health():
     return jsonify({
         'status': 'ok',
         'version': CONFIG['version'],
+        'capacidades': CONFIG['capacidades'],
+        'max_batch': CONFIG['max_batch'],
+        'cola': cola.stats(),
         'default_printer': select_printer(None),
         'printers': available_printers(),
         'timestamp': datetime.now().isoformat()
@@ -548,41 +738,79 @@ def printers():
 
 @app.post('/print/job')
 def print_job():
-    data = request.get_json(force=True, silent=True) or {}
-    job_type = data.get('type', 'raw')
-    payload = data.get('payload', {})
-    driver = data.get('driver')
-    feed = data.get('feed')
-    cut = data.get('cut')
-    result = process_job(job_type, payload, driver, feed, cut)
-    status = 200 if result.get('ok') else 400
-    return jsonify(result), status
+    """
+    Encola un trabajo. 200 si se imprimió dentro de la espera, 202 si quedó
+    en la cola (se imprime en cuanto la impresora responda), 400 si falló.
+    Idempotency-Key (header o 'idempotency_key') evita imprimir dos veces.
+    """
+    data = _request_json()
+    data.setdefault('idempotency_key', request.headers.get('Idempotency-Key'))
+    return _job_response(enqueue_jobs([data])[0])
+
+
+@app.post('/print/batch')
+def print_batch():
+    """
+    Varios trabajos en una sola request: {"jobs": [{type, payload, driver, feed, cut}, ...]}.
+    Responde 200 con un resultado por trabajo; 'ok' es True solo si todos imprimieron.
+    """
+    data = _request_json()
+    jobs = data.get('jobs')
+    if not isinstance(jobs, list) or not jobs:
+        return jsonify({'ok': False, 'error': 'jobs requerido'}), 400
+    if len(jobs) > CONFIG['max_batch']:
+        return jsonify({'ok': False, 'error': f"Máximo {CONFIG['max_batch']} trabajos por lote"}), 400
+    results = enqueue_jobs([job if isinstance(job, dict) else {} for job in jobs])
+    return jsonify({'ok': all(r.get('ok') for r in results), 'results': results})
 
 
 # Compatibilidad con endpoints antiguos
 @app.post('/print/raw')
 def print_raw_legacy():
-    data = request.get_json(force=True, silent=True) or {}
-    driver = data.get('driver')
-    payload = {'content': data.get('content', '')}
-    feed = data.get('feed')
-    cut = data.get('cut')
-    result = process_job('raw', payload, driver, feed, cut)
-    status = 200 if result.get('ok') else 400
-    return jsonify(result), status
+    data = _request_json()
+    job = {
+        'type': 'raw',
+        'payload': {'content': data.get('content', '')},
+        'driver': data.get('driver'),
+        'feed': data.get('feed'),
+        'cut': data.get('cut'),
+    }
+    return _job_response(enqueue_jobs([job])[0])
 
 
 @app.post('/print/pedido')
 def print_pedido_legacy():
-    data = request.get_json(force=True, silent=True) or {}
+    data = _request_json()
     driver = data.get('driver')
     payload = {
         'contenido': data.get('contenido'),
         'pedido': {'id': data.get('pedido_id')},
     }
-    result = process_job('pedido', payload, driver, None, None)
-    status = 200 if result.get('ok') else 400
-    return jsonify(result), status
+    return _job_response(enqueue_jobs([{'type': 'pedido', 'payload': payload, 'driver': driver}])[0])
+
+
+# ===== Cola local =====
+@app.get('/jobs')
+def list_jobs():
+    estado = request.args.get('estado')
+    limit = min(request.args.get('limit', 50, type=int), 200)
+    return jsonify({'ok': True, 'jobs': cola.list_jobs(estado, limit), 'stats': cola.stats()})
+
+
+@app.get('/jobs/<int:job_id>')
+def get_job(job_id: int):
+    job = cola.get(job_id)
+    if not job:
+        return jsonify({'ok': False, 'error': 'Trabajo no encontrado'}), 404
+    return jsonify({'ok': True, 'job': job})
+
+
+@app.post('/jobs/<int:job_id>/retry')
+def retry_job(job_id: int):
+    job = cola.retry(job_id)
+    if not job:
+        return jsonify({'ok': False, 'error': 'Trabajo no encontrado o no está en error'}), 404
+    return jsonify({'ok': True, 'job': job})
 
 
 @app.errorhandler(404)
@@ -600,4 +828,11 @@ if __name__ == '__main__':
     logger.info(f"🖨️ PrintHost v{CONFIG['version']} iniciando...")
     logger.info(f"📡 Escuchando en {CONFIG['host']}:{CONFIG['puerto']}")
     logger.info("✅ El servidor remoto solo envía /print/job")
+    logger.info(f"🗃️ Cola local: {CONFIG['cola_db']}")
+    cola.start()
+    if CONFIG['servidor_url'] and not CONFIG['token']:
+        logger.error("❌ Modo pull requiere PRINTHOST_TOKEN: no se consultará al servidor")
+    elif CONFIG['servidor_url']:
+        logger.info(f"🔁 Modo pull activo contra {CONFIG['servidor_url']} (cada {CONFIG['intervalo_pull']:g}s)")
+        threading.Thread(target=pull_loop, name='printhost-pull', daemon=True).start()
     app.run(host=CONFIG['host'], port=CONFIG['puerto'], debug=False, use_reloader=False)
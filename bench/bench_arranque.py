@@ -0,0 +1,100 @@
+"""
+Benchmark: tiempo de arranque de un worker (`import app` y `import utils.printer`).
+
+Cada medición es un proceso nuevo de Python (`-X importtime`), como un worker
+de PythonAnywhere al arrancar. Se informa el mejor tiempo total del proceso
+y el tiempo acumulado de importar el módulo, y si la importación escribió en
+el log de diagnóstico que utils/printer.py abría al cargarse.
+
+Con `--rev` mide además otra versión del repo (extraída con git archive en
+un directorio temporal), por ejemplo la anterior a la carga perezosa del
+backend de impresión (b9578e6):
+
+    python bench/bench_arranque.py --rev b9578e6~1
+
+La app se importa con APP_ENV=production (URI pymysql, no conecta al importar).
+"""
+
+import argparse
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULOS = ('utils.printer', 'app')
+LOG_DIAGNOSTICO = "/tmp/printer_debug.log" if platform.system() != 'Windows' else "C:\\Temp\\printer_debug.log"
+
+
+def _tamano_log():
+    try:
+        return os.path.getsize(LOG_DIAGNOSTICO)
+    except OSError:
+        return None
+
+
+def importar(directorio, modulo):
+    """(segundos del proceso, µs acumulados de `modulo` según -X importtime)"""
+    entorno = dict(os.environ, APP_ENV='production')
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+        cwd=directorio, env=entorno, capture_output=True, text=True,
+    )
+    duracion = time.perf_counter() - inicio
+    if proceso.returncode != 0:
+        raise SystemExit(f"import {modulo} falló en {directorio}:\n{proceso.stderr[-2000:]}")
+    acumulado = None
+    for linea in proceso.stderr.splitlines():
+        coincide = re.match(r'import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)$', linea)
+        if coincide and coincide.group(2) == modulo:
+            acumulado = int(coincide.group(1))
+    return duracion, acumulado
+
+
+def medir_arbol(nombre, directorio, repeticiones):
+    print(f"{nombre}:")
+    for modulo in MODULOS:
+        importar(directorio, modulo)  # compila los .pyc fuera de la medición
+        log_antes = _tamano_log()
+        tiempos, acumulados = [], []
+        for _ in range(repeticiones):
+            duracion, acumulado = importar(directorio, modulo)
+            tiempos.append(duracion)
+            acumulados.append(acumulado or 0)
+        escribe_log = _tamano_log() != log_antes
+        print(f"  import {modulo:<14} proceso {min(tiempos) * 1000:7.1f} ms (mediana {statistics.median(tiempos) * 1000:6.1f})"
+              f"   módulo {min(acumulados) / 1000:7.1f} ms"
+              f"   escribe {os.path.basename(LOG_DIAGNOSTICO)}: {'sí' if escribe_log else 'no'}")
+
+
+def extraer_revision(revision, destino):
+    archivo = os.path.join(destino, 'rev.tar')
+    with open(archivo, 'wb') as f:
+        subprocess.run(['git', 'archive', revision], cwd=RAIZ, stdout=f, check=True)
+    with tarfile.open(archivo) as tar:
+        tar.extractall(destino)
+    os.remove(archivo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeticiones', type=int, default=10)
+    parser.add_argument('--rev', help='otra revisión de git para comparar')
+    args = parser.parse_args()
+
+    print(f"Python {platform.python_version()}, mejor de {args.repeticiones} procesos")
+    if args.rev:
+        with tempfile.TemporaryDirectory() as destino:
+            extraer_revision(args.rev, destino)
+            medir_arbol(args.rev, destino, args.repeticiones)
+    medir_arbol('árbol actual', RAIZ, args.repeticiones)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Benchmark: bytes y latencia por trabajo de los cuerpos enviados al PrintHost,
+JSON plano vs. gzip, uno por request vs. /print/batch.
+
+Cada pedido genera el recibo de mostrador y la comanda de cocina con
+ThermalPrinter.capturar() (los mismos payloads que arman los _payload_*) y
+se envían a un PrintHost stub en 127.0.0.1 con PrintHostClient:
+
+- job:   un /print/job por documento
+- batch: ambos documentos en un solo /print/batch
+- cada uno con comprimir=False (JSON compacto) y comprimir=True (gzip
+  desde COMPRIMIR_DESDE, el stub anuncia la capacidad en /health)
+
+El stub descomprime y parsea cada cuerpo como el PrintHost real. Para
+simular el enlace del local, `--kbps` demora cada request según los bytes
+del cuerpo y `--rtt` (ms) agrega una ida y vuelta por request.
+
+Uso:
+    python bench/bench_payloads_printhost.py [--items 8] [--pedidos 100] [--kbps 0] [--rtt 0]
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from utils.print_client import PrintHostClient, cerrar_sesiones  # noqa: E402
+from utils.printer import ThermalPrinter  # noqa: E402
+
+EXTRAS = [{'id': 1, 'valor': 'Nutella', 'precio_adicional': 500},
+          {'id': 7, 'valor': 'Frutillas', 'precio_adicional': 700}]
+
+
+class StubPrintHost(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Cabeceras y cuerpo en un solo envío (ver bench_printhost_client.py)
+    wbufsize = -1
+    kbps = 0.0
+    rtt = 0.0
+    bytes_recibidos = 0
+    requests = 0
+    _lock = threading.Lock()
+
+    def _responder(self, datos):
+        cuerpo = json.dumps(datos).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        self._responder({'ok': True, 'capacidades': ['batch', 'cola', 'idempotencia', 'gzip']})
+
+    def do_POST(self):
+        cuerpo = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        with StubPrintHost._lock:
+            StubPrintHost.bytes_recibidos += len(cuerpo)
+            StubPrintHost.requests += 1
+        demora = self.rtt + (len(cuerpo) * 8 / (self.kbps * 1000) if self.kbps else 0)
+        if demora:
+            time.sleep(demora)
+        if self.headers.get('Content-Encoding') == 'gzip':
+            cuerpo = gzip.decompress(cuerpo)
+        datos = json.loads(cuerpo)
+        if self.path == '/print/batch':
+            self._responder({'ok': True, 'results': [{'ok': True} for _ in datos['jobs']]})
+        else:
+            self._responder({'ok': True, 'estado': 'ok', 'driver': 'stub'})
+
+    def log_message(self, *args):
+        pass
+
+
+def iniciar_stub(kbps, rtt):
+    StubPrintHost.kbps = kbps
+    StubPrintHost.rtt = rtt
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), StubPrintHost)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}"
+
+
+def documentos_pedido(items):
+    """Recibo de mostrador + comanda de un pedido de `items` líneas, como armar_job"""
+    pedido = SimpleNamespace(id=12345, fecha_hora=datetime.now(), total=3490 * items, costo_envio=0,
+                             estado_delivery=None, comentarios='Cliente Mostrador')
+    lineas = [SimpleNamespace(producto=SimpleNamespace(nombre=f"Waffle clásico {n}"), cantidad=1 + n % 3,
+                              precio_venta=3490, atributos_seleccionados=json.dumps(EXTRAS[:n % 3]))
+              for n in range(items)]
+    comanda = [{'nombre': f"Waffle clásico {n}", 'cantidad': 1 + n % 3, 'extras': EXTRAS[:n % 3]}
+               for n in range(items)]
+    printer = ThermalPrinter(printer_name='EPSON TM-T88V Receipt5')
+    with printer.capturar() as jobs:
+        printer.imprimir_pedido_mostrador(pedido, lineas)
+        printer.imprimir_comanda_cocina(pedido, comanda)
+    return jobs
+
+
+def medir(url, jobs, pedidos, comprimir, batch):
+    cliente = PrintHostClient(url, comprimir=comprimir)
+    cliente.health_check()
+    StubPrintHost.bytes_recibidos = StubPrintHost.requests = 0
+    inicio = time.perf_counter()
+    for _ in range(pedidos):
+        if batch:
+            ok = cliente.print_batch(jobs).get('ok')
+        else:
+            ok = all(cliente.print_job(j['type'], j['payload'], driver=j.get('driver'),
+                                       ancho=j.get('ancho')).get('ok') for j in jobs)
+        if not ok:
+            raise SystemExit('El stub no confirmó un trabajo')
+    duracion = time.perf_counter() - inicio
+    trabajos = pedidos * len(jobs)
+    return (StubPrintHost.bytes_recibidos / trabajos, StubPrintHost.requests / pedidos,
+            duracion / trabajos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--items', type=int, default=8)
+    parser.add_argument('--pedidos', type=int, default=100)
+    parser.add_argument('--kbps', type=float, default=0, help='ancho de banda simulado (0: sin límite)')
+    parser.add_argument('--rtt', type=float, default=0, help='ms por request')
+    args = parser.parse_args()
+    # ThermalPrinter avisa que no hay PrintHost configurado: aquí solo captura
+    logging.getLogger('utils.printer').setLevel(logging.ERROR)
+
+    servidor, url = iniciar_stub(args.kbps, args.rtt / 1000)
+    jobs = documentos_pedido(args.items)
+
+    print(f"{args.pedidos} pedidos de {args.items} líneas ({len(jobs)} documentos), "
+          f"{args.kbps:g} kbps, rtt {args.rtt:g} ms")
+    for batch in (False, True):
+        for comprimir in (False, True):
+            nombre = f"{'batch' if batch else 'job'} {'gzip' if comprimir else 'json'}"
+            bytes_job, requests_pedido, latencia = medir(url, jobs, args.pedidos, comprimir, batch)
+            print(f"  {nombre:<11} {bytes_job:7.0f} bytes/trabajo   {requests_pedido:3.0f} requests/pedido   "
+                  f"{latencia * 1000:7.2f} ms/trabajo")
+
+    cerrar_sesiones()
+    servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
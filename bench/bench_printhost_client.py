@@ -0,0 +1,122 @@
+"""
+Benchmark: trabajos por segundo de PrintHostClient contra un PrintHost stub.
+
+Levanta un PrintHost falso en 127.0.0.1 (http.server, HTTP/1.1 keep-alive)
+que responde /health y /print/job sin imprimir, y envía el mismo trabajo:
+
+- sin pool: requests.post suelto, una conexión TCP nueva por trabajo (como
+  antes de sesion_printhost)
+- PrintHostClient: un cliente nuevo por trabajo, como ThermalPrinter en cada
+  impresión, que reutiliza la Session keep-alive del proceso
+
+`--latencia` (ms) se suma una vez por conexión nueva en el stub para simular
+el handshake TCP con el PrintHost del local a través de internet.
+
+Uso:
+    python bench/bench_printhost_client.py [--trabajos 500] [--latencia 0] [--hilos 1]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from utils.print_client import PrintHostClient, armar_job, cerrar_sesiones  # noqa: E402
+
+
+class StubPrintHost(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Cabeceras y cuerpo en un solo envío, como werkzeug: con dos envíos
+    # chicos por conexión keep-alive Nagle + ACK diferido suman ~40 ms
+    wbufsize = -1
+    latencia = 0.0
+    conexiones = 0
+    _lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StubPrintHost._lock:
+            StubPrintHost.conexiones += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    def _responder(self, datos):
+        cuerpo = json.dumps(datos).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        self._responder({'ok': True, 'capacidades': ['batch', 'cola', 'idempotencia']})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self._responder({'ok': True, 'estado': 'ok', 'driver': 'stub'})
+
+    def log_message(self, *args):
+        pass
+
+
+def iniciar_stub(latencia):
+    StubPrintHost.latencia = latencia
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), StubPrintHost)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}"
+
+
+def medir(nombre, enviar, trabajos, hilos):
+    StubPrintHost.conexiones = 0
+    inicio = time.perf_counter()
+    if hilos > 1:
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            resultados = list(pool.map(lambda _: enviar(), range(trabajos)))
+    else:
+        resultados = [enviar() for _ in range(trabajos)]
+    duracion = time.perf_counter() - inicio
+    fallidos = sum(1 for r in resultados if not r)
+    print(f"  {nombre:<18} {trabajos / duracion:9.1f} trabajos/s   "
+          f"{StubPrintHost.conexiones:5d} conexiones   {fallidos} fallidos")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--trabajos', type=int, default=500)
+    parser.add_argument('--latencia', type=float, default=0, help='ms por conexión nueva')
+    parser.add_argument('--hilos', type=int, default=1)
+    args = parser.parse_args()
+
+    servidor, url = iniciar_stub(args.latencia / 1000)
+    job = armar_job('raw', {'content': 'Ticket de prueba\n' * 20}, driver='stub', clave='bench')
+
+    def sin_pool():
+        resp = requests.post(f"{url}/print/job", json=job, timeout=(3, 10))
+        return resp.status_code == 200 and resp.json().get('ok')
+
+    def con_cliente():
+        return PrintHostClient(url).print_job('raw', job['payload'], driver='stub', clave='bench').get('ok')
+
+    # Primer sondeo de salud fuera de la medición
+    PrintHostClient(url).health_check()
+
+    print(f"{args.trabajos} trabajos, {args.hilos} hilo(s), latencia {args.latencia:g} ms por conexión")
+    medir('sin pool', sin_pool, args.trabajos, args.hilos)
+    medir('PrintHostClient', con_cliente, args.trabajos, args.hilos)
+
+    cerrar_sesiones()
+    servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Benchmark: generadores de tickets del PrintHost vs. plantilla compilada.
+
+Compara build_comanda y build_recibo_mostrador de app/printer_host.py
+(lista de líneas + join + encode, como los envía build_job) con un prototipo
+de motor de plantillas compilado: encabezados y pies estáticos codificados
+una vez por ancho de impresora (caché) y los items escritos en un bytearray
+reutilizable. Antes de medir verifica que ambos generan los mismos bytes.
+
+Los generadores se leen del fuente con ast: importar printer_host necesita
+win32print y Flask y abre la cola SQLite del PrintHost.
+
+Uso:
+    python bench/bench_tickets.py [--items 8] [--numero 2000] [--repeticiones 5]
+"""
+
+import argparse
+import ast
+import os
+import timeit
+from functools import lru_cache
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRINTER_HOST = os.path.join(RAIZ, 'app', 'printer_host.py')
+
+GENERADORES = ('ANCHO_DEFAULT', '_center', '_line', '_fmt_fecha', '_format_precio',
+               'build_comanda', 'build_recibo_mostrador')
+
+
+def cargar_generadores():
+    """Funciones de GENERADORES definidas en printer_host.py, sin importar el módulo"""
+    with open(PRINTER_HOST, encoding='utf-8') as f:
+        arbol = ast.parse(f.read(), PRINTER_HOST)
+
+    nodos = []
+    for nodo in arbol.body:
+        if isinstance(nodo, ast.FunctionDef) and nodo.name in GENERADORES:
+            nodos.append(nodo)
+        elif isinstance(nodo, ast.Assign) and any(
+                isinstance(t, ast.Name) and t.id in GENERADORES for t in nodo.targets):
+            nodos.append(nodo)
+
+    espacio = {}
+    exec("from datetime import datetime\nfrom typing import Any, Dict, List, Optional", espacio)
+    exec(compile(ast.Module(body=nodos, type_ignores=[]), PRINTER_HOST, 'exec'), espacio)
+    return espacio
+
+
+# ==========================================
+# PROTOTIPO: PLANTILLA COMPILADA
+# ==========================================
+
+def _codificar(texto):
+    return texto.encode('utf-8', errors='replace')
+
+
+def _precio(valor):
+    try:
+        return "$" + f"{int(float(valor)):,}".replace(",", ".")
+    except (ValueError, TypeError):
+        return "$0"
+
+
+@lru_cache(maxsize=None)
+def _cabecera_comanda(tipo_pedido, ancho):
+    return _codificar("\n" + f"=== {tipo_pedido} ===".center(ancho) + "\n")
+
+
+@lru_cache(maxsize=None)
+def _partes_recibo(ancho):
+    separador = "=" * ancho
+    return (
+        _codificar("MUNDO WAFFLES".center(ancho) + "\n" + separador + "\n\n"),
+        _codificar("\n" + separador + "\n\nITEMS:\n\n"),
+        _codificar(separador + "\n\n"),
+        _codificar("\n\n\n" + "Gracias por su compra!".center(ancho) + "\n\n\n"),
+    )
+
+
+def plantilla_comanda(payload, ancho, buf):
+    pedido = payload.get('pedido', {})
+    buf.clear()
+    buf += _cabecera_comanda(payload.get('tipo', 'MOSTRADOR'), ancho)
+
+    cliente = payload.get('cliente', {})
+    if cliente and cliente.get('razon_social'):
+        buf += _codificar(cliente.get('razon_social', '')[:30] + "\n")
+
+    pedido_id = pedido.get('id', '')
+    hora = ''
+    if pedido.get('fecha_hora', ''):
+        try:
+            hora = datetime.fromisoformat(pedido['fecha_hora']).strftime('%H:%M')
+        except Exception:
+            hora = ''
+    try:
+        buf += _codificar(f"#{int(pedido_id):4d}  {hora}\n\n")
+    except (ValueError, TypeError):
+        buf += _codificar(f"#{str(pedido_id):>4}  {hora}\n\n")
+
+    for item in payload.get('items', []):
+        cantidad = item.get('cantidad') or item.get('CANTIDAD', 1)
+        nombre = str(item.get('nombre') or item.get('NOMBRE', '')).upper()[:35]
+        buf += _codificar(f"{cantidad}x {nombre}\n")
+        for extra in item.get('extras', []) or []:
+            if isinstance(extra, dict):
+                buf += _codificar(f"   + {str(extra.get('valor', '')).upper()[:32]}\n")
+
+    buf += b"\n\n"
+    return bytes(buf)
+
+
+def plantilla_recibo_mostrador(payload, ancho, buf):
+    pedido = payload.get('pedido', {})
+    cabecera, items_inicio, items_fin, pie = _partes_recibo(ancho)
+    fecha = pedido.get('fecha_hora')
+    if fecha:
+        try:
+            fecha = datetime.fromisoformat(fecha).strftime('%d/%m/%Y %H:%M')
+        except Exception:
+            pass
+    else:
+        fecha = ""
+
+    buf.clear()
+    buf += cabecera
+    buf += _codificar(f"Pedido #: {pedido.get('id', '')}\nFecha: {fecha}\n")
+    buf += items_inicio
+    for item in payload.get('items', []):
+        cantidad = item.get('cantidad', 1)
+        precio = float(item.get('precio_venta', 0))
+        subtotal = float(item.get('subtotal', cantidad * precio))
+        buf += _codificar(f"{str(item.get('nombre', ''))[:30]}\n  x{cantidad} @ {_precio(precio)} = {_precio(subtotal)}\n")
+        for k, v in (item.get('atributos', {}) or {}).items():
+            buf += _codificar(f"    - {k}: {v}\n")
+        buf += b"\n"
+    buf += items_fin
+    buf += _codificar(f"TOTAL:                 {_precio(float(pedido.get('total', 0))):>10}")
+    buf += pie
+    return bytes(buf)
+
+
+# ==========================================
+# MEDICIÓN
+# ==========================================
+
+def payload_ejemplo(cantidad_items):
+    items = []
+    for i in range(cantidad_items):
+        items.append({
+            'nombre': f"Waffle especial {i} con frutilla y crema",
+            'cantidad': 1 + i % 3,
+            'precio_venta': 3490 + 500 * i,
+            'extras': [{'valor': 'Extra nutella'}, {'valor': 'Sin azúcar'}] if i % 2 else [],
+            'atributos': {'Salsa': 'Manjar'} if i % 2 else {},
+        })
+    return {
+        'tipo': 'MOSTRADOR',
+        'pedido': {'id': 1234, 'fecha_hora': '2026-10-18T13:45:00', 'total': 41880},
+        'cliente': {'razon_social': 'Cliente de prueba'},
+        'items': items,
+    }
+
+
+def medir(nombre, funcion, numero, repeticiones):
+    mejor = min(timeit.repeat(funcion, number=numero, repeat=repeticiones)) / numero
+    print(f"  {nombre:<28} {mejor * 1e6:8.2f} µs/ticket")
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--items', type=int, default=8)
+    parser.add_argument('--numero', type=int, default=2000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--ancho', type=int, default=42)
+    args = parser.parse_args()
+
+    g = cargar_generadores()
+    payload = payload_ejemplo(args.items)
+    ancho = args.ancho
+    buf = bytearray()
+
+    casos = (
+        ('comanda', g['build_comanda'], plantilla_comanda),
+        ('recibo_mostrador', g['build_recibo_mostrador'], plantilla_recibo_mostrador),
+    )
+    print(f"{args.items} items, ancho {ancho}, mejor de {args.repeticiones} x {args.numero}")
+    for nombre, actual, prototipo in casos:
+        esperado = _codificar(actual(payload, ancho))
+        obtenido = prototipo(payload, ancho, buf)
+        if obtenido != esperado:
+            raise SystemExit(f"{nombre}: el prototipo no genera los mismos bytes")
+
+        print(f"{nombre}:")
+        t_actual = medir('actual (join + encode)', lambda: _codificar(actual(payload, ancho)),
+                         args.numero, args.repeticiones)
+        t_prototipo = medir('plantilla compilada', lambda: prototipo(payload, ancho, buf),
+                            args.numero, args.repeticiones)
+        print(f"  {'plantilla / actual':<28} {t_prototipo / t_actual:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -21,6 +21,17 @@ class DevelopmentConfig():
     PRINTER_NAME = os.environ.get('PRINTER_NAME', 'EPSON TM-T88V Receipt5')
     # PrintHost no se usa en desarrollo (se usa win32print directo)
     PRINTHOST_URL = None
+    # Carritos en el servidor: 'memoria' (un proceso) o 'sql' (varios workers)
+    CARRITO_STORE = os.environ.get('CARRITO_STORE', 'memoria')
+    CARRITO_TTL = 4 * 3600
+    # Grilla de productos renderizada una vez por versión del catálogo
+    CATALOGO_CACHE_FRAGMENTOS = True
+    # Refresco de tableros por SSE (cada stream ocupa un worker mientras dura)
+    TABLEROS_SSE = os.environ.get('TABLEROS_SSE', '0') == '1'
+    TABLEROS_SSE_DURACION = 25
+    # Impresión en segundo plano (False: imprime dentro de la request)
+    PRINT_QUEUE_ASYNC = True
+    PRINT_QUEUE_WORKERS = 2
 
 
 class ProductionConfig():
@@ -45,6 +56,36 @@ class ProductionConfig():
     # PrintHost: Cliente debe configurar en WSGI (el servidor solo envía /print/job)
     # Ejemplo: os.environ['PRINTHOST_URL'] = 'http://192.168.1.50:8765'
     PRINTHOST_URL = os.environ.get('PRINTHOST_URL', None)
+    # 'push': el servidor llama al PrintHost (PRINTHOST_URL)
+    # 'pull': el PrintHost pide los trabajos a /api/print/pull (sin IP pública)
+    PRINTHOST_MODO = os.environ.get('PRINTHOST_MODO', 'push')
+    # Token compartido que el PrintHost envía en X-PrintHost-Token (obligatorio
+    # en modo pull: sin él la app no arranca y /pull y /ack responden 401)
+    PRINTHOST_TOKEN = os.environ.get('PRINTHOST_TOKEN')
+    # Timeouts (segundos) de la conexión keep-alive al PrintHost
+    PRINTHOST_CONNECT_TIMEOUT = 3
+    PRINTHOST_READ_TIMEOUT = 10
+    # Comprimir con gzip los trabajos grandes (si el PrintHost lo soporta)
+    PRINTHOST_COMPRIMIR = True
+    
+    # Carritos en el servidor: PythonAnywhere corre varios workers, usar tabla SQL
+    CARRITO_STORE = os.environ.get('CARRITO_STORE', 'sql')
+    CARRITO_TTL = 4 * 3600
+    # Grilla de productos renderizada una vez por versión del catálogo
+    CATALOGO_CACHE_FRAGMENTOS = True
+    # SSE desactivado: los workers síncronos de PythonAnywhere son pocos y cada
+    # stream retiene uno; los tableros quedan con su polling de 30s/60s
+    TABLEROS_SSE = os.environ.get('TABLEROS_SSE', '0') == '1'
+    TABLEROS_SSE_DURACION = 25
+    # Impresión fuera de la request. Los web workers de PythonAnywhere no
+    # garantizan hilos de fondo, así que por defecto la request solo registra
+    # el trabajo y lo imprime una tarea siempre activa que corre
+    # `flask --app app cola-impresion` (o PRINTHOST_MODO = 'pull', sin tarea).
+    # PRINT_QUEUE_ASYNC (pool de hilos por worker) requiere uWSGI con
+    # enable-threads, y lazy-apps si hay prefork
+    PRINT_QUEUE_EXTERNA = os.environ.get('PRINT_QUEUE_EXTERNA', '1') == '1'
+    PRINT_QUEUE_ASYNC = os.environ.get('PRINT_QUEUE_ASYNC', '0') == '1'
+    PRINT_QUEUE_WORKERS = 2
     
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_size': 10,
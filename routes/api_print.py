@@ -1,12 +1,23 @@
-from flask import Blueprint, jsonify, request
+import hmac
+import time
+
+from flask import Blueprint, jsonify, request, current_app, make_response
 from utils.db import db
 from utils.printer_manager import obtener_por_perfil
-from utils.printer import ThermalPrinter
+from utils.printer import ThermalPrinter, diagnostico_impresion
 from src.models.Venta_model import Venta
 from src.models.Cliente_model import Cliente
+from src.models.PrintJob_model import PrintJob
+from utils.print_queue import reintentar_job, reclamar_pendientes, documentos_job, confirmar_job, get_cola
+from utils.print_client import estado_printhosts, codificar_json
 
 api_print_bp = Blueprint('api_print', __name__, url_prefix='/api/print')
 
+# Modo pull: el PrintHost decide cada cuánto consulta; la request no retiene
+# el worker más que ESPERA_PULL_MAX (solo PrintHost antiguos que mandan `espera`)
+ESPERA_PULL_MAX = 2
+MAX_JOBS_PULL = 20
+
 
 def _build_content(tipo_doc: str, pedido: Venta):
     """
@@ -67,3 +78,143 @@ def get_print_payload(pedido_id: int):
         return jsonify({'ok': False, 'error': 'No hay impresora configurada para perfil/tipo'}), 400
 
     return jsonify({'ok': True, 'driver_name': driver_name, 'content': content, 'feed': feed, 'cut': cut})
+
+
+@api_print_bp.get('/printhost/salud')
+def salud_printhost():
+    """Estado cacheado (circuit breaker) de cada PrintHost usado por este worker"""
+    return jsonify({'ok': True, 'printhosts': estado_printhosts()})
+
+
+@api_print_bp.get('/diagnostico')
+def diagnostico():
+    """Backend de impresión detectado por este worker (reemplaza /tmp/printer_debug.log)"""
+    return jsonify({'ok': True, 'impresion': diagnostico_impresion(), 'printhosts': estado_printhosts()})
+
+
+# ==========================================
+# COLA DE IMPRESIÓN (estado de los trabajos)
+# ==========================================
+
+@api_print_bp.get('/jobs')
+def listar_jobs():
+    """Últimos trabajos de la cola.
+    Query params: estado (pendiente|imprimiendo|ok|error), pedido_id, limit (máx 200)
+    """
+    query = PrintJob.query
+    estado = request.args.get('estado')
+    if estado:
+        query = query.filter(PrintJob.estado == estado)
+    pedido_id = request.args.get('pedido_id', type=int)
+    if pedido_id:
+        query = query.filter(PrintJob.pedido_id == pedido_id)
+    limit = min(request.args.get('limit', 50, type=int), 200)
+
+    jobs = query.order_by(PrintJob.id.desc()).limit(limit).all()
+    return jsonify({'ok': True, 'jobs': [job.to_dict() for job in jobs]})
+
+
+@api_print_bp.get('/jobs/<int:job_id>')
+def ver_job(job_id: int):
+    job = db.session.get(PrintJob, job_id)
+    if not job:
+        return jsonify({'ok': False, 'error': 'Trabajo no encontrado'}), 404
+    return jsonify({'ok': True, 'job': job.to_dict()})
+
+
+@api_print_bp.post('/jobs/<int:job_id>/reintentar')
+def reintentar(job_id: int):
+    """Vuelve a encolar un trabajo que quedó en error"""
+    try:
+        job = reintentar_job(job_id)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'ok': False, 'error': str(e)}), 500
+    if not job:
+        return jsonify({'ok': False, 'error': 'Trabajo no encontrado o en curso'}), 404
+    return jsonify({'ok': True, 'job': job.to_dict()})
+
+
+# ==========================================
+# MODO PULL: el PrintHost retira y confirma
+# ==========================================
+
+def _printhost_autorizado():
+    """El PrintHost debe enviar PRINTHOST_TOKEN en X-PrintHost-Token; sin token configurado no se atiende"""
+    token = current_app.config.get('PRINTHOST_TOKEN')
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get('X-PrintHost-Token', ''), token)
+
+
+@api_print_bp.get('/pull')
+def pull_jobs():
+    """Trabajos pendientes para el PrintHost, sin long-poll.
+    Query params: max (trabajos, máx 20). Si no hay trabajos responde enseguida
+    con la lista vacía y el PrintHost vuelve a consultar a su intervalo;
+    `espera` (PrintHost antiguos) solo demora la respuesta vacía, máx 2 s.
+    Cada trabajo trae sus documentos listos para /print/job del PrintHost;
+    quedan 'imprimiendo' hasta el /ack (o se reentregan tras el timeout).
+    La respuesta va con gzip si el PrintHost lo acepta (Accept-Encoding).
+    """
+    if not _printhost_autorizado():
+        return jsonify({'ok': False, 'error': 'No autorizado'}), 401
+
+    espera = min(max(request.args.get('espera', 0, type=float), 0), ESPERA_PULL_MAX)
+    limite = min(max(request.args.get('max', 10, type=int), 1), MAX_JOBS_PULL)
+
+    # Sin hilos de fondo en modo pull: libera atascados y vencidos de paso
+    get_cola().barrer_si_toca()
+
+    try:
+        jobs = reclamar_pendientes(limite)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'ok': False, 'error': str(e)}), 500
+    if not jobs and espera:
+        time.sleep(espera)
+
+    entregados = []
+    for job in jobs:
+        job_id, tipo, pedido_id = job.id, job.tipo, job.pedido_id
+        try:
+            trabajos = documentos_job(job)
+        except Exception as e:
+            db.session.rollback()
+            confirmar_job(job_id, False, f'Error generando documento: {e}')
+            continue
+        if not trabajos:
+            confirmar_job(job_id, False, 'Sin documentos para imprimir')
+            continue
+        entregados.append({'id': job_id, 'tipo': tipo, 'pedido_id': pedido_id, 'trabajos': trabajos})
+
+    cuerpo, headers = codificar_json(
+        {'ok': True, 'jobs': entregados},
+        comprimir='gzip' in request.accept_encodings,
+    )
+    response = make_response(cuerpo)
+    response.headers.update(headers)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+@api_print_bp.post('/ack')
+def ack_jobs():
+    """Resultado de los trabajos retirados: {"resultados": [{"id", "ok", "error"}]}"""
+    if not _printhost_autorizado():
+        return jsonify({'ok': False, 'error': 'No autorizado'}), 401
+
+    data = request.get_json(silent=True) or {}
+    confirmados = []
+    try:
+        for resultado in data.get('resultados') or []:
+            job_id = int(resultado.get('id'))
+            if confirmar_job(job_id, resultado.get('ok'), resultado.get('error')):
+                confirmados.append(job_id)
+    except (TypeError, ValueError):
+        return jsonify({'ok': False, 'error': 'resultados inválidos'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'ok': False, 'error': str(e)}), 500
+
+    return jsonify({'ok': True, 'confirmados': confirmados})
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from src.models.AtributoProducto_model import AtributoProducto
 from src.models.ValorAtributo_model import ValorAtributo
 from utils.db import db
+from utils.catalogo import invalidar_extras
 from forms import AtributoForm, ValorAtributoForm
 
 atributos_bp = Blueprint('atributos', __name__, url_prefix='/atributos')
@@ -35,6 +36,7 @@ def create_atributo():
             )
             db.session.add(atributo)
             db.session.commit()
+            invalidar_extras()
             flash('Atributo creado exitosamente', 'success')
             return redirect(url_for('atributos.get_atributos'))
         except Exception as e:
@@ -60,6 +62,7 @@ def update_atributo(id):
             atributo.orden = form.orden.data or 0
             
             db.session.commit()
+            invalidar_extras()
             flash('Atributo actualizado exitosamente', 'success')
             return redirect(url_for('atributos.get_atributos'))
         except Exception as e:
@@ -76,6 +79,7 @@ def delete_atributo(id):
         atributo = AtributoProducto.query.get_or_404(id)
         atributo.estado = 0 if atributo.estado else 1
         db.session.commit()
+        invalidar_extras()
         
         mensaje = "Atributo restaurado" if atributo.estado else "Atributo eliminado"
         flash(mensaje, 'success')
@@ -116,6 +120,7 @@ def create_valor(atributo_id):
             )
             db.session.add(valor)
             db.session.commit()
+            invalidar_extras()
             flash('Valor creado exitosamente', 'success')
             return redirect(url_for('atributos.get_valores', atributo_id=atributo_id))
         except Exception as e:
@@ -141,6 +146,7 @@ def update_valor(atributo_id, valor_id):
             valor.orden = form.orden.data or 0
             
             db.session.commit()
+            invalidar_extras()
             flash('Valor actualizado exitosamente', 'success')
             return redirect(url_for('atributos.get_valores', atributo_id=atributo_id))
         except Exception as e:
@@ -157,6 +163,7 @@ def delete_valor(atributo_id, valor_id):
         valor = ValorAtributo.query.get_or_404(valor_id)
         valor.estado = 0 if valor.estado else 1
         db.session.commit()
+        invalidar_extras()
         
         mensaje = "Valor restaurado" if valor.estado else "Valor eliminado"
         flash(mensaje, 'success')
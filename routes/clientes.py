@@ -3,6 +3,7 @@ from src.models.Cliente_model import Cliente
 from src.models.Persona_model import Persona
 from src.models.Documento_model import Documento
 from utils.db import db
+from utils.eventos import notificar_cambio
 from forms import ClienteForm
 
 clientes_bp = Blueprint('clientes', __name__, url_prefix="/clientes")
@@ -75,6 +76,8 @@ def update_cliente(cliente_id):
                 persona.documento_id = form.documento_id.data
                 persona.numero_documento = form.numero_documento.data
 
+                # Nombre, dirección y teléfono se muestran en el tablero de delivery
+                notificar_cambio('delivery', 1, 2, 3)
                 db.session.commit()
                 flash("Cliente actualizado exitosamente", "success")
                 return redirect(url_for("clientes.get_clientes"))
@@ -5,14 +5,24 @@ import uuid
 from src.models.Persona_model import Persona
 from src.models.Cliente_model import Cliente
 from src.models.repartidores_model import Repartidor
-from src.models.Producto_model import Producto, ProductoAtributo
+from src.models.Producto_model import Producto
 from src.models.Venta_model import Venta
 from src.models.Venta_model import ProductoVenta
-from src.models.AtributoProducto_model import AtributoProducto
-from src.models.ValorAtributo_model import ValorAtributo
 from src.models.MetodoPago_model import MetodoPago
 from utils.db import db
-from utils.printer import get_printer
+from utils.print_queue import encolar_impresion
+from utils.comprobantes import numero_venta, numero_comprobante, nombre_comprobante
+from utils.pedidos import guardar_venta, insertar_lineas, recalcular_total, eliminar_lineas
+from utils.tableros import pedidos_delivery, respuesta_tablero
+from utils.eventos import notificar_cambio, respuesta_stream
+from utils.catalogo import (
+    extras_producto, resumen_extras, tiene_extras,
+    productos_activos, respuesta_fragmento_catalogo
+)
+from utils.carritos import (
+    obtener_carrito, guardar_carrito, eliminar_carrito,
+    CarritoPedido, respuesta_cambio_carrito
+)
 from forms import DeliveryForm
 
 delivery_bp = Blueprint('delivery', __name__, url_prefix='/delivery')
@@ -88,15 +98,12 @@ def save():
             
 
             # Inicializar carrito en sesión
-            session['carrito'] = {}
+            guardar_carrito('carrito', {})
             session['cliente_data'] = cliente_data
             session['pedido_data'] = pedido_data
             session['costo_envio'] = envio
             
-            productos = Producto.query.filter_by(estado=1).all()
-
             return render_template('ventas/delivery/_partials/carrito_optimizado.html', 
-                                 productos=productos, 
                                  cliente=cliente_data,
                                  carrito_items=[],
                                  pedido=pedido_data,
@@ -111,6 +118,17 @@ def save():
     return jsonify({'error': 'Formulario inválido', 'errors': form.errors}), 400
 
 
+# Grilla de productos del carrito (fragmento cacheable con ETag)
+@delivery_bp.route('/grilla_productos', methods=['GET'])
+def grilla_productos():
+    return respuesta_fragmento_catalogo(
+        'delivery/grilla_productos',
+        lambda: render_template('ventas/delivery/_partials/grilla_productos.html',
+                                productos=productos_activos(),
+                                extras=resumen_extras())
+    )
+
+
 # Ruta para agregar un producto al carrito
 @delivery_bp.route('/agregar_al_carrito', methods=['POST'])
 def agregar_al_carrito():
@@ -128,8 +146,7 @@ def agregar_al_carrito():
     except:
         extras = []
     
-    # Obtener carrito de sesión
-    carrito = session.get('carrito', {})
+    carrito = CarritoPedido('carrito')
     
     # Si tiene extras, crear una entrada única para cada combinación
     if extras:
@@ -140,51 +157,31 @@ def agregar_al_carrito():
         extras_texto = ', '.join([e['valor'] for e in extras])
         nombre_completo = f"{nombre} ({extras_texto})"
         
-        carrito[item_key] = {
+        carrito.agregar(item_key, {
             'id': producto_id,
             'item_key': item_key,
             'nombre': nombre_completo,
             'nombre_base': nombre,
             'precio': precio,
             'precio_base': precio_base,
-            'cantidad': 1,
             'extras': extras
-        }
+        })
     else:
-        # Sin extras: comportamiento normal
-        if producto_id in carrito and not carrito[producto_id].get('extras'):
-            carrito[producto_id]['cantidad'] += 1
-        else:
-            carrito[producto_id] = {
-                'id': producto_id,
-                'item_key': producto_id,
-                'nombre': nombre,
-                'nombre_base': nombre,
-                'precio': precio,
-                'precio_base': precio,
-                'cantidad': 1,
-                'extras': []
-            }
-    
-    session['carrito'] = carrito
-    
-    # Calcular totales
-    carrito_items = []
-    subtotal = 0
+        # Sin extras: suma una unidad a la línea del producto
+        item_key = producto_id
+        carrito.agregar(item_key, {
+            'id': producto_id,
+            'item_key': producto_id,
+            'nombre': nombre,
+            'nombre_base': nombre,
+            'precio': precio,
+            'precio_base': precio,
+            'extras': []
+        })
     
-    for item in carrito.values():
-        item['subtotal'] = item['precio'] * item['cantidad']
-        subtotal += item['subtotal']
-        carrito_items.append(item)
+    carrito.guardar()
     
-    envio = session.get('costo_envio', 0)
-    total = subtotal + envio
-
-    return render_template('ventas/delivery/_partials/carrito_items.html',
-                         carrito_items=carrito_items,
-                         subtotal=subtotal,
-                         envio=envio,
-                         total=total)
+    return render_cambio_carrito(carrito, item_key)
 
 
 # Ruta para obtener los atributos de un producto (API JSON)
@@ -192,47 +189,8 @@ def agregar_al_carrito():
 def get_atributos_producto(producto_id):
     """Devuelve los atributos disponibles para un producto en formato JSON"""
     try:
-        # Obtener la relación producto-atributos
-        producto_atributos = ProductoAtributo.query.filter_by(
-            producto_id=producto_id
-        ).order_by(ProductoAtributo.orden_producto).all()
-        
-        atributos_data = []
-        
-        for pa in producto_atributos:
-            if not pa.es_visible:
-                continue
-                
-            atributo = pa.atributo
-            if not atributo or atributo.estado != 1:
-                continue
-            
-            # Obtener valores disponibles del atributo
-            valores = ValorAtributo.query.filter_by(
-                atributo_id=atributo.id,
-                disponible=True,
-                estado=1
-            ).order_by(ValorAtributo.orden).all()
-            
-            valores_data = []
-            for v in valores:
-                valores_data.append({
-                    'id': v.id,
-                    'valor': v.valor,
-                    'descripcion': v.descripcion or '',
-                    'precio_adicional': float(v.precio_adicional or 0)
-                })
-            
-            if valores_data:  # Solo agregar si tiene valores disponibles
-                atributos_data.append({
-                    'id': atributo.id,
-                    'nombre': atributo.nombre,
-                    'descripcion': atributo.descripcion or '',
-                    'tipo': atributo.tipo,
-                    'es_multiple': atributo.es_multiple,
-                    'es_obligatorio': atributo.es_obligatorio,
-                    'valores': valores_data
-                })
+        # Catálogo de extras en memoria (utils/catalogo.py)
+        atributos_data = extras_producto(producto_id)
         
         return jsonify({
             'success': True,
@@ -251,11 +209,7 @@ def get_atributos_producto(producto_id):
 @delivery_bp.route('/tiene_atributos/<int:producto_id>')
 def tiene_atributos(producto_id):
     """Verifica rápidamente si un producto tiene atributos configurados"""
-    count = ProductoAtributo.query.filter_by(
-        producto_id=producto_id,
-        es_visible=True
-    ).count()
-    return jsonify({'tiene_atributos': count > 0})
+    return jsonify({'tiene_atributos': tiene_extras(producto_id)})
 
 
 # Ruta para actualizar la cantidad de un producto en el carrito
@@ -264,74 +218,79 @@ def actualizar_cantidad():
     item_id = request.form.get('item_id')
     accion = request.form.get('accion')
     
-    carrito = session.get('carrito', {})
+    carrito = CarritoPedido('carrito')
     
-    if item_id in carrito:
-        if accion == 'aumentar':
-            carrito[item_id]['cantidad'] += 1
-        elif accion == 'disminuir':
-            carrito[item_id]['cantidad'] -= 1
-            if carrito[item_id]['cantidad'] <= 0:
-                del carrito[item_id]
+    if accion == 'aumentar':
+        carrito.cambiar_cantidad(item_id, 1)
+    elif accion == 'disminuir':
+        carrito.cambiar_cantidad(item_id, -1)
     
-    session['carrito'] = carrito
+    carrito.guardar()
     
-    # Recalcular y renderizar
-    return render_carrito_actualizado()
+    return render_cambio_carrito(carrito, item_id)
 
 
 # Ruta para eliminar un producto del carrito
 @delivery_bp.route('/eliminar_del_carrito/<item_id>', methods=['DELETE'])
 def eliminar_del_carrito(item_id):
-    carrito = session.get('carrito', {})
-    if item_id in carrito:
-        del carrito[item_id]
-    session['carrito'] = carrito
+    carrito = CarritoPedido('carrito')
+    carrito.quitar(item_id)
+    carrito.guardar()
     
-    return render_carrito_actualizado()
+    return render_cambio_carrito(carrito, item_id)
 
 
 # Función auxiliar para renderizar el carrito actualizado
-def render_carrito_actualizado():
-    carrito = session.get('carrito', {})
-    carrito_items = []
-    subtotal = 0
-    
-    for item in carrito.values():
-        item['subtotal'] = item['precio'] * item['cantidad']
-        subtotal += item['subtotal']
-        carrito_items.append(item)
+def render_carrito_actualizado(carrito=None):
+    if carrito is None:
+        carrito = CarritoPedido('carrito')
     
     envio = session.get('costo_envio', 0)
-    total = subtotal + envio
+    total = carrito.subtotal + envio
 
     return render_template('ventas/delivery/_partials/carrito_items.html',
-                         carrito_items=carrito_items,
-                         subtotal=subtotal,
+                         carrito_items=carrito.lineas(),
+                         subtotal=carrito.subtotal,
                          envio=envio,
                          total=total)
 
 
+# Responde un cambio de línea: solo la línea + totales, o el carrito completo
+def render_cambio_carrito(carrito, item_key):
+    envio = session.get('costo_envio', 0)
+    return respuesta_cambio_carrito(
+        carrito, item_key,
+        render_completo=lambda: render_carrito_actualizado(carrito),
+        render_linea=lambda item: render_template(
+            'ventas/delivery/_partials/carrito_linea.html', item=item),
+        render_totales=lambda: render_template(
+            'ventas/delivery/_partials/carrito_totales.html',
+            oob=True,
+            carrito_items=carrito.lineas(),
+            subtotal=carrito.subtotal,
+            envio=envio,
+            total=carrito.subtotal + envio)
+    )
+
+
 # Ruta para guardar el pedido para que quede en estado "En preparación"
 @delivery_bp.route('/finalizar_pedido', methods=['POST'])
 def finalizar_pedido():
-    import json
-    
     try:
-        carrito = session.get('carrito', {})
+        carrito = CarritoPedido('carrito')
         cliente_data = session.get('cliente_data', {})
         pedido_data = session.get('pedido_data', {})
         envio = session.get('costo_envio', 0)
         
-        if not carrito:
+        if carrito.vacio:
             return jsonify({'error': 'Carrito vacío'}), 400
         
         # Crear venta
         venta = Venta(
             fecha_hora=datetime.now(),
             impuesto=0.19,
-            numero_comprobante=f"V-{datetime.now().strftime('%Y%m%d%H%M%S')}",
-            total=sum(item['precio'] * item['cantidad'] for item in carrito.values()),
+            numero_comprobante=numero_venta(),
+            total=carrito.subtotal,
             estado=1,
             cliente_id=cliente_data.get('id'),
             user_id=1,
@@ -342,45 +301,20 @@ def finalizar_pedido():
             comentarios=pedido_data.get('comentarios'),
             tiempo_estimado=pedido_data.get('tiempo_estimado')
         )
-        db.session.add(venta)
-        db.session.flush()
-        
-        # Agregar productos con extras
-        for item in carrito.values():
-            # Serializar extras a JSON si existen
-            atributos_json = None
-            if item.get('extras') and len(item['extras']) > 0:
-                atributos_json = json.dumps(item['extras'])
-            
-            # Extraer el ID real del producto (puede venir como "123" o "123_uuid")
-            producto_id_real = str(item['id']).split('_')[0]
-            
-            producto_venta = ProductoVenta(
-                venta_id=venta.id,
-                producto_id=int(producto_id_real),
-                cantidad=item['cantidad'],
-                precio_venta=item['precio'],
-                descuento=0,
-                atributos_seleccionados=atributos_json
-            )
-            db.session.add(producto_venta)
+        # Venta + todas sus líneas (un solo INSERT multi-fila) en la misma transacción
+        guardar_venta(venta, carrito.lineas())
         
+        notificar_cambio('delivery', 1)
         db.session.commit()
         
-        # ====== IMPRIMIR COMANDA PARA COCINA ======
-        try:
-            from utils.printer import get_printer_by_profile
-            printer = get_printer_by_profile(perfil='cocina', tipo='comanda')
-            # Convertir carrito a lista para la impresora
-            items_para_imprimir = list(carrito.values())
-            printer.imprimir_comanda_cocina(venta, items_para_imprimir, "DELIVERY")
-        except Exception as e:
-            # Si falla la impresión, no afecta el pedido
-            print(f"Error al imprimir comanda delivery: {str(e)}")
+        # ====== COMANDA PARA COCINA (cola de impresión) ======
+        # Se imprime en segundo plano: si falla, no afecta el pedido
+        encolar_impresion('comanda', venta.id, perfil='cocina', tipo_impresora='comanda',
+                          datos={'items': carrito.lineas(), 'tipo_pedido': 'DELIVERY'})
         # ==========================================
         
         # Limpiar sesión
-        session.pop('carrito', None)
+        eliminar_carrito('carrito')
         session.pop('cliente_data', None)
         session.pop('pedido_data', None)
         session.pop('costo_envio', None)
@@ -454,28 +388,22 @@ def detalle_pedido(pedido_id):
 @delivery_bp.route('/pedidos_estado/<estado>', methods=['GET'])
 def ventas_estado(estado):
     try:
-        from datetime import datetime, date
         # Convertir el estado a un entero
         estado = int(estado)
 
-        # Filtrar las ventas de delivery según el estado
-        # tipoventa_id=2 para delivery
-        query = Venta.query.filter(
-            Venta.estado_delivery == estado,
-            Venta.tipoventa_id == 2
-        )
-        
-        # Si es estado 3 (entregados), filtrar solo los del día actual
-        if estado == 3:
-            hoy = date.today()
-            query = query.filter(db.func.date(Venta.fecha_hora) == hoy)
-        
-        ventas = query.order_by(Venta.fecha_hora.desc()).all()
-
-        # Renderizar un fragmento de HTML con las ventas
-        return render_template('ventas/delivery/_partials/pedidos.html', ventas=ventas)
+        # 304 si el tablero no cambió; si no, filas planas con
+        # cliente/persona/repartidor ya resueltos
+        return respuesta_tablero('delivery', estado, lambda: render_template(
+            'ventas/delivery/_partials/pedidos.html', ventas=pedidos_delivery(estado)
+        ))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+@delivery_bp.route('/eventos', methods=['GET'])
+def eventos():
+    """Stream SSE con los cambios de pedidos para refrescar el tablero"""
+    return respuesta_stream('delivery')
     
 
 @delivery_bp.route('/cambiar_estado/<int:pedido_id>/<int:nuevo_estado>', methods=['POST'])
@@ -504,18 +432,12 @@ def cambiar_estado(pedido_id, nuevo_estado):
 
         # Actualizar el estado
         pedido.estado_delivery = nuevo_estado
+        notificar_cambio('delivery', estado_anterior, nuevo_estado)
         db.session.commit()
 
-        # Si se envía (estado 2), imprimir comprobante para el repartidor
+        # Si se envía (estado 2), imprimir comprobante para el repartidor (cola de impresión)
         if nuevo_estado == 2:
-            try:
-                from flask import current_app
-                cliente = Cliente.query.get(pedido.cliente_id) if pedido.cliente_id else None
-                productos = ProductoVenta.query.filter_by(venta_id=pedido_id).all()
-                printer = get_printer(current_app)
-                printer.imprimir_comprobante_delivery(pedido, cliente, productos)
-            except Exception as e:
-                print(f"Error al imprimir comprobante delivery: {str(e)}")
+            encolar_impresion('comprobante_delivery', pedido_id)
 
         # Detectar desde dónde se llamó
         hx_target = request.headers.get('HX-Target', '')
@@ -585,11 +507,9 @@ def cobrar_pedido(pedido_id):
                 pedido.referencia_pago = referencia_pago
         
         # Generar número de comprobante
-        from src.models.Comprobante_model import Comprobante
-        comprobante = Comprobante.query.get(tipo_comprobante_id)
-        tipo_prefijo = "B" if str(tipo_comprobante_id) == "1" else "F"
-        pedido.numero_comprobante = f"{tipo_prefijo}-{pedido.id:06d}"
+        pedido.numero_comprobante = numero_comprobante(tipo_comprobante_id)
         
+        notificar_cambio('delivery', pedido.estado_delivery)
         db.session.commit()
         
         # NO imprimir al cobrar - se imprime al enviar
@@ -602,7 +522,7 @@ def cobrar_pedido(pedido_id):
             render_template('ventas/delivery/_partials/estado_pedido.html',
                           pedido=pedido,
                           pago_exitoso=True,
-                          comprobante=comprobante)
+                          tipo_comprobante=nombre_comprobante(tipo_comprobante_id))
         )
         # Refrescar tabla de pendientes ya que el pedido sigue ahí pero ahora está pagado
         response.headers['HX-Trigger'] = 'refresh-pendientes'
@@ -644,9 +564,9 @@ def actualizar_producto_pedido(pedido_id, producto_id):
                 db.session.delete(producto_venta)
         
         # Recalcular total del pedido
-        productos_restantes = ProductoVenta.query.filter_by(venta_id=pedido_id).all()
-        pedido.total = sum(float(p.precio_venta) * p.cantidad for p in productos_restantes)
+        recalcular_total(pedido)
         
+        notificar_cambio('delivery', 1)
         db.session.commit()
         
         # Retornar el partial actualizado
@@ -675,9 +595,9 @@ def eliminar_producto_pedido(pedido_id, producto_id):
         db.session.delete(producto_venta)
         
         # Recalcular total
-        productos_restantes = ProductoVenta.query.filter_by(venta_id=pedido_id).all()
-        pedido.total = sum(float(p.precio_venta) * p.cantidad for p in productos_restantes)
+        recalcular_total(pedido)
         
+        notificar_cambio('delivery', 1)
         db.session.commit()
         
         return _render_items_pedido(pedido_id)
@@ -703,8 +623,8 @@ def _render_items_pedido(pedido_id):
                 producto.atributos_seleccionados = []
     
     # Obtener carrito temporal y items pendientes de eliminar de la sesión
-    carrito_temporal = session.get(f'carrito_temp_{pedido_id}', {})
-    items_pendientes_eliminar = session.get(f'eliminar_{pedido_id}', [])
+    carrito_temporal = obtener_carrito(f'carrito_temp_{pedido_id}', {})
+    items_pendientes_eliminar = obtener_carrito(f'eliminar_{pedido_id}', [])
     
     # Convertir carrito temporal a lista con keys incluidas
     carrito_lista = []
@@ -729,11 +649,9 @@ def productos_disponibles(pedido_id):
         if not pedido or pedido.estado_delivery != 1:
             return '', 403
         
-        # Obtener productos activos
-        productos = Producto.query.filter_by(estado=1).all()
-        
         return render_template('ventas/delivery/_partials/productos_disponibles.html',
-                              productos=productos,
+                              productos=productos_activos(),
+                              extras=resumen_extras(),
                               pedido_id=pedido_id)
         
     except Exception as e:
@@ -778,10 +696,9 @@ def agregar_producto_pedido(pedido_id):
             db.session.add(nuevo_producto)
         
         # Recalcular total del pedido
-        db.session.flush()
-        productos_pedido = ProductoVenta.query.filter_by(venta_id=pedido_id).all()
-        pedido.total = sum(float(p.precio_venta) * p.cantidad for p in productos_pedido)
+        recalcular_total(pedido)
         
+        notificar_cambio('delivery', 1)
         db.session.commit()
         
         return _render_items_pedido(pedido_id)
@@ -819,7 +736,7 @@ def carrito_temp_agregar(pedido_id):
         
         # Obtener carrito temporal de la sesión
         carrito_key = f'carrito_temp_{pedido_id}'
-        carrito = session.get(carrito_key, {})
+        carrito = obtener_carrito(carrito_key, {})
         
         # Generar una clave única para cada combinación producto+extras
         item_key = f"{producto_id}_{uuid.uuid4().hex[:8]}"
@@ -833,7 +750,7 @@ def carrito_temp_agregar(pedido_id):
             'extras': extras
         }
         
-        session[carrito_key] = carrito
+        guardar_carrito(carrito_key, carrito)
         
         return _render_items_pedido(pedido_id)
         
@@ -845,11 +762,11 @@ def carrito_temp_agregar(pedido_id):
 def carrito_temp_aumentar(pedido_id, item_key):
     """Aumenta cantidad de un producto en el carrito temporal"""
     carrito_key = f'carrito_temp_{pedido_id}'
-    carrito = session.get(carrito_key, {})
+    carrito = obtener_carrito(carrito_key, {})
     
     if item_key in carrito:
         carrito[item_key]['cantidad'] += 1
-        session[carrito_key] = carrito
+        guardar_carrito(carrito_key, carrito)
     
     return _render_items_pedido(pedido_id)
 
@@ -858,13 +775,13 @@ def carrito_temp_aumentar(pedido_id, item_key):
 def carrito_temp_disminuir(pedido_id, item_key):
     """Disminuye cantidad de un producto en el carrito temporal"""
     carrito_key = f'carrito_temp_{pedido_id}'
-    carrito = session.get(carrito_key, {})
+    carrito = obtener_carrito(carrito_key, {})
     
     if item_key in carrito:
         carrito[item_key]['cantidad'] -= 1
         if carrito[item_key]['cantidad'] <= 0:
             del carrito[item_key]
-        session[carrito_key] = carrito
+        guardar_carrito(carrito_key, carrito)
     
     return _render_items_pedido(pedido_id)
 
@@ -873,11 +790,11 @@ def carrito_temp_disminuir(pedido_id, item_key):
 def carrito_temp_eliminar(pedido_id, item_key):
     """Elimina un producto del carrito temporal"""
     carrito_key = f'carrito_temp_{pedido_id}'
-    carrito = session.get(carrito_key, {})
+    carrito = obtener_carrito(carrito_key, {})
     
     if item_key in carrito:
         del carrito[item_key]
-        session[carrito_key] = carrito
+        guardar_carrito(carrito_key, carrito)
     
     return _render_items_pedido(pedido_id)
 
@@ -891,12 +808,13 @@ def confirmar_productos(pedido_id):
             return jsonify({'error': 'Pedido no válido'}), 403
         
         carrito_key = f'carrito_temp_{pedido_id}'
-        carrito = session.get(carrito_key, {})
+        carrito = obtener_carrito(carrito_key, {})
         
         if not carrito:
             return _render_items_pedido(pedido_id)
         
         productos_agregados = []
+        lineas = []
         
         for item in carrito.values():
             producto_id = int(item['id'])
@@ -904,15 +822,14 @@ def confirmar_productos(pedido_id):
             precio_total = item.get('precio_total', item['precio'])
             
             # Siempre crear un nuevo registro para respetar los extras únicos
-            nuevo_producto = ProductoVenta(
-                venta_id=pedido_id,
-                producto_id=producto_id,
-                cantidad=item['cantidad'],
-                precio_venta=precio_total,  # Precio incluye extras
-                descuento=0,
-                atributos_seleccionados=extras if extras else None
-            )
-            db.session.add(nuevo_producto)
+            lineas.append({
+                'venta_id': pedido_id,
+                'producto_id': producto_id,
+                'cantidad': item['cantidad'],
+                'precio_venta': precio_total,  # Precio incluye extras
+                'descuento': 0,
+                'atributos_seleccionados': extras if extras else None,
+            })
             
             productos_agregados.append({
                 'nombre': item['nombre'],
@@ -920,23 +837,20 @@ def confirmar_productos(pedido_id):
                 'extras': extras
             })
         
+        insertar_lineas(lineas)
+        
         # Recalcular total
-        db.session.flush()
-        productos_pedido = ProductoVenta.query.filter_by(venta_id=pedido_id).all()
-        pedido.total = sum(float(p.precio_venta) * p.cantidad for p in productos_pedido)
+        recalcular_total(pedido)
         
+        notificar_cambio('delivery', 1)
         db.session.commit()
         
-        # Imprimir comanda con productos agregados
-        try:
-            from utils.printer import get_printer_by_profile
-            printer = get_printer_by_profile(perfil='cocina', tipo='comanda')
-            printer.imprimir_comanda_agregados(pedido, productos_agregados)
-        except Exception as e:
-            print(f"Error al imprimir comanda: {str(e)}")
+        # Imprimir comanda con productos agregados (cola de impresión)
+        encolar_impresion('agregados', pedido.id, perfil='cocina', tipo_impresora='comanda',
+                          datos={'productos': productos_agregados})
         
         # Limpiar carrito temporal
-        session.pop(carrito_key, None)
+        eliminar_carrito(carrito_key)
         
         # Retornar con trigger para actualizar resumen de pago
         response = make_response(_render_items_pedido(pedido_id))
@@ -954,11 +868,11 @@ def confirmar_productos(pedido_id):
 def marcar_eliminar(pedido_id, producto_id):
     """Marca un producto para eliminar (sin eliminar aún)"""
     eliminar_key = f'eliminar_{pedido_id}'
-    items_eliminar = session.get(eliminar_key, [])
+    items_eliminar = obtener_carrito(eliminar_key, [])
     
     if producto_id not in items_eliminar:
         items_eliminar.append(producto_id)
-        session[eliminar_key] = items_eliminar
+        guardar_carrito(eliminar_key, items_eliminar)
     
     return _render_items_pedido(pedido_id)
 
@@ -967,11 +881,11 @@ def marcar_eliminar(pedido_id, producto_id):
 def desmarcar_eliminar(pedido_id, producto_id):
     """Desmarca un producto de la lista de eliminación"""
     eliminar_key = f'eliminar_{pedido_id}'
-    items_eliminar = session.get(eliminar_key, [])
+    items_eliminar = obtener_carrito(eliminar_key, [])
     
     if producto_id in items_eliminar:
         items_eliminar.remove(producto_id)
-        session[eliminar_key] = items_eliminar
+        guardar_carrito(eliminar_key, items_eliminar)
     
     return _render_items_pedido(pedido_id)
 
@@ -998,7 +912,7 @@ def confirmar_eliminacion(pedido_id):
             return jsonify({'error': 'Pedido no válido'}), 403
         
         eliminar_key = f'eliminar_{pedido_id}'
-        items_eliminar = session.get(eliminar_key, [])
+        items_eliminar = obtener_carrito(eliminar_key, [])
         
         if not items_eliminar:
             return _render_items_pedido(pedido_id)
@@ -1013,34 +927,21 @@ def confirmar_eliminacion(pedido_id):
             response.headers['HX-Reswap'] = 'none'
             return response
         
-        productos_eliminados = []
-        
-        for producto_id in items_eliminar:
-            producto_venta = ProductoVenta.query.get(producto_id)
-            if producto_venta and producto_venta.venta_id == pedido_id:
-                productos_eliminados.append({
-                    'nombre': producto_venta.producto.nombre,
-                    'cantidad': producto_venta.cantidad
-                })
-                db.session.delete(producto_venta)
+        # Nombres para la comanda + borrado en un SELECT y un DELETE
+        productos_eliminados = eliminar_lineas(pedido_id, items_eliminar)
         
         # Recalcular total
-        db.session.flush()
-        productos_restantes = ProductoVenta.query.filter_by(venta_id=pedido_id).all()
-        pedido.total = sum(float(p.precio_venta) * p.cantidad for p in productos_restantes)
+        recalcular_total(pedido)
         
+        notificar_cambio('delivery', 1)
         db.session.commit()
         
-        # Imprimir comanda de eliminación
-        try:
-            from utils.printer import get_printer_by_profile
-            printer = get_printer_by_profile(perfil='cocina', tipo='comanda')
-            printer.imprimir_comanda_eliminados(pedido, productos_eliminados)
-        except Exception as e:
-            print(f"Error al imprimir comanda eliminación: {str(e)}")
+        # Imprimir comanda de eliminación (cola de impresión)
+        encolar_impresion('eliminados', pedido.id, perfil='cocina', tipo_impresora='comanda',
+                          datos={'productos': productos_eliminados})
         
         # Limpiar lista de eliminación
-        session.pop(eliminar_key, None)
+        eliminar_carrito(eliminar_key)
         
         # Retornar con trigger para actualizar resumen de pago
         response = make_response(_render_items_pedido(pedido_id))
@@ -1067,11 +968,12 @@ def confirmar_eliminacion_total(pedido_id):
         pedido.estado_delivery = 0
         pedido.total = 0
         
+        notificar_cambio('delivery', 1)
         db.session.commit()
         
         # Limpiar sesión
-        session.pop(f'eliminar_{pedido_id}', None)
-        session.pop(f'carrito_temp_{pedido_id}', None)
+        eliminar_carrito(f'eliminar_{pedido_id}')
+        eliminar_carrito(f'carrito_temp_{pedido_id}')
         
         # Redirigir a la lista de pedidos
         response = make_response('', 200)
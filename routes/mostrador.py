@@ -2,13 +2,22 @@ from flask import Blueprint, request, jsonify, render_template, session, flash,
 from datetime import datetime
 from src.models.Persona_model import Persona
 from src.models.Cliente_model import Cliente
-from src.models.Producto_model import Producto, ProductoAtributo
 from src.models.Venta_model import Venta, ProductoVenta, TipoVenta
-from src.models.AtributoProducto_model import AtributoProducto
-from src.models.ValorAtributo_model import ValorAtributo
 from src.models.MetodoPago_model import MetodoPago
 from utils.db import db
-from utils.printer import get_printer
+from utils.print_queue import encolar_impresion
+from utils.comprobantes import numero_venta, numero_comprobante
+from utils.pedidos import guardar_venta, insertar_lineas, recalcular_total, eliminar_lineas
+from utils.tableros import pedidos_mostrador, respuesta_tablero
+from utils.eventos import notificar_cambio, respuesta_stream
+from utils.catalogo import (
+    extras_producto, resumen_extras, tiene_extras,
+    productos_activos, respuesta_fragmento_catalogo
+)
+from utils.carritos import (
+    obtener_carrito, guardar_carrito, eliminar_carrito,
+    CarritoPedido, respuesta_cambio_carrito
+)
 from forms import MostradorForm
 import json
 import uuid
@@ -27,10 +36,8 @@ def index():
 def nuevo_pedido():
     """Muestra el formulario para nuevo pedido en mostrador"""
     form = MostradorForm()
-    productos = Producto.query.filter_by(estado=1).all()
     return render_template('ventas/mostrador/_partials/nuevo_pedido.html', 
-                         form=form, 
-                         productos=productos)
+                         form=form)
 
 
 @mostrador_bp.route('/crear_pedido', methods=['POST'])
@@ -44,14 +51,11 @@ def crear_pedido():
             cliente_nombre = form.cliente.data if form.cliente.data else "Cliente Mostrador"
             
             # Inicializar carrito en sesión
-            session['carrito_mostrador'] = {}
+            guardar_carrito('carrito_mostrador', {})
             session['cliente_mostrador'] = cliente_nombre
             session['comentarios_mostrador'] = form.comentarios.data
             
-            productos = Producto.query.filter_by(estado=1).all()
-
             return render_template('ventas/mostrador/_partials/carrito.html', 
-                                 productos=productos, 
                                  cliente=cliente_nombre,
                                  carrito_items=[],
                                  subtotal=0,
@@ -62,6 +66,17 @@ def crear_pedido():
     return jsonify({'error': 'Formulario inválido'}), 400
 
 
+@mostrador_bp.route('/grilla_productos', methods=['GET'])
+def grilla_productos():
+    """Grilla de productos del carrito (fragmento cacheable con ETag)"""
+    return respuesta_fragmento_catalogo(
+        'mostrador/grilla_productos',
+        lambda: render_template('ventas/mostrador/_partials/grilla_productos.html',
+                                productos=productos_activos(),
+                                extras=resumen_extras())
+    )
+
+
 @mostrador_bp.route('/agregar_producto', methods=['POST'])
 def agregar_producto():
     """Agrega un producto al carrito del mostrador"""
@@ -79,8 +94,7 @@ def agregar_producto():
     except:
         extras = []
     
-    # Obtener carrito de sesión
-    carrito = session.get('carrito_mostrador', {})
+    carrito = CarritoPedido('carrito_mostrador')
     
     # Si tiene extras, crear una entrada única para cada combinación
     if extras:
@@ -91,35 +105,31 @@ def agregar_producto():
         extras_texto = ', '.join([e['valor'] for e in extras])
         nombre_completo = f"{nombre} ({extras_texto})"
         
-        carrito[item_key] = {
+        carrito.agregar(item_key, {
             'id': producto_id,
             'item_key': item_key,
             'nombre': nombre_completo,
             'nombre_base': nombre,
             'precio': precio,
             'precio_base': precio_base,
-            'cantidad': 1,
             'extras': extras
-        }
+        })
     else:
-        # Sin extras: comportamiento normal
-        if producto_id in carrito and not carrito[producto_id].get('extras'):
-            carrito[producto_id]['cantidad'] += 1
-        else:
-            carrito[producto_id] = {
-                'id': producto_id,
-                'item_key': producto_id,
-                'nombre': nombre,
-                'nombre_base': nombre,
-                'precio': precio,
-                'precio_base': precio,
-                'cantidad': 1,
-                'extras': []
-            }
+        # Sin extras: suma una unidad a la línea del producto
+        item_key = producto_id
+        carrito.agregar(item_key, {
+            'id': producto_id,
+            'item_key': producto_id,
+            'nombre': nombre,
+            'nombre_base': nombre,
+            'precio': precio,
+            'precio_base': precio,
+            'extras': []
+        })
     
-    session['carrito_mostrador'] = carrito
+    carrito.guardar()
     
-    return render_carrito_mostrador()
+    return render_cambio_carrito_mostrador(carrito, item_key)
 
 
 # Ruta para obtener los atributos de un producto (API JSON)
@@ -127,47 +137,8 @@ def agregar_producto():
 def get_atributos_producto(producto_id):
     """Devuelve los atributos disponibles para un producto en formato JSON"""
     try:
-        # Obtener la relación producto-atributos
-        producto_atributos = ProductoAtributo.query.filter_by(
-            producto_id=producto_id
-        ).order_by(ProductoAtributo.orden_producto).all()
-        
-        atributos_data = []
-        
-        for pa in producto_atributos:
-            if not pa.es_visible:
-                continue
-                
-            atributo = pa.atributo
-            if not atributo or atributo.estado != 1:
-                continue
-            
-            # Obtener valores disponibles del atributo
-            valores = ValorAtributo.query.filter_by(
-                atributo_id=atributo.id,
-                disponible=True,
-                estado=1
-            ).order_by(ValorAtributo.orden).all()
-            
-            valores_data = []
-            for v in valores:
-                valores_data.append({
-                    'id': v.id,
-                    'valor': v.valor,
-                    'descripcion': v.descripcion or '',
-                    'precio_adicional': float(v.precio_adicional or 0)
-                })
-            
-            if valores_data:  # Solo agregar si tiene valores disponibles
-                atributos_data.append({
-                    'id': atributo.id,
-                    'nombre': atributo.nombre,
-                    'descripcion': atributo.descripcion or '',
-                    'tipo': atributo.tipo,
-                    'es_multiple': atributo.es_multiple,
-                    'es_obligatorio': atributo.es_obligatorio,
-                    'valores': valores_data
-                })
+        # Catálogo de extras en memoria (utils/catalogo.py)
+        atributos_data = extras_producto(producto_id)
         
         return jsonify({
             'success': True,
@@ -186,11 +157,7 @@ def get_atributos_producto(producto_id):
 @mostrador_bp.route('/tiene_atributos/<int:producto_id>')
 def tiene_atributos(producto_id):
     """Verifica rápidamente si un producto tiene atributos configurados"""
-    count = ProductoAtributo.query.filter_by(
-        producto_id=producto_id,
-        es_visible=True
-    ).count()
-    return jsonify({'tiene_atributos': count > 0})
+    return jsonify({'tiene_atributos': tiene_extras(producto_id)})
 
 
 @mostrador_bp.route('/actualizar_cantidad', methods=['POST'])
@@ -199,118 +166,97 @@ def actualizar_cantidad():
     item_id = request.form.get('item_id')
     accion = request.form.get('accion')
     
-    carrito = session.get('carrito_mostrador', {})
+    carrito = CarritoPedido('carrito_mostrador')
     
-    if item_id in carrito:
-        if accion == 'aumentar':
-            carrito[item_id]['cantidad'] += 1
-        elif accion == 'disminuir':
-            carrito[item_id]['cantidad'] -= 1
-            if carrito[item_id]['cantidad'] <= 0:
-                del carrito[item_id]
+    if accion == 'aumentar':
+        carrito.cambiar_cantidad(item_id, 1)
+    elif accion == 'disminuir':
+        carrito.cambiar_cantidad(item_id, -1)
     
-    session['carrito_mostrador'] = carrito
+    carrito.guardar()
     
-    return render_carrito_mostrador()
+    return render_cambio_carrito_mostrador(carrito, item_id)
 
 
 @mostrador_bp.route('/eliminar_producto/<item_id>', methods=['DELETE'])
 def eliminar_producto(item_id):
     """Elimina un producto del carrito"""
-    carrito = session.get('carrito_mostrador', {})
-    if item_id in carrito:
-        del carrito[item_id]
-    session['carrito_mostrador'] = carrito
+    carrito = CarritoPedido('carrito_mostrador')
+    carrito.quitar(item_id)
+    carrito.guardar()
     
-    return render_carrito_mostrador()
+    return render_cambio_carrito_mostrador(carrito, item_id)
 
 
-def render_carrito_mostrador():
+def render_carrito_mostrador(carrito=None):
     """Función auxiliar para renderizar el carrito actualizado"""
-    carrito = session.get('carrito_mostrador', {})
-    carrito_items = []
-    subtotal = 0
-    
-    for item in carrito.values():
-        item['subtotal'] = item['precio'] * item['cantidad']
-        subtotal += item['subtotal']
-        carrito_items.append(item)
+    if carrito is None:
+        carrito = CarritoPedido('carrito_mostrador')
     
-    total = subtotal  # Sin envío en mostrador
+    total = carrito.subtotal  # Sin envío en mostrador
 
     return render_template('ventas/mostrador/_partials/carrito_items.html',
-                         carrito_items=carrito_items,
-                         subtotal=subtotal,
+                         carrito_items=carrito.lineas(),
+                         subtotal=carrito.subtotal,
                          total=total)
 
 
+def render_cambio_carrito_mostrador(carrito, item_key):
+    """Responde un cambio de línea: solo la línea + totales, o el carrito completo"""
+    return respuesta_cambio_carrito(
+        carrito, item_key,
+        render_completo=lambda: render_carrito_mostrador(carrito),
+        render_linea=lambda item: render_template(
+            'ventas/mostrador/_partials/carrito_linea.html', item=item),
+        render_totales=lambda: render_template(
+            'ventas/mostrador/_partials/carrito_totales.html',
+            oob=True,
+            carrito_items=carrito.lineas(),
+            subtotal=carrito.subtotal,
+            total=carrito.subtotal)
+    )
+
+
 @mostrador_bp.route('/guardar_pedido', methods=['POST'])
 def guardar_pedido():
     """Guarda el pedido en la base de datos"""
-    import json
-    
     try:
-        carrito = session.get('carrito_mostrador', {})
+        carrito = CarritoPedido('carrito_mostrador')
         cliente_nombre = session.get('cliente_mostrador', 'Cliente Mostrador')
         comentarios = session.get('comentarios_mostrador', '')
         
-        if not carrito:
+        if carrito.vacio:
             return jsonify({'error': 'El carrito está vacío'}), 400
         
-        # Calcular total
-        total = sum(item['precio'] * item['cantidad'] for item in carrito.values())
+        # Total mantenido por el carrito en cada cambio
+        total = carrito.subtotal
         
         # Crear la venta
         venta = Venta(
             fecha_hora=datetime.now(),
             total=total,
             impuesto=0.19,
-            numero_comprobante=f"V-{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            numero_comprobante=numero_venta(),
             estado=1,  # Activo
             estado_mostrador=1,  # 1=En Preparación
             estado_delivery=0,  # No aplica para mostrador
             tipoventa_id=1,  # 1=Mostrador
             comentarios=cliente_nombre
         )
-        db.session.add(venta)
-        db.session.flush()
-        
-        # Agregar productos a la venta con extras
-        for item in carrito.values():
-            # Serializar extras a JSON si existen
-            atributos_json = None
-            if item.get('extras') and len(item['extras']) > 0:
-                atributos_json = json.dumps(item['extras'])
-            
-            # Extraer el ID real del producto (puede venir como "123" o "123_uuid")
-            producto_id_real = str(item['id']).split('_')[0]
-            
-            producto_venta = ProductoVenta(
-                venta_id=venta.id,
-                producto_id=int(producto_id_real),
-                cantidad=item['cantidad'],
-                precio_venta=item['precio'],
-                descuento=0,
-                atributos_seleccionados=atributos_json
-            )
-            db.session.add(producto_venta)
+        # Venta + todas sus líneas (un solo INSERT multi-fila) en la misma transacción
+        guardar_venta(venta, carrito.lineas())
         
+        notificar_cambio('mostrador', 1)
         db.session.commit()
         
-        # ====== IMPRIMIR COMANDA PARA COCINA ======
-        try:
-            from utils.printer import get_printer_by_profile
-            printer = get_printer_by_profile(perfil='cocina', tipo='comanda')
-            # Convertir carrito a lista para la impresora
-            items_para_imprimir = list(carrito.values())
-            printer.imprimir_comanda_cocina(venta, items_para_imprimir, "MOSTRADOR")
-        except Exception as e:
-            # Si falla la impresión, no afecta el pedido
-            print(f"Error al imprimir comanda: {str(e)}")
+        # ====== COMANDA PARA COCINA (cola de impresión) ======
+        # Se imprime en segundo plano: si falla, no afecta el pedido
+        encolar_impresion('comanda', venta.id, perfil='cocina', tipo_impresora='comanda',
+                          datos={'items': carrito.lineas(), 'tipo_pedido': 'MOSTRADOR'})
         # ==========================================
         
         # Limpiar sesión
-        session.pop('carrito_mostrador', None)
+        eliminar_carrito('carrito_mostrador')
         session.pop('cliente_mostrador', None)
         session.pop('comentarios_mostrador', None)
         
@@ -333,37 +279,20 @@ def guardar_pedido():
 def pedidos_estado(estado):
     """Obtiene los pedidos según su estado"""
     try:
-        from datetime import datetime, date
-        # Filtrar las ventas de mostrador según el estado
-        # tipoventa_id=1 para mostrador
-        hoy = date.today()
-        
-        if estado == 3:
-            # "Pagados" ahora es estado de pago independiente del estado_mostrador
-            # Filtrar solo los del día actual
-            ventas = Venta.query.filter(
-                Venta.tipoventa_id == 1,
-                Venta.comprobante_id.isnot(None),
-                db.func.date(Venta.fecha_hora) == hoy
-            ).order_by(Venta.fecha_hora.desc()).all()
-        elif estado == 2:
-            # "Listos" - también filtrar solo los del día actual
-            ventas = Venta.query.filter(
-                Venta.estado_mostrador == estado,
-                Venta.tipoventa_id == 1,
-                db.func.date(Venta.fecha_hora) == hoy
-            ).order_by(Venta.fecha_hora.desc()).all()
-        else:
-            ventas = Venta.query.filter(
-                Venta.estado_mostrador == estado,
-                Venta.tipoventa_id == 1
-            ).order_by(Venta.fecha_hora.desc()).all()
-
-        return render_template('ventas/mostrador/_partials/pedidos.html', ventas=ventas)
+        # 304 si el tablero no cambió; si no, filas planas en una sola consulta
+        return respuesta_tablero('mostrador', estado, lambda: render_template(
+            'ventas/mostrador/_partials/pedidos.html', ventas=pedidos_mostrador(estado)
+        ))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@mostrador_bp.route('/eventos', methods=['GET'])
+def eventos():
+    """Stream SSE con los cambios de pedidos para refrescar el tablero"""
+    return respuesta_stream('mostrador')
+
+
 @mostrador_bp.route('/detalle_pedido/<int:pedido_id>', methods=['GET'])
 def detalle_pedido(pedido_id):
     """Muestra el detalle de un pedido"""
@@ -400,6 +329,10 @@ def cambiar_estado(pedido_id, nuevo_estado):
 
         # Actualizar el estado
         pedido.estado_mostrador = nuevo_estado
+        # "Pagados" lista los pedidos cobrados en cualquier estado_mostrador
+        # y muestra el botón "Listo" según ese estado
+        pagados = 3 if pedido.comprobante_id else None
+        notificar_cambio('mostrador', estado_anterior, nuevo_estado, pagados)
         db.session.commit()
 
         # Detectar desde dónde se llamó
@@ -419,7 +352,8 @@ def cambiar_estado(pedido_id, nuevo_estado):
             triggers.append('refresh-preparacion')
         if estado_anterior == 2 or nuevo_estado == 2:
             triggers.append('refresh-listos')
-        # El estado "pagado" ahora es independiente del estado_mostrador
+        if pagados:
+            triggers.append('refresh-pagados')
         
         if triggers:
             response.headers['HX-Trigger'] = ', '.join(triggers)
@@ -463,21 +397,14 @@ def cobrar_pedido(pedido_id):
             if referencia_pago:
                 pedido.referencia_pago = referencia_pago
         
-        # Generar número de comprobante
-        from src.models.Comprobante_model import Comprobante
-        comprobante = Comprobante.query.get(tipo_comprobante_id)
-        tipo_prefijo = "B" if tipo_comprobante_id == 1 else "F"
-        pedido.numero_comprobante = f"{tipo_prefijo}-{pedido.id:06d}"
+        # Número de boleta/factura desde su secuencia
+        pedido.numero_comprobante = numero_comprobante(tipo_comprobante_id)
         
+        notificar_cambio('mostrador', pedido.estado_mostrador, 3)
         db.session.commit()
         
-        # Imprimir recibo de venta
-        try:
-            from flask import current_app
-            printer = get_printer(current_app)
-            printer.imprimir_pedido_mostrador(pedido, items)
-        except Exception as e:
-            print(f"Error al imprimir recibo: {str(e)}")
+        # Imprimir recibo de venta (cola de impresión)
+        encolar_impresion('recibo_mostrador', pedido.id)
         
         # Retornar actualización del estado y refrescar tablas
         response = make_response(
@@ -508,8 +435,8 @@ def _render_items_pedido_mostrador(pedido_id):
                 producto.atributos_seleccionados = []
     
     # Obtener carrito temporal y items pendientes de eliminar de la sesión
-    carrito_temporal = session.get(f'carrito_temp_mostrador_{pedido_id}', {})
-    items_pendientes_eliminar = session.get(f'eliminar_mostrador_{pedido_id}', [])
+    carrito_temporal = obtener_carrito(f'carrito_temp_mostrador_{pedido_id}', {})
+    items_pendientes_eliminar = obtener_carrito(f'eliminar_mostrador_{pedido_id}', [])
     
     # Convertir carrito temporal a lista con keys incluidas
     carrito_lista = []
@@ -559,11 +486,9 @@ def productos_disponibles(pedido_id):
         if pedido.estado_mostrador != 1 or pedido.comprobante_id:
             return '', 403
         
-        # Obtener productos activos
-        productos = Producto.query.filter_by(estado=1).all()
-        
         return render_template('ventas/mostrador/_partials/productos_disponibles.html',
-                              productos=productos,
+                              productos=productos_activos(),
+                              extras=resumen_extras(),
                               pedido_id=pedido_id)
         
     except Exception as e:
@@ -598,7 +523,7 @@ def carrito_temp_agregar(pedido_id):
         
         # Obtener carrito temporal de la sesión
         carrito_key = f'carrito_temp_mostrador_{pedido_id}'
-        carrito = session.get(carrito_key, {})
+        carrito = obtener_carrito(carrito_key, {})
         
         # Generar una clave única para cada combinación producto+extras
         item_key = f"{producto_id}_{uuid.uuid4().hex[:8]}"
@@ -612,7 +537,7 @@ def carrito_temp_agregar(pedido_id):
             'extras': extras
         }
         
-        session[carrito_key] = carrito
+        guardar_carrito(carrito_key, carrito)
         
         return _render_items_pedido_mostrador(pedido_id)
         
@@ -624,11 +549,11 @@ def carrito_temp_agregar(pedido_id):
 def carrito_temp_aumentar(pedido_id, item_key):
     """Aumenta cantidad de un producto en el carrito temporal"""
     carrito_key = f'carrito_temp_mostrador_{pedido_id}'
-    carrito = session.get(carrito_key, {})
+    carrito = obtener_carrito(carrito_key, {})
     
     if item_key in carrito:
         carrito[item_key]['cantidad'] += 1
-        session[carrito_key] = carrito
+        guardar_carrito(carrito_key, carrito)
     
     return _render_items_pedido_mostrador(pedido_id)
 
@@ -637,13 +562,13 @@ def carrito_temp_aumentar(pedido_id, item_key):
 def carrito_temp_disminuir(pedido_id, item_key):
     """Disminuye cantidad de un producto en el carrito temporal"""
     carrito_key = f'carrito_temp_mostrador_{pedido_id}'
-    carrito = session.get(carrito_key, {})
+    carrito = obtener_carrito(carrito_key, {})
     
     if item_key in carrito:
         carrito[item_key]['cantidad'] -= 1
         if carrito[item_key]['cantidad'] <= 0:
             del carrito[item_key]
-        session[carrito_key] = carrito
+        guardar_carrito(carrito_key, carrito)
     
     return _render_items_pedido_mostrador(pedido_id)
 
@@ -652,11 +577,11 @@ def carrito_temp_disminuir(pedido_id, item_key):
 def carrito_temp_eliminar(pedido_id, item_key):
     """Elimina un producto del carrito temporal"""
     carrito_key = f'carrito_temp_mostrador_{pedido_id}'
-    carrito = session.get(carrito_key, {})
+    carrito = obtener_carrito(carrito_key, {})
     
     if item_key in carrito:
         del carrito[item_key]
-        session[carrito_key] = carrito
+        guardar_carrito(carrito_key, carrito)
     
     return _render_items_pedido_mostrador(pedido_id)
 
@@ -670,12 +595,13 @@ def confirmar_productos(pedido_id):
             return jsonify({'error': 'Pedido no válido'}), 403
         
         carrito_key = f'carrito_temp_mostrador_{pedido_id}'
-        carrito = session.get(carrito_key, {})
+        carrito = obtener_carrito(carrito_key, {})
         
         if not carrito:
             return _render_items_pedido_mostrador(pedido_id)
         
         productos_agregados = []
+        lineas = []
         
         for item in carrito.values():
             producto_id = int(item['id'])
@@ -683,15 +609,14 @@ def confirmar_productos(pedido_id):
             precio_total = item.get('precio_total', item['precio'])
             
             # Siempre crear un nuevo registro para respetar los extras únicos
-            nuevo_producto = ProductoVenta(
-                venta_id=pedido_id,
-                producto_id=producto_id,
-                cantidad=item['cantidad'],
-                precio_venta=precio_total,  # Precio incluye extras
-                descuento=0,
-                atributos_seleccionados=extras if extras else None
-            )
-            db.session.add(nuevo_producto)
+            lineas.append({
+                'venta_id': pedido_id,
+                'producto_id': producto_id,
+                'cantidad': item['cantidad'],
+                'precio_venta': precio_total,  # Precio incluye extras
+                'descuento': 0,
+                'atributos_seleccionados': extras if extras else None,
+            })
             
             productos_agregados.append({
                 'nombre': item['nombre'],
@@ -699,23 +624,20 @@ def confirmar_productos(pedido_id):
                 'extras': extras
             })
         
+        insertar_lineas(lineas)
+        
         # Recalcular total
-        db.session.flush()
-        productos_pedido = ProductoVenta.query.filter_by(venta_id=pedido_id).all()
-        pedido.total = sum(float(p.precio_venta) * p.cantidad for p in productos_pedido)
+        recalcular_total(pedido)
         
+        notificar_cambio('mostrador', 1)
         db.session.commit()
         
-        # Imprimir comanda con productos agregados
-        try:
-            from utils.printer import get_printer_by_profile
-            printer = get_printer_by_profile(perfil='cocina', tipo='comanda')
-            printer.imprimir_comanda_agregados(pedido, productos_agregados)
-        except Exception as e:
-            print(f"Error al imprimir comanda: {str(e)}")
+        # Imprimir comanda con productos agregados (cola de impresión)
+        encolar_impresion('agregados', pedido.id, perfil='cocina', tipo_impresora='comanda',
+                          datos={'productos': productos_agregados})
         
         # Limpiar carrito temporal
-        session.pop(carrito_key, None)
+        eliminar_carrito(carrito_key)
         
         # Retornar con trigger para actualizar resumen de pago
         response = make_response(_render_items_pedido_mostrador(pedido_id))
@@ -733,11 +655,11 @@ def confirmar_productos(pedido_id):
 def marcar_eliminar(pedido_id, producto_id):
     """Marca un producto para eliminar (sin eliminar aún)"""
     eliminar_key = f'eliminar_mostrador_{pedido_id}'
-    items_eliminar = session.get(eliminar_key, [])
+    items_eliminar = obtener_carrito(eliminar_key, [])
     
     if producto_id not in items_eliminar:
         items_eliminar.append(producto_id)
-        session[eliminar_key] = items_eliminar
+        guardar_carrito(eliminar_key, items_eliminar)
     
     return _render_items_pedido_mostrador(pedido_id)
 
@@ -746,11 +668,11 @@ def marcar_eliminar(pedido_id, producto_id):
 def desmarcar_eliminar(pedido_id, producto_id):
     """Desmarca un producto de la lista de eliminación"""
     eliminar_key = f'eliminar_mostrador_{pedido_id}'
-    items_eliminar = session.get(eliminar_key, [])
+    items_eliminar = obtener_carrito(eliminar_key, [])
     
     if producto_id in items_eliminar:
         items_eliminar.remove(producto_id)
-        session[eliminar_key] = items_eliminar
+        guardar_carrito(eliminar_key, items_eliminar)
     
     return _render_items_pedido_mostrador(pedido_id)
 
@@ -764,7 +686,7 @@ def confirmar_eliminacion(pedido_id):
             return jsonify({'error': 'Pedido no válido'}), 403
         
         eliminar_key = f'eliminar_mostrador_{pedido_id}'
-        items_eliminar = session.get(eliminar_key, [])
+        items_eliminar = obtener_carrito(eliminar_key, [])
         
         if not items_eliminar:
             return _render_items_pedido_mostrador(pedido_id)
@@ -784,34 +706,21 @@ def confirmar_eliminacion(pedido_id):
             }
             return ('', 200, headers)
         
-        productos_eliminados = []
-        
-        for producto_id in items_eliminar:
-            producto_venta = ProductoVenta.query.get(producto_id)
-            if producto_venta and producto_venta.venta_id == pedido_id:
-                productos_eliminados.append({
-                    'nombre': producto_venta.producto.nombre,
-                    'cantidad': producto_venta.cantidad
-                })
-                db.session.delete(producto_venta)
+        # Nombres para la comanda + borrado en un SELECT y un DELETE
+        productos_eliminados = eliminar_lineas(pedido_id, items_eliminar)
         
         # Recalcular total
-        db.session.flush()
-        productos_restantes = ProductoVenta.query.filter_by(venta_id=pedido_id).all()
-        pedido.total = sum(float(p.precio_venta) * p.cantidad for p in productos_restantes)
+        recalcular_total(pedido)
         
+        notificar_cambio('mostrador', 1)
         db.session.commit()
         
-        # Imprimir comanda de eliminación
-        try:
-            from utils.printer import get_printer_by_profile
-            printer = get_printer_by_profile(perfil='cocina', tipo='comanda')
-            printer.imprimir_comanda_eliminados(pedido, productos_eliminados)
-        except Exception as e:
-            print(f"Error al imprimir comanda eliminación: {str(e)}")
+        # Imprimir comanda de eliminación (cola de impresión)
+        encolar_impresion('eliminados', pedido.id, perfil='cocina', tipo_impresora='comanda',
+                          datos={'productos': productos_eliminados})
         
         # Limpiar lista de eliminación
-        session.pop(eliminar_key, None)
+        eliminar_carrito(eliminar_key)
         
         # Retornar con trigger para actualizar resumen de pago
         response = make_response(_render_items_pedido_mostrador(pedido_id))
@@ -831,20 +740,19 @@ def confirmar_eliminacion_total(pedido_id):
         if not pedido or pedido.estado_mostrador != 1 or pedido.comprobante_id:
             return jsonify({'error': 'Pedido no válido'}), 403
 
-        # Eliminar todos los productos del pedido
-        productos = ProductoVenta.query.filter_by(venta_id=pedido_id).all()
-        for prod in productos:
-            db.session.delete(prod)
+        # Eliminar todos los productos del pedido (un solo DELETE)
+        ProductoVenta.query.filter_by(venta_id=pedido_id).delete()
 
         # Cancelar pedido (estado 0) y total 0
         pedido.estado_mostrador = 0
         pedido.total = 0
 
+        notificar_cambio('mostrador', 1)
         db.session.commit()
 
         # Limpiar lista de eliminación
         eliminar_key = f'eliminar_mostrador_{pedido_id}'
-        session.pop(eliminar_key, None)
+        eliminar_carrito(eliminar_key)
 
         # Redirigir al listado de mostrador para evitar estados intermedios
         headers = {
@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from utils.db import db
 from src.models.Printer_model import Printer
+from utils.printer_manager import invalidar_rutas
 
 printers_bp = Blueprint('printers', __name__, url_prefix='/printers')
 
@@ -45,6 +46,7 @@ def add():
             )
             db.session.add(printer)
             db.session.commit()
+            invalidar_rutas()
             flash('Impresora creada correctamente', 'success')
             return redirect(url_for('printers.index'))
         except Exception as e:
@@ -74,6 +76,7 @@ def update(printer_id: int):
             printer.cortar_papel = data.get('cortar_papel') == 'on'
             printer.feed_lines = int(data.get('feed_lines', printer.feed_lines) or printer.feed_lines)
             db.session.commit()
+            invalidar_rutas()
             flash('Impresora actualizada', 'success')
             return redirect(url_for('printers.index'))
         except Exception as e:
@@ -88,6 +91,7 @@ def delete(printer_id: int):
     try:
         printer.estado = 0
         db.session.commit()
+        invalidar_rutas()
         flash('Impresora desactivada', 'warning')
     except Exception as e:
         db.session.rollback()
@@ -101,6 +105,7 @@ def activate(printer_id: int):
     try:
         printer.estado = 1
         db.session.commit()
+        invalidar_rutas()
         flash('Impresora activada', 'success')
     except Exception as e:
         db.session.rollback()
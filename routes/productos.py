@@ -7,6 +7,7 @@ from src.models.Categoria_model import Categoria
 from src.models.AtributoProducto_model import AtributoProducto
 
 from utils.db import db
+from utils.catalogo import invalidar_catalogo
 from forms import ProductoForm
 
 productos_bp = Blueprint('productos', __name__ , url_prefix='/productos')
@@ -86,6 +87,7 @@ def create_producto():
                         db.session.add(producto_atributo)
                         
                     db.session.commit()
+                    invalidar_catalogo()
                     flash('Producto creado exitosamente', 'success')
                     return redirect(url_for('productos.get_productos'))
                 except Exception as e:
@@ -174,6 +176,7 @@ def update_producto(id):
                 db.session.add(producto_atributo)
 
             db.session.commit()
+            invalidar_catalogo()
             flash('Producto actualizado exitosamente', 'success')
             return redirect(url_for('productos.get_productos'))
 
@@ -187,6 +190,7 @@ def delete_producto(id):
         # Cambiar el estado
         producto.estado = 0 if producto.estado else 1
         db.session.commit()
+        invalidar_catalogo()
 
         mensaje = "Producto restaurado" if producto.estado else "Producto eliminado"
         flash(mensaje, 'success')
@@ -7,6 +7,9 @@ from src.models.Venta_model import Venta, ProductoVenta
 from src.models.Cliente_model import Cliente
 from src.models.Persona_model import Persona
 from utils.db import db
+from utils.catalogo import productos_activos
+from utils.comprobantes import numero_venta
+from utils.eventos import notificar_cambio
 
 pruebas_bp = Blueprint('pruebas', __name__, url_prefix='/pruebas')
 
@@ -54,7 +57,7 @@ def detalle_pedido(venta_id):
             return jsonify({'error': 'Pedido no encontrado'}), 404
 
         # Obtener todos los productos disponibles para agregar
-        productos_disponibles = Producto.query.filter_by(estado=1).all()
+        productos_disponibles = productos_activos()
 
         # Normalizar datos del cliente
         cliente_data = {
@@ -207,7 +210,7 @@ def guardar_pedido():
         venta = Venta(
             fecha_hora=db.func.current_timestamp(),
             impuesto=0.19,
-            numero_comprobante=f"V-{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            numero_comprobante=numero_venta(),
             total=sum(float(p['precio']) * int(p['cantidad']) for p in productos),
             estado=1,
             cliente_id=cliente_id,  # Usar el cliente_id guardado
@@ -228,6 +231,7 @@ def guardar_pedido():
             )
             db.session.add(producto_venta)
         
+        notificar_cambio('delivery', 1)
         db.session.commit()
         
         # Limpiar el cliente_id de la sesión
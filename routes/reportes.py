@@ -1,10 +1,11 @@
 from datetime import datetime, date, timedelta
-from flask import Blueprint, render_template, request
+from flask import Blueprint, render_template, request, jsonify
 from sqlalchemy import func, or_
 from utils.db import db
 from forms import ReporteVentasForm
 from src.models.Venta_model import Venta
 from src.models.MetodoPago_model import MetodoPago
+from utils.pedidos import verificar_totales
 
 
 reportes_bp = Blueprint('reportes', __name__, url_prefix='/reportes')
@@ -157,3 +158,30 @@ def ventas():
         es_venta_activa=_es_venta_activa,
     )
 
+
+@reportes_bp.route('/verificar_totales', methods=['GET'])
+def verificar_totales_ventas():
+    """
+    Ventas cuyo total no coincide con la suma de sus líneas (solo informe,
+    no modifica ventas). Query params: desde, hasta (YYYY-MM-DD, ambos
+    incluidos), limite (máx 2000).
+    """
+    try:
+        desde = request.args.get('desde')
+        hasta = request.args.get('hasta')
+        desde = datetime.strptime(desde, '%Y-%m-%d') if desde else None
+        hasta = datetime.strptime(hasta, '%Y-%m-%d') + timedelta(days=1) if hasta else None
+    except ValueError:
+        return jsonify({'ok': False, 'error': 'Fechas en formato YYYY-MM-DD'}), 400
+    limite = min(request.args.get('limite', 500, type=int), 2000)
+
+    try:
+        diferencias = verificar_totales(desde, hasta, limite)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'ok': False, 'error': str(e)}), 500
+    return jsonify({
+        'ok': True,
+        'cantidad': len(diferencias),
+        'ventas': diferencias,
+    })
@@ -0,0 +1,19 @@
+from datetime import datetime
+from utils.db import db
+
+
+class CarritoSesion(db.Model):
+    """
+    Carritos en curso guardados en el servidor (ver utils/carritos.py).
+    La clave combina el identificador del navegador y el nombre del carrito.
+    """
+    __tablename__ = 'carritos_sesion'
+
+    clave = db.Column(db.String(120), primary_key=True)
+    datos = db.Column(db.Text, nullable=False)  # JSON serializado
+    expira_en = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f'<CarritoSesion {self.clave}>'
@@ -0,0 +1,46 @@
+from datetime import datetime
+from utils.db import db
+
+
+class PrintJob(db.Model):
+    """
+    Trabajo de impresión en cola (ver utils/print_queue.py).
+    Las rutas lo registran después del commit y un hilo de fondo lo imprime,
+    con reintentos; así la respuesta al cajero no espera a la impresora.
+    """
+    __tablename__ = 'print_jobs'
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    # comanda | agregados | eliminados | recibo_mostrador | comprobante_delivery
+    tipo = db.Column(db.String(30), nullable=False)
+    pedido_id = db.Column(db.BigInteger, nullable=True, index=True)
+    perfil = db.Column(db.String(30), nullable=True)  # None = impresora de config
+    tipo_impresora = db.Column(db.String(30), nullable=True)
+    datos = db.Column(db.Text, nullable=True)  # JSON con items ya resueltos
+    # pendiente | imprimiendo | ok | error
+    estado = db.Column(db.String(15), nullable=False, default='pendiente', index=True)
+    intentos = db.Column(db.SmallInteger, nullable=False, default=0)
+    max_intentos = db.Column(db.SmallInteger, nullable=False, default=3)
+    error = db.Column(db.String(255), nullable=True)
+    proximo_intento = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f'<PrintJob {self.id} {self.tipo} pedido={self.pedido_id} {self.estado}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'pedido_id': self.pedido_id,
+            'perfil': self.perfil,
+            'tipo_impresora': self.tipo_impresora,
+            'estado': self.estado,
+            'intentos': self.intentos,
+            'max_intentos': self.max_intentos,
+            'error': self.error,
+            'proximo_intento': self.proximo_intento.isoformat() if self.proximo_intento else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
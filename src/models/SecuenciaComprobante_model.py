@@ -0,0 +1,17 @@
+from datetime import datetime
+from utils.db import db
+
+
+class SecuenciaComprobante(db.Model):
+    """
+    Próximo número libre por prefijo de comprobante (V, B, F).
+    Los workers reservan bloques de números (ver utils/comprobantes.py).
+    """
+    __tablename__ = 'secuencias_comprobante'
+
+    prefijo = db.Column(db.String(5), primary_key=True)
+    siguiente = db.Column(db.BigInteger, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f'<SecuenciaComprobante {self.prefijo} {self.siguiente}>'
@@ -0,0 +1,18 @@
+from datetime import datetime
+from utils.db import db
+
+
+class TableroVersion(db.Model):
+    """
+    Contador de cambios por tablero (canal + estado).
+    Permite responder 304 a los polls sin consultar la tabla ventas.
+    """
+    __tablename__ = 'tablero_versiones'
+
+    canal = db.Column(db.String(20), primary_key=True)  # mostrador | delivery
+    estado = db.Column(db.SmallInteger, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f'<TableroVersion {self.canal}:{self.estado} v{self.version}>'
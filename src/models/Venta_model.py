@@ -79,6 +79,15 @@ class Venta(db.Model):
     comentarios = db.Column(db.String(50), nullable=True)
     tiempo_estimado = db.Column(db.String(15), nullable=True)
     
+    # Números únicos (utils/comprobantes.py); el índice sirve la búsqueda por número.
+    # Los compuestos siguen los filtros de los tableros (utils/tableros.py)
+    __table_args__ = (
+        db.Index('uq_ventas_numero_comprobante', 'numero_comprobante', unique=True),
+        db.Index('ix_ventas_mostrador', 'tipoventa_id', 'estado_mostrador', 'fecha_hora'),
+        db.Index('ix_ventas_delivery', 'tipoventa_id', 'estado_delivery', 'fecha_hora'),
+        db.Index('ix_ventas_tipo_fecha', 'tipoventa_id', 'fecha_hora'),
+    )
+    
     # Campos de método de pago
     metodo_pago_id = db.Column(db.BigInteger, db.ForeignKey('metodos_pago.id'), nullable=True)
     monto_recibido = db.Column(db.Numeric(12, 2), nullable=True)  # Monto que entregó el cliente (efectivo)
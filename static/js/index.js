@@ -1,3 +1,54 @@
+// Refresco de tableros por Server-Sent Events
+// El servidor envía la lista de eventos HTMX afectados (ej: refresh-preparacion)
+// y cada tabla ya escucha su evento con "from:body".
+function conectarEventosPedidos(url) {
+    if (!window.EventSource) {
+        return null;
+    }
+    const fuente = new EventSource(url);
+    fuente.addEventListener('pedido-cambiado', function (e) {
+        let datos;
+        try {
+            datos = JSON.parse(e.data);
+        } catch (err) {
+            return;
+        }
+        (datos.eventos || []).forEach(function (evento) {
+            htmx.trigger(document.body, evento);
+        });
+    });
+    return fuente;
+}
 
 
+// Columna "Tiempo": se recalcula en el navegador (mismo formato que el filtro
+// timeago), así los tableros pueden responder 304 sin quedar congelados.
+function formatearTranscurrido(segundos) {
+    if (segundos < 60) {
+        return segundos + ' seg';
+    }
+    if (segundos < 3600) {
+        return Math.floor(segundos / 60) + ' min';
+    }
+    if (segundos < 86400) {
+        return Math.floor(segundos / 3600) + 'h ' + Math.floor((segundos % 3600) / 60) + 'min';
+    }
+    return Math.floor(segundos / 86400) + 'd ' + Math.floor((segundos % 86400) / 3600) + 'h';
+}
 
+function actualizarTiempos() {
+    const ahora = Math.floor(Date.now() / 1000);
+    document.querySelectorAll('.tiempo-transcurrido[data-desde]').forEach(function (el) {
+        const segundos = Math.max(0, ahora - parseInt(el.dataset.desde, 10));
+        // Más de 7 días: queda la fecha que dibujó el servidor
+        if (segundos < 604800) {
+            el.textContent = formatearTranscurrido(segundos);
+        }
+    });
+}
+
+document.addEventListener('DOMContentLoaded', function () {
+    actualizarTiempos();
+    setInterval(actualizarTiempos, 30000);
+    document.body.addEventListener('htmx:afterSwap', actualizarTiempos);
+});
@@ -0,0 +1,79 @@
+"""
+Fixtures de las pruebas: una app Flask mínima sobre SQLite en memoria.
+
+No se importa app.py (arma la URI de MySQL y registra Flask-MySQLdb en
+desarrollo); solo los modelos y utils/db. Ejecutar desde la raíz:
+
+    python -m pytest -q tests
+"""
+
+import importlib
+import os
+import pkgutil
+import sys
+from contextlib import contextmanager
+
+import pytest
+from flask import Flask
+from sqlalchemy import BigInteger, event
+from sqlalchemy.ext.compiler import compiles
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+import src.models  # noqa: E402
+from utils.db import db  # noqa: E402
+
+
+@compiles(BigInteger, 'sqlite')
+def _bigint_sqlite(tipo, compilador, **kw):
+    # En SQLite solo INTEGER PRIMARY KEY es autoincremental
+    return 'INTEGER'
+
+
+def _importar_modelos():
+    for modulo in pkgutil.iter_modules(src.models.__path__):
+        importlib.import_module(f"src.models.{modulo.name}")
+
+
+@pytest.fixture
+def app():
+    _importar_modelos()
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI='sqlite://',
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def contar_sentencias(app):
+    """
+    Context manager que junta las sentencias SQL ejecutadas dentro del bloque:
+
+        with contar_sentencias() as sentencias:
+            ...
+        assert len(sentencias) == 1
+    """
+    @contextmanager
+    def contar():
+        sentencias = []
+
+        def registrar(conn, cursor, statement, parameters, context, executemany):
+            sentencias.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', registrar)
+        try:
+            yield sentencias
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', registrar)
+
+    return contar
@@ -0,0 +1,105 @@
+"""
+Avisos de cambios de pedidos (utils/eventos.py): broker en memoria, avisos
+publicados solo después del commit y stream SSE opcional.
+"""
+
+import queue
+from datetime import datetime
+
+import pytest
+
+import utils.eventos as eventos
+from src.models.TableroVersion_model import TableroVersion
+from src.models.Venta_model import Venta
+from utils.db import db
+from utils.eventos import BrokerPedidos, notificar_cambio, respuesta_stream
+
+
+def test_broker_reparte_a_los_suscriptores_del_canal():
+    broker = BrokerPedidos()
+    mostrador = broker.suscribir('mostrador')
+    otra_pestana = broker.suscribir('mostrador')
+    delivery = broker.suscribir('delivery')
+
+    assert broker.publicar('mostrador', ['refresh-listos']) == 2
+
+    assert mostrador.get_nowait() == ['refresh-listos']
+    assert otra_pestana.get_nowait() == ['refresh-listos']
+    assert delivery.empty()
+
+    broker.desuscribir('mostrador', mostrador)
+    broker.desuscribir('mostrador', otra_pestana)
+    assert broker.suscriptores('mostrador') == 0
+    assert broker.publicar('mostrador', ['refresh-listos']) == 0
+
+
+def test_broker_descarta_avisos_de_un_suscriptor_saturado(monkeypatch):
+    monkeypatch.setattr(eventos, 'MAX_PENDIENTES', 2)
+    broker = BrokerPedidos()
+    lento = broker.suscribir('delivery')
+
+    for _ in range(3):
+        broker.publicar('delivery', ['refresh-pendientes'])
+
+    assert lento.qsize() == 2
+
+
+@pytest.fixture
+def suscripcion(app):
+    cola = eventos.broker.suscribir('mostrador')
+    yield cola
+    eventos.broker.desuscribir('mostrador', cola)
+
+
+def _venta():
+    return Venta(id=1, fecha_hora=datetime.now(), impuesto=0, total=1000, estado=1,
+                 tipoventa_id=1, estado_mostrador=1)
+
+
+def test_publica_recien_despues_del_commit(app, suscripcion):
+    db.session.add(_venta())
+    notificar_cambio('mostrador', 1, 2)
+
+    assert suscripcion.empty()
+
+    db.session.commit()
+
+    assert suscripcion.get_nowait() == ['refresh-preparacion', 'refresh-listos']
+    versiones = dict(db.session.query(TableroVersion.estado, TableroVersion.version).filter_by(canal='mostrador'))
+    assert versiones == {1: 1, 2: 1}
+
+
+def test_rollback_descarta_avisos_y_versiones(app, suscripcion):
+    db.session.add(_venta())
+    notificar_cambio('mostrador', 1)
+    db.session.rollback()
+
+    db.session.commit()
+
+    with pytest.raises(queue.Empty):
+        suscripcion.get_nowait()
+    assert db.session.query(TableroVersion).count() == 0
+
+
+def test_stream_desactivado_responde_204(app):
+    app.config['TABLEROS_SSE'] = False
+
+    with app.test_request_context():
+        resp = respuesta_stream('mostrador')
+
+    assert resp.status_code == 204
+
+
+def test_stream_activado_envia_eventos(app):
+    app.config.update(TABLEROS_SSE=True, TABLEROS_SSE_DURACION=0.2)
+
+    with app.test_request_context():
+        resp = respuesta_stream('delivery')
+        assert resp.mimetype == 'text/event-stream'
+        stream = resp.response
+        assert next(stream) == "retry: 3000\n\n"
+        eventos.broker.publicar('delivery', ['refresh-enviados'])
+        assert next(stream) == 'event: pedido-cambiado\ndata: {"eventos": ["refresh-enviados"]}\n\n'
+        stream.close()
+
+    assert eventos.broker.suscriptores('delivery') == 0
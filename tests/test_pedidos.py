@@ -0,0 +1,51 @@
+"""
+Totales de pedidos (utils/pedidos.py).
+"""
+
+from datetime import datetime, timedelta
+
+from src.models.Venta_model import Venta, ProductoVenta
+from utils.db import db
+from utils.pedidos import verificar_totales
+
+
+def test_verificar_totales_informa_sin_modificar(app):
+    ahora = datetime.now()
+    db.session.execute(Venta.__table__.insert(), [
+        {'id': 1, 'fecha_hora': ahora, 'impuesto': 0, 'total': 1000, 'estado': 1, 'estado_delivery': 1,
+         'comprobante_id': None, 'vuelto': None},
+        {'id': 2, 'fecha_hora': ahora, 'impuesto': 0, 'total': 900, 'estado': 1, 'estado_delivery': 1,
+         'comprobante_id': 1, 'vuelto': 100},
+    ])
+    db.session.execute(ProductoVenta.__table__.insert(), [
+        {'id': 1, 'venta_id': 1, 'producto_id': 1, 'cantidad': 2, 'precio_venta': 500, 'descuento': 0},
+        {'id': 2, 'venta_id': 2, 'producto_id': 1, 'cantidad': 2, 'precio_venta': 500, 'descuento': 0},
+    ])
+    db.session.commit()
+
+    diferencias = verificar_totales()
+
+    assert [(d['id'], d['pagado'], d['total'], d['suma_lineas']) for d in diferencias] == [(2, True, 900.0, 1000.0)]
+    assert db.session.get(Venta, 2).total == 900
+
+
+def test_verificar_totales_agrupa_solo_las_lineas_del_rango(app, contar_sentencias):
+    ayer = datetime.now() - timedelta(days=1)
+    hoy = datetime.now()
+    db.session.execute(Venta.__table__.insert(), [
+        {'id': 1, 'fecha_hora': ayer, 'impuesto': 0, 'total': 1, 'estado': 1, 'estado_delivery': 1},
+        {'id': 2, 'fecha_hora': hoy, 'impuesto': 0, 'total': 1, 'estado': 1, 'estado_delivery': 1},
+    ])
+    db.session.execute(ProductoVenta.__table__.insert(), [
+        {'id': 1, 'venta_id': 1, 'producto_id': 1, 'cantidad': 1, 'precio_venta': 500, 'descuento': 0},
+        {'id': 2, 'venta_id': 2, 'producto_id': 1, 'cantidad': 1, 'precio_venta': 700, 'descuento': 0},
+    ])
+    db.session.commit()
+    inicio = hoy.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    with contar_sentencias() as sentencias:
+        diferencias = verificar_totales(desde=inicio, hasta=inicio + timedelta(days=1))
+
+    assert [(d['id'], d['suma_lineas']) for d in diferencias] == [(2, 700.0)]
+    # El rango filtra también la subconsulta que suma producto_venta
+    assert sentencias[0].count('fecha_hora >=') == 2
@@ -0,0 +1,68 @@
+"""
+Plan de las consultas de los tableros (utils/tableros.plan_tableros y
+`flask plan-tableros`): cada estado debe leer ventas por su índice.
+"""
+
+import pytest
+
+import utils.tableros as tableros
+from utils.tableros import plan_tableros, registrar_comandos
+
+INDICES = {
+    ('mostrador', 1): 'ix_ventas_mostrador',
+    ('mostrador', 2): 'ix_ventas_mostrador',
+    ('mostrador', 3): 'ix_ventas_tipo_fecha',
+    ('delivery', 1): 'ix_ventas_delivery',
+    ('delivery', 2): 'ix_ventas_delivery',
+    ('delivery', 3): 'ix_ventas_delivery',
+}
+
+
+def test_consultas_usan_los_indices_de_ventas(app):
+    planes = plan_tableros()
+
+    assert {(p['canal'], p['estado']): p['indices'] for p in planes} == {
+        clave: [indice] for clave, indice in INDICES.items()
+    }
+    assert not any(p['escaneo_completo'] for p in planes)
+
+
+@pytest.fixture
+def explain_stub(monkeypatch):
+    """_explain con filas de MySQL: delivery estado 3 recorre ventas completa"""
+    def explain(query):
+        filtro = str(query.statement.whereclause)
+        completo = 'estado_delivery' in filtro and 'fecha_hora' in filtro
+        return [
+            {'table': 'ventas', 'key': None if completo else 'ix_ventas_delivery',
+             'type': 'ALL' if completo else 'ref', 'rows': 5000 if completo else 12},
+            {'table': 'comprobantes', 'key': 'PRIMARY', 'type': 'eq_ref', 'rows': 1},
+        ]
+    monkeypatch.setattr(tableros, '_explain', explain)
+
+
+def test_plan_marca_escaneo_completo(app, explain_stub):
+    planes = {(p['canal'], p['estado']): p for p in plan_tableros()}
+
+    assert planes[('delivery', 3)]['escaneo_completo']
+    assert planes[('delivery', 3)]['filas'] == [5000]
+    assert not planes[('delivery', 1)]['escaneo_completo']
+    assert planes[('delivery', 1)]['indices'] == ['ix_ventas_delivery']
+
+
+def test_comando_sale_con_1_si_hay_escaneo_completo(app, explain_stub):
+    registrar_comandos(app)
+
+    resultado = app.test_cli_runner().invoke(args=['plan-tableros'])
+
+    assert resultado.exit_code == 1
+    assert 'ESCANEO COMPLETO' in resultado.output
+
+
+def test_comando_sale_con_0_si_usa_los_indices(app):
+    registrar_comandos(app)
+
+    resultado = app.test_cli_runner().invoke(args=['plan-tableros'])
+
+    assert resultado.exit_code == 0, resultado.output
+    assert 'ESCANEO COMPLETO' not in resultado.output
@@ -0,0 +1,99 @@
+"""
+Circuit breaker de MonitorPrintHost (utils/print_client.py) con un reloj
+falso y un PrintHost stub: abrir y cerrar no depende de hilos de fondo.
+"""
+
+import pytest
+
+import utils.print_client as print_client
+from utils.print_client import MonitorPrintHost
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+class RespuestaSalud:
+    status_code = 200
+
+    def json(self):
+        return {'ok': True, 'capacidades': ['gzip']}
+
+
+class SesionStub:
+    """GET /health: responde según `arriba`, anota cada sondeo"""
+
+    def __init__(self):
+        self.arriba = True
+        self.sondeos = 0
+
+    def get(self, url, timeout=None):
+        self.sondeos += 1
+        if not self.arriba:
+            raise print_client.requests.exceptions.ConnectionError('caído')
+        return RespuestaSalud()
+
+
+@pytest.fixture
+def sesion(monkeypatch):
+    sesion = SesionStub()
+    monkeypatch.setattr(print_client, 'sesion_printhost', lambda url: sesion)
+    # Un sondeo en segundo plano haría fallar el conteo: no debe ocurrir
+    monkeypatch.setattr(MonitorPrintHost, '_sondear_en_fondo', lambda self: pytest.fail('sondeo en hilo'))
+    return sesion
+
+
+def _abrir(monitor):
+    monitor.registrar_fallo('timeout')
+    monitor.registrar_fallo('timeout')
+    assert monitor.estado()['estado'] == 'abierto'
+
+
+def test_primer_uso_sondea_en_linea_y_aprende_capacidades(sesion):
+    monitor = MonitorPrintHost('http://printhost', reloj=Reloj())
+
+    assert monitor.disponible()
+    assert sesion.sondeos == 1
+    assert 'gzip' in monitor.capacidades
+
+
+def test_medio_abierto_cierra_el_circuito_si_responde(sesion):
+    reloj = Reloj()
+    monitor = MonitorPrintHost('http://printhost', espera=15, reloj=reloj)
+    monitor.registrar_exito()
+    _abrir(monitor)
+
+    reloj.ahora += 14
+    assert not monitor.disponible()
+    assert sesion.sondeos == 0
+
+    reloj.ahora += 1
+    assert monitor.disponible()
+    assert sesion.sondeos == 1
+    assert monitor.estado()['estado'] == 'cerrado'
+
+
+def test_medio_abierto_reabre_el_circuito_si_falla(sesion):
+    reloj = Reloj()
+    monitor = MonitorPrintHost('http://printhost', espera=15, reloj=reloj)
+    monitor.registrar_exito()
+    _abrir(monitor)
+    sesion.arriba = False
+
+    reloj.ahora += 15
+    assert not monitor.disponible()
+    assert sesion.sondeos == 1
+
+    # La espera vuelve a contar desde la prueba fallida
+    reloj.ahora += 14
+    assert not monitor.disponible()
+    assert sesion.sondeos == 1
+
+    sesion.arriba = True
+    reloj.ahora += 1
+    assert monitor.disponible()
+    assert monitor.estado()['estado'] == 'cerrado'
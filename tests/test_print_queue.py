@@ -0,0 +1,71 @@
+"""
+Cola de impresión (utils/print_queue.py) sin impresora: imprimir_job se
+reemplaza por un stub que anota los trabajos.
+"""
+
+from datetime import datetime
+
+import pytest
+
+import utils.print_queue as print_queue
+from src.models.PrintJob_model import PrintJob
+from utils.db import db
+from utils.print_queue import encolar_impresion, init_cola_impresion, registrar_comandos
+
+
+@pytest.fixture
+def impresos(monkeypatch):
+    impresos = []
+    monkeypatch.setattr(print_queue, 'imprimir_job', lambda job: impresos.append(job.id) or True)
+    return impresos
+
+
+def _cola(app, **config):
+    app.config.update(config)
+    return init_cola_impresion(app)
+
+
+def _pendiente_vencido():
+    job = PrintJob(tipo='comanda', pedido_id=1, estado='pendiente', intentos=1,
+                   proximo_intento=datetime.now(), created_at=datetime.now())
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+def test_sincrono_imprime_solo_el_trabajo_nuevo(app, impresos):
+    _cola(app, PRINT_QUEUE_ASYNC=False)
+    viejo = _pendiente_vencido()
+
+    job_id = encolar_impresion('comanda', 2)
+
+    assert impresos == [job_id]
+    assert db.session.get(PrintJob, viejo).estado == 'pendiente'
+
+
+def test_fallo_al_despachar_no_rompe_el_pedido(app, monkeypatch):
+    _cola(app, PRINT_QUEUE_ASYNC=False)
+
+    def falla(job_id):
+        raise RuntimeError('sin conexión')
+    monkeypatch.setattr(print_queue, 'procesar_job', falla)
+
+    job_id = encolar_impresion('comanda', 1)
+
+    assert job_id is not None
+    assert db.session.get(PrintJob, job_id).estado == 'pendiente'
+
+
+def test_cola_externa_imprime_desde_el_comando(app, impresos):
+    _cola(app, PRINT_QUEUE_ASYNC=False, PRINT_QUEUE_EXTERNA=True)
+    registrar_comandos(app)
+    viejo = _pendiente_vencido()
+
+    job_id = encolar_impresion('comanda', 2)
+    assert impresos == []
+
+    resultado = app.test_cli_runner().invoke(args=['cola-impresion', '--una-vez'])
+
+    assert resultado.exit_code == 0, resultado.output
+    assert impresos == [viejo, job_id]
+    assert {db.session.get(PrintJob, j).estado for j in impresos} == {'ok'}
@@ -0,0 +1,161 @@
+"""
+Cola persistente del PrintHost (app/job_queue.py) y /print/batch de
+app/printer_host.py en Linux, con la impresora reemplazada por un stub.
+"""
+
+import importlib
+import os
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIR_PRINTHOST = os.path.join(RAIZ, 'app')
+if DIR_PRINTHOST not in sys.path:
+    sys.path.insert(0, DIR_PRINTHOST)
+
+from job_queue import JobQueue  # noqa: E402
+
+ESPERA = 5
+
+
+class ImpresoraStub:
+    """imprimir(driver, documentos, titulo) que anota lo impreso; falla las primeras `fallos` veces"""
+
+    def __init__(self, fallos=0, al_fallar=None):
+        self.fallos = fallos
+        self.al_fallar = al_fallar
+        self.impresos = []
+        self._lock = threading.Lock()
+
+    def __call__(self, driver, documentos, titulo):
+        with self._lock:
+            if self.fallos:
+                self.fallos -= 1
+                if self.al_fallar:
+                    self.al_fallar()
+                return {'ok': False, 'error': 'sin papel'}
+            self.impresos.extend(contenido for contenido, feed, cut in documentos)
+        return {'ok': True, 'driver': driver}
+
+
+def _doc(contenido, clave=None):
+    return {'tipo': 'raw', 'driver': 'Stub', 'titulo': 'RAW', 'content': contenido,
+            'feed': 0, 'cut': True, 'clave': clave}
+
+
+@pytest.fixture
+def ruta_cola(tmp_path):
+    return str(tmp_path / 'printhost_jobs.db')
+
+
+@pytest.fixture
+def colas():
+    """Detiene las colas creadas en la prueba"""
+    creadas = []
+    yield creadas
+    for cola in creadas:
+        cola.stop()
+
+
+def _cola(colas, ruta, imprimir, **opciones):
+    cola = JobQueue(ruta, imprimir, **opciones)
+    colas.append(cola)
+    return cola
+
+
+def test_encola_e_imprime(ruta_cola, colas):
+    impresora = ImpresoraStub()
+    cola = _cola(colas, ruta_cola, impresora)
+
+    jobs = cola.enqueue([_doc(b'ticket 1'), _doc(b'ticket 2')])
+    terminados = cola.wait([j['id'] for j in jobs], ESPERA)
+
+    assert [j['estado'] for j in terminados] == ['ok', 'ok']
+    assert impresora.impresos == [b'ticket 1', b'ticket 2']
+
+
+def test_clave_de_idempotencia_no_reimprime(ruta_cola, colas):
+    impresora = ImpresoraStub()
+    cola = _cola(colas, ruta_cola, impresora)
+
+    primero, = cola.enqueue([_doc(b'comanda', clave='printjob-7:comanda')])
+    cola.wait([primero['id']], ESPERA)
+    repetido, = cola.enqueue([_doc(b'comanda', clave='printjob-7:comanda')])
+
+    assert repetido['duplicado'] and repetido['id'] == primero['id']
+    assert cola.wait([repetido['id']], ESPERA)[0]['estado'] == 'ok'
+    assert impresora.impresos == [b'comanda']
+
+
+def test_reintenta_despues_de_un_fallo(ruta_cola, colas):
+    impresora = ImpresoraStub(fallos=1)
+    cola = _cola(colas, ruta_cola, impresora, esperas=(0.05,))
+
+    job, = cola.enqueue([_doc(b'recibo')])
+    terminado, = cola.wait([job['id']], ESPERA)
+
+    assert terminado['estado'] == 'ok'
+    assert terminado['intentos'] == 2
+    assert impresora.impresos == [b'recibo']
+
+
+def test_pendientes_sobreviven_a_reabrir_el_archivo(ruta_cola, colas):
+    # El primer PrintHost falla y se cierra antes de reintentar
+    primera = _cola(colas, ruta_cola, None, esperas=(0.05,))
+    primera.imprimir = ImpresoraStub(fallos=1, al_fallar=primera.stop)
+    job, = primera.enqueue([_doc(b'comanda')])
+    fin = time.monotonic() + ESPERA
+    while primera.get(job['id'])['error'] is None and time.monotonic() < fin:
+        time.sleep(0.01)
+    assert primera.get(job['id'])['estado'] == 'pendiente'
+
+    impresora = ImpresoraStub()
+    segunda = _cola(colas, ruta_cola, impresora)
+    segunda.start()
+
+    assert segunda.wait([job['id']], ESPERA)[0]['estado'] == 'ok'
+    assert impresora.impresos == [b'comanda']
+
+
+@pytest.fixture
+def printer_host(tmp_path, ruta_cola, colas):
+    """app/printer_host.py con win32print de stub y la cola en un archivo temporal"""
+    win32print = types.ModuleType('win32print')
+    win32print.EnumPrinters = lambda nivel: [(0, '', 'Stub', '')]
+    win32print.GetDefaultPrinter = lambda: 'Stub'
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setitem(sys.modules, 'win32print', win32print)
+        mp.setenv('PRINTHOST_COLA_DB', str(tmp_path / 'importacion.db'))
+        mp.delitem(sys.modules, 'printer_host', raising=False)
+        modulo = importlib.import_module('printer_host')
+        impresora = ImpresoraStub()
+        mp.setattr(modulo, 'cola', _cola(colas, ruta_cola, impresora, lote_max=modulo.CONFIG['max_batch']))
+        yield modulo, impresora
+        sys.modules.pop('printer_host', None)
+
+
+def test_print_batch_imprime_cada_trabajo(printer_host):
+    modulo, impresora = printer_host
+    cliente = modulo.app.test_client()
+
+    resp = cliente.post('/print/batch', json={'jobs': [
+        {'type': 'raw', 'payload': {'content': 'uno\n'}, 'idempotency_key': 'lote-1'},
+        {'type': 'raw', 'payload': {'content': 'dos\n'}, 'idempotency_key': 'lote-2'},
+        {'type': 'desconocido', 'payload': {}},
+    ]})
+
+    datos = resp.get_json()
+    assert resp.status_code == 200
+    assert [r['ok'] for r in datos['results']] == [True, True, False]
+    assert [r.get('estado') for r in datos['results'][:2]] == ['ok', 'ok']
+    assert impresora.impresos == [b'uno\n', b'dos\n']
+
+    # Reenviar el mismo lote (timeout en la respuesta) no reimprime
+    cliente.post('/print/batch', json={'jobs': [
+        {'type': 'raw', 'payload': {'content': 'uno\n'}, 'idempotency_key': 'lote-1'},
+    ]})
+    assert impresora.impresos == [b'uno\n', b'dos\n']
@@ -0,0 +1,140 @@
+"""
+Consultas de los tableros (utils/tableros.py): la cantidad de sentencias
+SQL por refresco no debe crecer con la cantidad de pedidos.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from src.models.Cliente_model import Cliente
+from src.models.Comprobante_model import Comprobante
+from src.models.Persona_model import Persona
+from src.models.Venta_model import Venta, ProductoVenta
+from src.models.repartidores_model import Repartidor
+from utils.db import db
+from utils.tableros import (
+    TIPOVENTA_DELIVERY, TIPOVENTA_MOSTRADOR, pedidos_delivery, pedidos_mostrador,
+)
+
+LINEAS_POR_VENTA = 2
+
+
+def _agregar_ventas(desde, cantidad, **valores):
+    """Inserta `cantidad` ventas de hoy (ids desde+1...) con LINEAS_POR_VENTA líneas cada una"""
+    ahora = datetime.now()
+    ventas, lineas = [], []
+    for venta_id in range(desde + 1, desde + cantidad + 1):
+        ventas.append({
+            'id': venta_id,
+            'fecha_hora': ahora,
+            'impuesto': 0,
+            'total': 1000,
+            'estado': 1,
+            'estado_delivery': 1,
+            **{campo: valor(venta_id) if callable(valor) else valor for campo, valor in valores.items()},
+        })
+        for n in range(LINEAS_POR_VENTA):
+            lineas.append({
+                'id': venta_id * LINEAS_POR_VENTA + n,
+                'venta_id': venta_id,
+                'producto_id': 1,
+                'cantidad': 1,
+                'precio_venta': 500,
+                'descuento': 0,
+            })
+    db.session.execute(Venta.__table__.insert(), ventas)
+    db.session.execute(ProductoVenta.__table__.insert(), lineas)
+    db.session.commit()
+
+
+def _sentencias_por_refresco(contar_sentencias, consulta, agregar, cantidades):
+    """Sentencias de `consulta()` después de llevar la tabla a cada cantidad de pedidos"""
+    conteos = []
+    total = 0
+    for cantidad in cantidades:
+        agregar(total, cantidad - total)
+        total = cantidad
+        with contar_sentencias() as sentencias:
+            filas = consulta()
+        assert filas
+        conteos.append(len(sentencias))
+    return conteos
+
+
+@pytest.mark.parametrize('estado', (1, 2, 3))
+def test_tablero_mostrador_sentencias_constantes(app, contar_sentencias, estado):
+    db.session.add(Comprobante(id=1, tipo_comprobante='Boleta'))
+    db.session.commit()
+
+    def agregar(desde, cantidad):
+        _agregar_ventas(
+            desde, cantidad,
+            tipoventa_id=TIPOVENTA_MOSTRADOR,
+            estado_mostrador=lambda venta_id: 1 + venta_id % 2,
+            comprobante_id=lambda venta_id: 1 if venta_id % 3 == 0 else None,
+        )
+
+    conteos = _sentencias_por_refresco(
+        contar_sentencias, lambda: pedidos_mostrador(estado), agregar, (10, 100)
+    )
+    assert conteos == [1, 1]
+
+    for fila in pedidos_mostrador(estado):
+        assert fila.cantidad_items == LINEAS_POR_VENTA
+        assert fila.tipo_comprobante == ('Boleta' if fila.comprobante_id else None)
+
+
+def _persona(persona_id, nombre):
+    return Persona(
+        id=persona_id, razon_social=nombre, direccion=f"Calle {persona_id}",
+        telefono=f"9{persona_id:08d}", tipo_persona='natural',
+        documento_id=persona_id, numero_documento=str(persona_id),
+    )
+
+
+@pytest.mark.parametrize('estado', (1, 2, 3))
+def test_tablero_delivery_sentencias_constantes(app, contar_sentencias, estado):
+    db.session.add_all([
+        Comprobante(id=1, tipo_comprobante='Boleta'),
+        _persona(1, 'Cliente Uno'),
+        _persona(2, 'Repartidor Dos'),
+        Cliente(id=1, persona_id=1),
+        Repartidor(id=1, id_persona=2),
+    ])
+    db.session.commit()
+
+    def agregar(desde, cantidad):
+        _agregar_ventas(
+            desde, cantidad,
+            tipoventa_id=TIPOVENTA_DELIVERY,
+            estado_delivery=estado,
+            cliente_id=1,
+            repartidor_id=lambda venta_id: 1 if venta_id % 2 else None,
+            comprobante_id=lambda venta_id: 1 if venta_id % 3 == 0 else None,
+        )
+
+    conteos = _sentencias_por_refresco(
+        contar_sentencias, lambda: pedidos_delivery(estado), agregar, (10, 100, 1000)
+    )
+    assert conteos == [1, 1, 1]
+
+    filas = pedidos_delivery(estado)
+    assert len(filas) == 1000
+    for fila in filas:
+        assert fila.tiene_cliente
+        assert (fila.nombre, fila.direccion, fila.telefono) == ('Cliente Uno', 'Calle 1', '900000001')
+        assert fila.repartidor == ('Repartidor Dos' if fila.id % 2 else None)
+        assert bool(fila.pagado) == (fila.id % 3 == 0)
+
+
+def test_tablero_delivery_distingue_pedidos_sin_cliente(app):
+    db.session.add_all([_persona(1, 'Cliente Uno'), Cliente(id=1, persona_id=1)])
+    db.session.commit()
+    _agregar_ventas(0, 2, tipoventa_id=TIPOVENTA_DELIVERY,
+                    cliente_id=lambda venta_id: 1 if venta_id == 1 else None)
+
+    filas = {fila.id: fila for fila in pedidos_delivery(1)}
+
+    assert filas[1].tiene_cliente
+    assert not filas[2].tiene_cliente and filas[2].nombre is None
@@ -0,0 +1,44 @@
+"""
+Versiones de tablero (ETag / 304): cada cambio de pedido debe invalidar
+todos los tableros que muestran ese pedido.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from routes.mostrador import mostrador_bp
+from src.models.Comprobante_model import Comprobante
+from src.models.Venta_model import Venta
+from utils.db import db
+from utils.tableros import TIPOVENTA_MOSTRADOR, respuesta_tablero, etag_tablero
+
+
+@pytest.fixture
+def cliente_http(app):
+    app.register_blueprint(mostrador_bp)
+    return app.test_client()
+
+
+def _poll(app, canal, estado, etag):
+    """Status de un poll del tablero con el ETag que tiene el navegador"""
+    with app.test_request_context(headers={'If-None-Match': f'"{etag}"'}):
+        return respuesta_tablero(canal, estado, lambda: 'filas').status_code
+
+
+def test_cambiar_estado_pagado_invalida_tablero_pagados(app, cliente_http):
+    db.session.add(Comprobante(id=1, tipo_comprobante='Boleta'))
+    db.session.add(Venta(
+        id=1, fecha_hora=datetime.now(), impuesto=0, total=1000, estado=1,
+        tipoventa_id=TIPOVENTA_MOSTRADOR, estado_mostrador=1, comprobante_id=1,
+    ))
+    db.session.commit()
+
+    etag = etag_tablero('mostrador', 3)
+    assert _poll(app, 'mostrador', 3, etag) == 304
+
+    resp = cliente_http.post('/mostrador/cambiar_estado/1/2')
+
+    assert resp.status_code == 200
+    assert 'refresh-pagados' in resp.headers['HX-Trigger']
+    assert _poll(app, 'mostrador', 3, etag) == 200
@@ -0,0 +1,305 @@
+"""
+Almacén de carritos en el servidor.
+
+Los carritos (carrito_mostrador, carrito de delivery, carritos temporales de
+edición y listas de eliminación) ya no viajan en la cookie de sesión: la
+cookie solo guarda un identificador (`carrito_sid`) y el contenido vive en un
+store configurable con `CARRITO_STORE`:
+
+- 'memoria': diccionario en proceso con expiración por TTL (un solo worker)
+- 'sql': tabla `carritos_sesion` compartida entre workers
+
+Los valores se guardan serializados como JSON, igual que en la sesión, así
+modificar el objeto obtenido no altera el store hasta llamar a guardar.
+
+`CarritoPedido` envuelve el carrito de un pedido nuevo con su subtotal y
+`respuesta_cambio_carrito` devuelve solo la línea modificada + totales.
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Protocol
+
+from flask import current_app, session, request, make_response
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+logger = logging.getLogger(__name__)
+
+TTL_DEFAULT = 4 * 3600  # segundos sin uso antes de descartar un carrito
+# Fracción de escrituras que además borran los carritos vencidos (store SQL)
+PROBABILIDAD_PURGA = 0.01
+
+
+class CarritoStore(Protocol):
+    """Interfaz mínima de un store de carritos"""
+
+    def obtener(self, clave: str) -> Optional[str]:
+        """Retorna el JSON guardado o None"""
+        ...
+
+    def guardar(self, clave: str, datos: str) -> None:
+        ...
+
+    def eliminar(self, clave: str) -> None:
+        ...
+
+
+class MemoriaCarritoStore(CarritoStore):
+    """Store en memoria del proceso con expiración por inactividad"""
+
+    def __init__(self, ttl=TTL_DEFAULT, intervalo_purga=60):
+        self.ttl = ttl
+        self.intervalo_purga = intervalo_purga
+        self._datos = {}
+        self._lock = threading.Lock()
+        self._ultima_purga = time.monotonic()
+
+    def _purgar(self, ahora):
+        if ahora - self._ultima_purga < self.intervalo_purga:
+            return
+        self._ultima_purga = ahora
+        vencidas = [k for k, (_, expira) in self._datos.items() if expira <= ahora]
+        for clave in vencidas:
+            del self._datos[clave]
+
+    def obtener(self, clave):
+        ahora = time.monotonic()
+        with self._lock:
+            self._purgar(ahora)
+            entrada = self._datos.get(clave)
+            if not entrada:
+                return None
+            datos, expira = entrada
+            if expira <= ahora:
+                del self._datos[clave]
+                return None
+            return datos
+
+    def guardar(self, clave, datos):
+        with self._lock:
+            self._datos[clave] = (datos, time.monotonic() + self.ttl)
+
+    def eliminar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+
+class SQLCarritoStore(CarritoStore):
+    """
+    Store en la tabla `carritos_sesion`.
+    Usa su propia conexión para no mezclar el commit del carrito con la
+    transacción de la ruta (db.session). Una de cada ~1/`probabilidad_purga`
+    escrituras borra además los carritos vencidos.
+    """
+
+    def __init__(self, db, ttl=TTL_DEFAULT, probabilidad_purga=PROBABILIDAD_PURGA):
+        from src.models.CarritoSesion_model import CarritoSesion
+        self.db = db
+        self.ttl = ttl
+        self.probabilidad_purga = probabilidad_purga
+        self.tabla = CarritoSesion.__table__
+
+    def obtener(self, clave):
+        t = self.tabla
+        with self.db.engine.connect() as conn:
+            fila = conn.execute(
+                select(t.c.datos, t.c.expira_en).where(t.c.clave == clave)
+            ).first()
+        if not fila:
+            return None
+        if fila.expira_en and fila.expira_en <= datetime.now():
+            self.eliminar(clave)
+            return None
+        return fila.datos
+
+    def guardar(self, clave, datos):
+        t = self.tabla
+        ahora = datetime.now()
+        valores = {'datos': datos, 'expira_en': ahora + timedelta(seconds=self.ttl), 'updated_at': ahora}
+        # Upsert en una sentencia: dos requests de la misma sesión no chocan
+        sentencia = mysql_insert(t).values(clave=clave, **valores)
+        sentencia = sentencia.on_duplicate_key_update(**valores)
+        with self.db.engine.begin() as conn:
+            conn.execute(sentencia)
+        if random.random() < self.probabilidad_purga:
+            try:
+                self.purgar_vencidos()
+            except Exception as e:
+                logger.warning(f"No se pudieron purgar carritos vencidos: {e}")
+
+    def eliminar(self, clave):
+        t = self.tabla
+        with self.db.engine.begin() as conn:
+            conn.execute(t.delete().where(t.c.clave == clave))
+
+    def purgar_vencidos(self):
+        """Elimina carritos vencidos (lo llama guardar() por muestreo)"""
+        t = self.tabla
+        with self.db.engine.begin() as conn:
+            return conn.execute(t.delete().where(t.c.expira_en <= datetime.now())).rowcount
+
+
+def crear_store(app):
+    """Crea el store según `CARRITO_STORE` ('memoria' | 'sql')"""
+    tipo = (app.config.get('CARRITO_STORE') or 'memoria').lower()
+    ttl = int(app.config.get('CARRITO_TTL', TTL_DEFAULT))
+    if tipo == 'sql':
+        from utils.db import db
+        return SQLCarritoStore(db, ttl=ttl)
+    if tipo != 'memoria':
+        logger.warning(f"CARRITO_STORE desconocido '{tipo}', usando memoria")
+    return MemoriaCarritoStore(ttl=ttl)
+
+
+def get_store(app=None):
+    """Store de la app (se crea una vez por proceso)"""
+    if app is None:
+        app = current_app
+    store = app.extensions.get('carritos')
+    if store is None:
+        store = app.extensions['carritos'] = crear_store(app)
+    return store
+
+
+def _clave(nombre):
+    """Clave del store: identificador del navegador + nombre del carrito"""
+    sid = session.get('carrito_sid')
+    if not sid:
+        sid = session['carrito_sid'] = uuid.uuid4().hex
+    return f"{sid}:{nombre}"
+
+
+def obtener_carrito(nombre, default=None):
+    datos = get_store().obtener(_clave(nombre))
+    if datos is None:
+        return default
+    return json.loads(datos)
+
+
+def guardar_carrito(nombre, valor):
+    get_store().guardar(_clave(nombre), json.dumps(valor))
+
+
+def eliminar_carrito(nombre):
+    get_store().eliminar(_clave(nombre))
+
+
+# ==========================================
+# CARRITO DE NUEVO PEDIDO (cambios por línea)
+# ==========================================
+
+def _redondear(valor):
+    return round(valor, 2)
+
+
+class CarritoPedido:
+    """
+    Carrito de un pedido nuevo (mostrador o delivery) con el subtotal
+    mantenido en cada cambio de línea, sin recorrer todos los items.
+
+    Se guarda como {'items': {item_key: item}, 'subtotal': float}; cada item
+    lleva su propio 'subtotal'. Un carrito en el formato plano anterior
+    (solo items) se recalcula una vez al cargarlo.
+    """
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        datos = obtener_carrito(nombre) or {}
+        if 'items' not in datos:
+            datos = {'items': datos}
+        self.items = datos['items']
+        self.subtotal = datos.get('subtotal')
+        if self.subtotal is None:
+            self.subtotal = 0
+            for item in self.items.values():
+                item['subtotal'] = _redondear(item['precio'] * item['cantidad'])
+                self.subtotal += item['subtotal']
+            self.subtotal = _redondear(self.subtotal)
+        # Claves presentes antes del cambio (para decidir cómo dibujarlo)
+        self.claves_iniciales = set(self.items)
+
+    @property
+    def vacio(self):
+        return not self.items
+
+    def lineas(self):
+        return list(self.items.values())
+
+    def _ajustar(self, item, delta_cantidad):
+        delta = _redondear(item['precio'] * delta_cantidad)
+        item['cantidad'] += delta_cantidad
+        item['subtotal'] = _redondear(item.get('subtotal', 0) + delta)
+        self.subtotal = _redondear(self.subtotal + delta)
+
+    def agregar(self, item_key, item):
+        """Agrega una línea nueva o suma una unidad si ya existe"""
+        if item_key in self.items:
+            self._ajustar(self.items[item_key], 1)
+        else:
+            item['cantidad'] = 0
+            item['subtotal'] = 0
+            self.items[item_key] = item
+            self._ajustar(item, 1)
+        return self.items[item_key]
+
+    def cambiar_cantidad(self, item_key, delta):
+        """Suma `delta` unidades; la línea se elimina si queda en 0"""
+        item = self.items.get(item_key)
+        if item is None:
+            return None
+        if item['cantidad'] + delta <= 0:
+            return self.quitar(item_key)
+        self._ajustar(item, delta)
+        return item
+
+    def quitar(self, item_key):
+        item = self.items.pop(item_key, None)
+        if item is not None:
+            self.subtotal = _redondear(self.subtotal - item.get('subtotal', 0))
+            if not self.items:
+                self.subtotal = 0
+        return None
+
+    def guardar(self):
+        guardar_carrito(self.nombre, {'items': self.items, 'subtotal': self.subtotal})
+
+
+def respuesta_cambio_carrito(carrito, item_key, render_completo, render_linea, render_totales):
+    """
+    Respuesta a un cambio en una línea del carrito.
+
+    Si la petición viene de HTMX y el carrito ya estaba dibujado (y sigue con
+    items), solo se envía la línea afectada y el bloque de totales como swap
+    out-of-band; HX-Retarget/HX-Reswap indican dónde va la línea. En otro caso
+    (carrito que pasa de/a vacío, fetch sin HTMX) se dibuja el carrito completo.
+    """
+    es_htmx = request.headers.get('HX-Request') == 'true'
+    if not es_htmx or not carrito.claves_iniciales or carrito.vacio:
+        return make_response(render_completo())
+
+    item = carrito.items.get(item_key)
+    partes = []
+    if item is not None:
+        partes.append(render_linea(item))
+    partes.append(render_totales())
+    response = make_response(''.join(partes))
+
+    if item is None:
+        if item_key in carrito.claves_iniciales:
+            response.headers['HX-Retarget'] = f'#carrito-item-{item_key}'
+            response.headers['HX-Reswap'] = 'delete'
+        else:
+            response.headers['HX-Reswap'] = 'none'
+    elif item_key in carrito.claves_iniciales:
+        response.headers['HX-Retarget'] = f'#carrito-item-{item_key}'
+        response.headers['HX-Reswap'] = 'outerHTML'
+    else:
+        response.headers['HX-Retarget'] = '#carrito-lineas'
+        response.headers['HX-Reswap'] = 'beforeend'
+    return response
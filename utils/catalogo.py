@@ -0,0 +1,298 @@
+"""
+Catálogo en memoria para las pantallas de venta (mostrador y delivery).
+
+Cada caché se carga completa con una sola consulta y se sirve desde memoria.
+Las rutas que modifican productos o atributos llaman a su `invalidar_*`
+después del commit: la caché del proceso se descarta al instante y se sube
+una versión compartida (tabla `tablero_versiones`, canal 'catalogo') que los
+demás workers comparan cada INTERVALO_VERIFICACION segundos.
+
+Los fragmentos HTML que solo dependen del catálogo (grilla de productos) se
+guardan ya renderizados mientras nada cambie y se sirven con
+`respuesta_fragmento_catalogo`, con ETag por hash de contenido.
+"""
+
+import hashlib
+import threading
+import time
+
+from flask import current_app, request, make_response
+from markupsafe import Markup
+
+from src.models.AtributoProducto_model import AtributoProducto
+from src.models.ValorAtributo_model import ValorAtributo
+from src.models.Producto_model import Producto, ProductoAtributo
+from utils.db import db
+from utils.tableros import version_tablero, incrementar_versiones
+
+CANAL_CATALOGO = 'catalogo'
+VERSION_EXTRAS = 1
+VERSION_PRODUCTOS = 2
+
+# Cada cuánto un worker revisa si otro invalidó la caché
+INTERVALO_VERIFICACION = 30
+
+
+class CacheCatalogo:
+    """
+    Caché en proceso de un dato del catálogo con versión compartida en BD.
+    `canal` permite reutilizarla para otras tablas de configuración.
+    """
+
+    def __init__(self, estado, cargar, intervalo_verificacion=INTERVALO_VERIFICACION, canal=CANAL_CATALOGO):
+        self.canal = canal
+        self.estado = estado
+        self.cargar = cargar
+        self.intervalo_verificacion = intervalo_verificacion
+        self._lock = threading.Lock()
+        self._datos = None
+        self._version = None
+        self._verificado = 0
+        # Sube en cada recarga; identifica los fragmentos renderizados
+        self.generacion = 0
+
+    def obtener(self):
+        ahora = time.monotonic()
+        with self._lock:
+            datos, version = self._datos, self._version
+            vigente = ahora - self._verificado < self.intervalo_verificacion
+        if datos is not None and vigente:
+            return datos
+
+        version_bd = version_tablero(self.canal, self.estado)
+        if datos is not None and (version_bd is None or version_bd == version):
+            # Sin cambios (o versión ilegible): se sigue sirviendo la caché
+            with self._lock:
+                self._verificado = ahora
+            return datos
+
+        datos = self.cargar()
+        with self._lock:
+            self._datos = datos
+            self._version = version_bd
+            self._verificado = ahora
+            self.generacion += 1
+        return datos
+
+    def descartar(self):
+        """Descarta solo la copia de este proceso"""
+        with self._lock:
+            self._datos = None
+
+    def invalidar(self):
+        """Descarta la copia local y avisa al resto de workers (después del commit)"""
+        self.descartar()
+        incrementar_versiones(self.canal, self.estado)
+
+
+# ==========================================
+# EXTRAS POR PRODUCTO
+# ==========================================
+
+def _cargar_extras():
+    """
+    Extras visibles de todos los productos en una sola consulta.
+    Retorna {producto_id: [atributo con sus valores disponibles]}, con el
+    mismo formato que devuelve /get_atributos_producto.
+    """
+    filas = db.session.query(
+        ProductoAtributo.producto_id,
+        AtributoProducto,
+        ValorAtributo
+    ).join(
+        AtributoProducto, AtributoProducto.id == ProductoAtributo.atributo_id
+    ).join(
+        ValorAtributo, ValorAtributo.atributo_id == AtributoProducto.id
+    ).filter(
+        ProductoAtributo.es_visible == True,
+        AtributoProducto.estado == 1,
+        ValorAtributo.disponible == True,
+        ValorAtributo.estado == 1
+    ).order_by(
+        ProductoAtributo.producto_id,
+        ProductoAtributo.orden_producto,
+        AtributoProducto.orden,
+        ValorAtributo.orden
+    ).all()
+
+    por_producto = {}
+    for producto_id, atributo, valor in filas:
+        atributos = por_producto.setdefault(producto_id, {})
+        if atributo.id not in atributos:
+            atributos[atributo.id] = {
+                'id': atributo.id,
+                'nombre': atributo.nombre,
+                'descripcion': atributo.descripcion or '',
+                'tipo': atributo.tipo,
+                'es_multiple': atributo.es_multiple,
+                'es_obligatorio': atributo.es_obligatorio,
+                'valores': []
+            }
+        atributos[atributo.id]['valores'].append({
+            'id': valor.id,
+            'valor': valor.valor,
+            'descripcion': valor.descripcion or '',
+            'precio_adicional': float(valor.precio_adicional or 0)
+        })
+
+    return {
+        producto_id: list(atributos.values())
+        for producto_id, atributos in por_producto.items()
+    }
+
+
+def _cargar_resumen_extras():
+    """
+    Resumen de extras por producto en una consulta agrupada, para marcar la
+    grilla de productos sin consultar /tiene_atributos en cada toque.
+    Retorna {producto_id: {'atributos', 'valores', 'obligatorio'}}; los
+    productos sin extras no aparecen.
+    """
+    filas = db.session.query(
+        ProductoAtributo.producto_id,
+        db.func.count(db.distinct(AtributoProducto.id)).label('atributos'),
+        db.func.count(ValorAtributo.id).label('valores'),
+        db.func.max(
+            db.case((AtributoProducto.es_obligatorio == True, 1), else_=0)
+        ).label('obligatorio')
+    ).join(
+        AtributoProducto, AtributoProducto.id == ProductoAtributo.atributo_id
+    ).join(
+        ValorAtributo, ValorAtributo.atributo_id == AtributoProducto.id
+    ).filter(
+        ProductoAtributo.es_visible == True,
+        AtributoProducto.estado == 1,
+        ValorAtributo.disponible == True,
+        ValorAtributo.estado == 1
+    ).group_by(
+        ProductoAtributo.producto_id
+    ).all()
+
+    return {
+        fila.producto_id: {
+            'atributos': fila.atributos,
+            'valores': fila.valores,
+            'obligatorio': bool(fila.obligatorio),
+        }
+        for fila in filas
+    }
+
+
+cache_extras = CacheCatalogo(VERSION_EXTRAS, _cargar_extras)
+cache_resumen_extras = CacheCatalogo(VERSION_EXTRAS, _cargar_resumen_extras)
+
+
+def extras_producto(producto_id):
+    """Atributos con valores disponibles de un producto (no modificar)"""
+    return cache_extras.obtener().get(producto_id, [])
+
+
+def resumen_extras():
+    """Mapa producto_id -> resumen de extras, para las grillas (no modificar)"""
+    return cache_resumen_extras.obtener()
+
+
+def tiene_extras(producto_id):
+    return producto_id in resumen_extras()
+
+
+def invalidar_extras():
+    cache_resumen_extras.descartar()
+    cache_extras.invalidar()
+
+
+# ==========================================
+# PRODUCTOS ACTIVOS
+# ==========================================
+
+def _cargar_productos():
+    """
+    Productos activos como filas planas (id, codigo, nombre, precio, img_path),
+    seguras de compartir entre requests sin sesión de SQLAlchemy.
+    """
+    return db.session.query(
+        Producto.id,
+        Producto.codigo,
+        Producto.nombre,
+        Producto.precio,
+        Producto.img_path,
+    ).filter(
+        Producto.estado == 1
+    ).order_by(Producto.id).all()
+
+
+cache_productos = CacheCatalogo(VERSION_PRODUCTOS, _cargar_productos)
+
+
+def productos_activos():
+    """Productos activos para las grillas de venta (no modificar)"""
+    return cache_productos.obtener()
+
+
+def invalidar_productos():
+    cache_productos.invalidar()
+
+
+def invalidar_catalogo():
+    """Productos y extras a la vez (escrituras de routes/productos.py)"""
+    cache_productos.descartar()
+    cache_extras.descartar()
+    cache_resumen_extras.descartar()
+    incrementar_versiones(CANAL_CATALOGO, VERSION_PRODUCTOS, VERSION_EXTRAS)
+
+
+# ==========================================
+# FRAGMENTOS RENDERIZADOS
+# ==========================================
+
+_fragmentos = {}
+_lock_fragmentos = threading.Lock()
+
+
+def generacion_catalogo():
+    """Generación actual de productos + extras (cambia al recargar cualquiera)"""
+    productos_activos()
+    resumen_extras()
+    return (cache_productos.generacion, cache_resumen_extras.generacion)
+
+
+def _etag_contenido(html):
+    return hashlib.sha1(html.encode('utf-8')).hexdigest()
+
+
+def _fragmento(clave, render):
+    """
+    (html, etag) de un fragmento que solo depende del catálogo, renderizado
+    una vez por generación. Se desactiva con CATALOGO_CACHE_FRAGMENTOS = False.
+    """
+    if not current_app.config.get('CATALOGO_CACHE_FRAGMENTOS', True):
+        html = Markup(render())
+        return html, _etag_contenido(html)
+
+    generacion = generacion_catalogo()
+    with _lock_fragmentos:
+        entrada = _fragmentos.get(clave)
+    if entrada and entrada[0] == generacion:
+        return entrada[1], entrada[2]
+
+    html = Markup(render())
+    etag = _etag_contenido(html)
+    with _lock_fragmentos:
+        _fragmentos[clave] = (generacion, html, etag)
+    return html, etag
+
+
+def respuesta_fragmento_catalogo(clave, render):
+    """
+    GET condicional de un fragmento del catálogo. El ETag es el hash del
+    contenido, igual en todos los workers, así el navegador reutiliza su
+    copia entre pedidos y solo la vuelve a bajar tras un cambio de catálogo.
+    """
+    html, etag = _fragmento(clave, render)
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(html)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
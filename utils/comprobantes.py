@@ -0,0 +1,93 @@
+"""
+Numeración de ventas y comprobantes.
+
+Cada prefijo tiene su secuencia en la tabla `secuencias_comprobante`:
+- 'V': número provisorio al crear el pedido
+- 'B' / 'F': boleta / factura, asignado al cobrar
+
+Cada worker reserva BLOQUE_NUMEROS números de una vez (SELECT ... FOR UPDATE
++ UPDATE en una transacción corta y con conexión propia) y los entrega desde
+memoria, así una venta no hace un viaje a la BD ni espera el bloqueo de otro
+cajero. Los números nunca se repiten (índice único en ventas.numero_comprobante)
+pero pueden quedar huecos y no son correlativos en el tiempo entre workers.
+"""
+
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from src.models.SecuenciaComprobante_model import SecuenciaComprobante
+from utils.db import db
+
+logger = logging.getLogger(__name__)
+
+PREFIJO_VENTA = 'V'
+PREFIJO_BOLETA = 'B'
+PREFIJO_FACTURA = 'F'
+
+# Números que un worker reserva por viaje a la BD
+BLOQUE_NUMEROS = 20
+
+# prefijo -> [siguiente, limite) reservados por este proceso
+_bloques = {}
+_lock_bloques = threading.Lock()
+
+
+def _reservar_bloque(prefijo, cantidad, reintentar=True):
+    """Reserva `cantidad` números del prefijo; retorna el primero"""
+    t = SecuenciaComprobante.__table__
+    ahora = datetime.now()
+    try:
+        with db.engine.begin() as conn:
+            siguiente = conn.execute(
+                select(t.c.siguiente).where(t.c.prefijo == prefijo).with_for_update()
+            ).scalar()
+            if siguiente is None:
+                siguiente = 1
+                conn.execute(t.insert().values(prefijo=prefijo, siguiente=siguiente + cantidad, updated_at=ahora))
+            else:
+                conn.execute(t.update().where(t.c.prefijo == prefijo).values(
+                    siguiente=siguiente + cantidad, updated_at=ahora
+                ))
+    except IntegrityError:
+        # Otro worker creó la secuencia al mismo tiempo: ahora ya existe
+        if not reintentar:
+            raise
+        return _reservar_bloque(prefijo, cantidad, reintentar=False)
+    return siguiente
+
+
+def siguiente_numero(prefijo):
+    """Número siguiente del prefijo, formateado como 'B-000123'"""
+    with _lock_bloques:
+        bloque = _bloques.get(prefijo)
+        if bloque is None or bloque[0] >= bloque[1]:
+            inicio = _reservar_bloque(prefijo, BLOQUE_NUMEROS)
+            bloque = _bloques[prefijo] = [inicio, inicio + BLOQUE_NUMEROS]
+            logger.debug(f"Bloque de comprobantes {prefijo}: {inicio}-{inicio + BLOQUE_NUMEROS - 1}")
+        numero = bloque[0]
+        bloque[0] += 1
+    return f"{prefijo}-{numero:06d}"
+
+
+def numero_venta():
+    """Número provisorio de un pedido nuevo"""
+    return siguiente_numero(PREFIJO_VENTA)
+
+
+def prefijo_comprobante(tipo_comprobante_id):
+    """'B' para boleta (tipo 1), 'F' para el resto; acepta el valor del form"""
+    return PREFIJO_BOLETA if str(tipo_comprobante_id) == '1' else PREFIJO_FACTURA
+
+
+def nombre_comprobante(tipo_comprobante_id):
+    """Nombre del comprobante para mostrar, con la misma regla que el prefijo"""
+    return 'Boleta' if prefijo_comprobante(tipo_comprobante_id) == PREFIJO_BOLETA else 'Factura'
+
+
+def numero_comprobante(tipo_comprobante_id):
+    """Número definitivo al cobrar una venta"""
+    return siguiente_numero(prefijo_comprobante(tipo_comprobante_id))
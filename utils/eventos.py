@@ -0,0 +1,173 @@
+"""
+Eventos de cambios en pedidos para los tableros (Server-Sent Events).
+
+Las rutas que modifican una Venta llaman a `notificar_cambio(canal, *estados)`
+antes de su commit: la versión de los tableros sube en la misma transacción
+y el aviso se publica recién cuando esa transacción se confirma (se descarta
+si hay rollback). El broker en memoria reparte el aviso a cada pestaña
+suscrita a `/<canal>/eventos`, que vuelve a pedir solo las tablas afectadas.
+
+El broker vive en el proceso: con varios workers cada uno reparte sus propios
+avisos, y el polling de los tableros (30s/60s) cubre lo que no llegue por aquí.
+
+Cada stream ocupa un worker mientras está abierto, por eso SSE es opcional
+(`TABLEROS_SSE`, desactivado por defecto) y cada conexión dura como máximo
+`TABLEROS_SSE_DURACION` segundos. Con workers síncronos y pocos procesos
+(PythonAnywhere) conviene dejarlo apagado.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+
+from flask import Response, current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from utils.db import db
+from utils.tableros import incrementar_versiones
+
+logger = logging.getLogger(__name__)
+
+# Eventos HTMX que escuchan las tablas de cada tablero, por estado
+EVENTOS_POR_ESTADO = {
+    'mostrador': {
+        1: 'refresh-preparacion',
+        2: 'refresh-listos',
+        3: 'refresh-pagados',
+    },
+    'delivery': {
+        1: 'refresh-pendientes',
+        2: 'refresh-enviados',
+        3: 'refresh-entregados',
+    },
+}
+
+# Un stream se cierra pasado este tiempo; EventSource reconecta solo.
+# Corto para no retener un worker síncrono más de lo que dura un poll lento
+DURACION_STREAM = 25
+# Comentario de keep-alive para que proxies no corten la conexión
+INTERVALO_PING = 15
+# Avisos pendientes por pestaña antes de descartar (cliente lento)
+MAX_PENDIENTES = 100
+
+
+class BrokerPedidos:
+    """Broker pub/sub en memoria, seguro entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._suscriptores = {}
+
+    def suscribir(self, canal):
+        cola = queue.Queue(maxsize=MAX_PENDIENTES)
+        with self._lock:
+            self._suscriptores.setdefault(canal, set()).add(cola)
+        return cola
+
+    def desuscribir(self, canal, cola):
+        with self._lock:
+            colas = self._suscriptores.get(canal)
+            if colas:
+                colas.discard(cola)
+                if not colas:
+                    del self._suscriptores[canal]
+
+    def publicar(self, canal, eventos):
+        with self._lock:
+            colas = list(self._suscriptores.get(canal, ()))
+        for cola in colas:
+            try:
+                cola.put_nowait(eventos)
+            except queue.Full:
+                logger.warning(f"Suscriptor de '{canal}' saturado, aviso descartado")
+        return len(colas)
+
+    def suscriptores(self, canal):
+        with self._lock:
+            return len(self._suscriptores.get(canal, ()))
+
+
+broker = BrokerPedidos()
+
+
+def eventos_para(canal, *estados):
+    """Traduce estados de un canal a los eventos HTMX de sus tablas"""
+    mapa = EVENTOS_POR_ESTADO.get(canal, {})
+    eventos = []
+    for estado in estados:
+        evento = mapa.get(estado)
+        if evento and evento not in eventos:
+            eventos.append(evento)
+    return eventos
+
+
+def notificar_cambio(canal, *estados):
+    """
+    Avisa a los tableros de `canal` que cambiaron pedidos en `estados`:
+    sube su versión (ETag de los polls) en la transacción actual y deja el
+    aviso SSE para después del commit. Llamar antes de db.session.commit().
+    Retorna la lista de eventos que se publicarán.
+    """
+    incrementar_versiones(
+        canal, *[e for e in estados if e in EVENTOS_POR_ESTADO.get(canal, {})], commit=False
+    )
+    eventos = eventos_para(canal, *estados)
+    if eventos:
+        db.session.info.setdefault('eventos_pedidos', []).append((canal, eventos))
+    return eventos
+
+
+@event.listens_for(Session, 'after_commit')
+def _publicar_pendientes(sesion):
+    for canal, eventos in sesion.info.pop('eventos_pedidos', ()):
+        broker.publicar(canal, eventos)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar_pendientes(sesion, transaccion_previa):
+    sesion.info.pop('eventos_pedidos', None)
+
+
+def _formatear(eventos):
+    return f"event: pedido-cambiado\ndata: {json.dumps({'eventos': eventos})}\n\n"
+
+
+def generar_stream(canal, duracion=DURACION_STREAM, intervalo_ping=INTERVALO_PING):
+    """Generador SSE: un mensaje por aviso y un ping cada `intervalo_ping`"""
+    cola = broker.suscribir(canal)
+    try:
+        yield "retry: 3000\n\n"
+        fin = time.monotonic() + duracion
+        while True:
+            restante = fin - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                eventos = cola.get(timeout=min(intervalo_ping, restante))
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+            yield _formatear(eventos)
+    finally:
+        broker.desuscribir(canal, cola)
+
+
+def respuesta_stream(canal):
+    """
+    Response `text/event-stream` para el tablero de `canal`. Con SSE
+    desactivado responde 204, que le indica a EventSource no reconectar.
+    """
+    if not current_app.config.get('TABLEROS_SSE', False):
+        return Response(status=204)
+    duracion = min(current_app.config.get('TABLEROS_SSE_DURACION', DURACION_STREAM), DURACION_STREAM)
+    return Response(
+        generar_stream(canal, duracion=duracion),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        }
+    )
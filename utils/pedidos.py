@@ -0,0 +1,178 @@
+"""
+Persistencia de pedidos nuevos (mostrador y delivery).
+
+La venta se inserta con el ORM (un INSERT para obtener su id) y todas sus
+líneas `producto_venta` con un solo executemany de Core dentro de la misma
+transacción: el ORM inserta de a una fila en MySQL para leer cada id
+autoincremental, y con el servidor lejos cada INSERT es un viaje más.
+El commit lo sigue haciendo la ruta.
+
+Las líneas marcadas para eliminar se leen (nombre y cantidad para la
+comanda) y se borran con un SELECT y un DELETE ... IN por pedido
+(`eliminar_lineas`).
+
+El total de una venta abierta se recalcula con un SUM en SQL después de
+agregar, cambiar o quitar líneas (`recalcular_total`), sin cargar las
+líneas al ORM. `verificar_totales` compara ventas.total con la suma de sus
+líneas para revisar pedidos históricos; solo informa, no corrige (una venta
+cobrada ya tiene vuelto y comprobante emitidos con su total).
+"""
+
+import json
+from decimal import Decimal
+
+from src.models.Venta_model import Venta, ProductoVenta
+from src.models.Producto_model import Producto
+from utils.db import db
+
+# Diferencia máxima aceptada entre ventas.total y la suma de sus líneas
+TOLERANCIA_TOTAL = Decimal('0.01')
+
+
+def _producto_id(item):
+    """ID real del producto (el carrito lo guarda como "123" o "123_uuid")"""
+    return int(str(item['id']).split('_')[0])
+
+
+def fila_linea_carrito(venta_id, item):
+    """Valores de la línea `producto_venta` para un item del carrito"""
+    # Extras serializados a JSON, igual que se guardaban línea a línea
+    atributos_json = json.dumps(item['extras']) if item.get('extras') else None
+    return {
+        'venta_id': venta_id,
+        'producto_id': _producto_id(item),
+        'cantidad': item['cantidad'],
+        'precio_venta': item['precio'],
+        'descuento': 0,
+        'atributos_seleccionados': atributos_json,
+    }
+
+
+def insertar_lineas(filas):
+    """
+    Inserta las líneas (dicts con las columnas de producto_venta) en un solo
+    executemany en la transacción de db.session. Retorna cuántas insertó.
+    """
+    if not filas:
+        return 0
+    db.session.execute(ProductoVenta.__table__.insert(), filas)
+    return len(filas)
+
+
+def guardar_venta(venta, items):
+    """
+    Agrega la venta y las líneas de `items` (carrito) a la transacción actual,
+    sin commit. Retorna la venta con su id asignado.
+    """
+    db.session.add(venta)
+    db.session.flush()
+    insertar_lineas([fila_linea_carrito(venta.id, item) for item in items])
+    return venta
+
+
+def eliminar_lineas(venta_id, ids):
+    """
+    Borra de la venta las líneas `ids` (las de otra venta se ignoran), sin
+    commit. Retorna [{'nombre', 'cantidad'}] de las borradas, en el orden de
+    `ids`, para la comanda de eliminados.
+    """
+    orden = {}
+    for linea_id in ids:
+        orden.setdefault(int(linea_id), len(orden))
+    if not orden:
+        return []
+
+    filas = db.session.query(
+        ProductoVenta.id,
+        ProductoVenta.cantidad,
+        Producto.nombre,
+    ).join(
+        Producto, Producto.id == ProductoVenta.producto_id
+    ).filter(
+        ProductoVenta.venta_id == venta_id,
+        ProductoVenta.id.in_(orden)
+    ).all()
+    if not filas:
+        return []
+
+    ProductoVenta.query.filter(
+        ProductoVenta.venta_id == venta_id,
+        ProductoVenta.id.in_([fila.id for fila in filas])
+    ).delete(synchronize_session=False)
+
+    filas.sort(key=lambda fila: orden[fila.id])
+    return [{'nombre': fila.nombre, 'cantidad': fila.cantidad} for fila in filas]
+
+
+# ==========================================
+# TOTALES
+# ==========================================
+
+def _suma_lineas():
+    return db.func.coalesce(db.func.sum(ProductoVenta.precio_venta * ProductoVenta.cantidad), 0)
+
+
+def total_lineas(venta_id):
+    """Suma de precio_venta * cantidad de las líneas de una venta, en SQL"""
+    return db.session.query(_suma_lineas()).filter(
+        ProductoVenta.venta_id == venta_id
+    ).scalar()
+
+
+def recalcular_total(venta):
+    """
+    Asigna a venta.total la suma de sus líneas con una sola consulta.
+    Los cambios pendientes de la sesión (líneas nuevas, borradas o con otra
+    cantidad) se envían antes con el flush.
+    """
+    db.session.flush()
+    venta.total = total_lineas(venta.id)
+    return venta.total
+
+
+def verificar_totales(desde=None, hasta=None, limite=500):
+    """
+    Ventas cuyo total no coincide con la suma de sus líneas, en una consulta
+    agrupada. `desde`/`hasta` (datetime) filtran por fecha_hora [desde, hasta).
+    Retorna [{'id', 'fecha_hora', 'tipoventa_id', 'pagado', 'total', 'suma_lineas'}].
+    """
+    rango = []
+    if desde:
+        rango.append(Venta.fecha_hora >= desde)
+    if hasta:
+        rango.append(Venta.fecha_hora < hasta)
+
+    # Solo se agrupan las líneas de las ventas del rango, no toda producto_venta
+    sumas = db.session.query(
+        ProductoVenta.venta_id.label('venta_id'),
+        _suma_lineas().label('suma')
+    )
+    if rango:
+        sumas = sumas.join(Venta, Venta.id == ProductoVenta.venta_id).filter(*rango)
+    sumas = sumas.group_by(ProductoVenta.venta_id).subquery()
+    suma = db.func.coalesce(sumas.c.suma, 0)
+
+    query = db.session.query(
+        Venta.id,
+        Venta.fecha_hora,
+        Venta.tipoventa_id,
+        Venta.comprobante_id,
+        Venta.total,
+        suma.label('suma_lineas'),
+    ).outerjoin(
+        sumas, sumas.c.venta_id == Venta.id
+    ).filter(
+        db.func.abs(Venta.total - suma) > TOLERANCIA_TOTAL,
+        *rango
+    )
+
+    filas = query.order_by(Venta.id).limit(limite).all()
+
+    return [{
+        'id': fila.id,
+        'fecha_hora': fila.fecha_hora.isoformat() if fila.fecha_hora else None,
+        'tipoventa_id': fila.tipoventa_id,
+        'pagado': fila.comprobante_id is not None,
+        'total': float(fila.total or 0),
+        'suma_lineas': float(fila.suma_lineas or 0),
+    } for fila in filas]
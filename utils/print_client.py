@@ -2,31 +2,302 @@
 Cliente HTTP liviano para PrintHost.
 Objetivo: el servidor Flask solo envía instrucciones; todo el formateo y
 detalle de impresora sucede en el cliente (PrintHost en Windows).
+
+Cada proceso mantiene una `requests.Session` por URL de PrintHost con su
+pool de conexiones keep-alive: los clientes que se crean en cada impresión
+reutilizan la misma conexión TCP en vez de abrir una nueva por trabajo.
+
+La salud de cada PrintHost la lleva un `MonitorPrintHost` del proceso
+(health check con TTL + circuit breaker): con el PrintHost caído los
+trabajos fallan al instante en vez de esperar el timeout. Abrir y cerrar el
+circuito no depende de hilos de fondo (los web workers pueden no tenerlos).
+
+Los cuerpos van en JSON compacto y, si el PrintHost anuncia la capacidad
+'gzip' en /health, comprimidos (Content-Encoding: gzip) desde COMPRIMIR_DESDE.
 """
 
+import gzip
+import json
+import threading
+import time
 import requests
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
+# Timeouts separados: conectar a la red del local debe fallar rápido,
+# pero la impresora puede tardar en aceptar un ticket largo
+CONNECT_TIMEOUT = 3
+READ_TIMEOUT = 10
+# Conexiones keep-alive por PrintHost (hilos de la cola + requests)
+POOL_MAXSIZE = 4
+
+# Salud del PrintHost
+SALUD_TTL = 30          # segundos que vale un resultado antes de re-sondear
+UMBRAL_FALLOS = 2       # fallos seguidos que abren el circuito
+ESPERA_CIRCUITO = 15    # segundos con el circuito abierto antes de sondear de nuevo
+SONDEO_TIMEOUT = 3
+PRUEBA_TIMEOUT = 2      # sondeo en línea (medio abierto o primer uso): conectar y leer
+
+# Cuerpos más chicos que esto no compensan el costo de comprimir
+COMPRIMIR_DESDE = 512
+
+_sesiones: Dict[str, requests.Session] = {}
+_lock_sesiones = threading.Lock()
+
+
+def _crear_sesion(pool_maxsize: int) -> requests.Session:
+    sesion = requests.Session()
+    # Solo se reintenta la conexión (nunca un POST ya enviado: imprimiría dos veces)
+    reintentos = Retry(total=1, connect=1, read=0, status=0, redirect=0)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=reintentos)
+    sesion.mount('http://', adapter)
+    sesion.mount('https://', adapter)
+    return sesion
+
+
+def sesion_printhost(printhost_url: str, pool_maxsize: int = POOL_MAXSIZE) -> requests.Session:
+    """Session compartida del proceso para un PrintHost (se crea una vez por URL)"""
+    url = printhost_url.rstrip('/')
+    with _lock_sesiones:
+        sesion = _sesiones.get(url)
+        if sesion is None:
+            sesion = _sesiones[url] = _crear_sesion(pool_maxsize)
+        return sesion
+
+
+def codificar_json(datos: Any, comprimir: bool = False) -> Tuple[bytes, Dict[str, str]]:
+    """
+    (cuerpo, headers) de un JSON sin espacios; con `comprimir` y desde
+    COMPRIMIR_DESDE bytes va con gzip. Lo usan el cliente y /api/print/pull.
+    """
+    cuerpo = json.dumps(datos, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    headers = {'Content-Type': 'application/json'}
+    if comprimir and len(cuerpo) >= COMPRIMIR_DESDE:
+        cuerpo = gzip.compress(cuerpo, compresslevel=6)
+        headers['Content-Encoding'] = 'gzip'
+    return cuerpo, headers
+
+
+def cerrar_sesiones():
+    """Cierra las conexiones abiertas (tests o cambio de URL en caliente)"""
+    with _lock_sesiones:
+        for sesion in _sesiones.values():
+            sesion.close()
+        _sesiones.clear()
+
+
+class MonitorPrintHost:
+    """
+    Estado de salud de un PrintHost, compartido por el proceso.
+
+    - cerrado: responde; se vuelve a sondear en segundo plano cada `ttl`.
+    - abierto: falló `umbral_fallos` veces seguidas; los trabajos fallan al
+      instante durante `espera` segundos.
+    - medio abierto: pasada la espera, el siguiente llamador hace un sondeo
+      en línea con PRUEBA_TIMEOUT (los demás siguen fallando al instante);
+      si responde el circuito se cierra, si no se vuelve a abrir.
+
+    El primer uso en el proceso también sondea en línea, así las capacidades
+    se conocen aunque el servidor no corra hilos de fondo. Solo el refresco
+    del TTL con el circuito cerrado va en un hilo aparte.
+    Los resultados de los trabajos reales también cuentan.
+    """
+
+    def __init__(self, printhost_url, ttl=SALUD_TTL, umbral_fallos=UMBRAL_FALLOS, espera=ESPERA_CIRCUITO,
+                 reloj=time.monotonic):
+        self.printhost_url = printhost_url
+        self.ttl = ttl
+        self.umbral_fallos = umbral_fallos
+        self.espera = espera
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._fallos = 0
+        self._abierto_desde = None
+        self._verificado = None
+        self._sondeando = False
+        self._probando = False
+        self.ultimo_error = None
+        # Capacidades anunciadas en /health (vacío hasta el primer sondeo)
+        self.capacidades = frozenset()
+
+    def disponible(self) -> bool:
+        ahora = self._reloj()
+        with self._lock:
+            abierto = self._abierto_desde is not None
+            if abierto:
+                probar = ahora - self._abierto_desde >= self.espera
+            else:
+                probar = self._verificado is None
+            # Una sola prueba en línea a la vez
+            probar = probar and not self._probando
+            if probar:
+                self._probando = True
+            refrescar = not abierto and self._verificado is not None and ahora - self._verificado >= self.ttl
+        if probar:
+            try:
+                self.sondear(timeout=PRUEBA_TIMEOUT)
+            finally:
+                with self._lock:
+                    self._probando = False
+                    abierto = self._abierto_desde is not None
+            return not abierto
+        if refrescar:
+            self._sondear_en_fondo()
+        return not abierto
+
+    def registrar_exito(self):
+        with self._lock:
+            if self._abierto_desde is not None:
+                logger.info(f"✅ PrintHost recuperado: {self.printhost_url}")
+            self._fallos = 0
+            self._abierto_desde = None
+            self._verificado = self._reloj()
+            self.ultimo_error = None
+
+    def registrar_fallo(self, error=None):
+        ahora = self._reloj()
+        with self._lock:
+            self._fallos += 1
+            self._verificado = ahora
+            self.ultimo_error = str(error) if error else None
+            if self._fallos >= self.umbral_fallos:
+                if self._abierto_desde is None:
+                    logger.warning(f"⚠️ PrintHost {self.printhost_url} no responde, circuito abierto: {error}")
+                # La espera corre desde el último fallo
+                self._abierto_desde = ahora
+
+    def sondear(self, timeout=None) -> bool:
+        """Health check sincrónico; actualiza el estado"""
+        try:
+            resp = sesion_printhost(self.printhost_url).get(
+                f"{self.printhost_url}/health",
+                timeout=(timeout, timeout) if timeout else (CONNECT_TIMEOUT, SONDEO_TIMEOUT)
+            )
+            if resp.status_code == 200:
+                try:
+                    self.capacidades = frozenset(resp.json().get('capacidades') or ())
+                except ValueError:
+                    self.capacidades = frozenset()
+                self.registrar_exito()
+                return True
+            self.registrar_fallo(f"Status {resp.status_code}")
+        except Exception as e:
+            self.registrar_fallo(e)
+        return False
+
+    def _sondear_en_fondo(self):
+        with self._lock:
+            if self._sondeando:
+                return
+            self._sondeando = True
+
+        def _tarea():
+            try:
+                self.sondear()
+            finally:
+                with self._lock:
+                    self._sondeando = False
+
+        threading.Thread(target=_tarea, name='printhost-salud', daemon=True).start()
+
+    def estado(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'url': self.printhost_url,
+                'estado': 'abierto' if self._abierto_desde is not None else 'cerrado',
+                'fallos': self._fallos,
+                'ultimo_error': self.ultimo_error,
+                'capacidades': sorted(self.capacidades),
+            }
+
+
+_monitores: Dict[str, MonitorPrintHost] = {}
+
+
+def monitor_printhost(printhost_url: str) -> MonitorPrintHost:
+    """Monitor de salud del proceso para un PrintHost (uno por URL)"""
+    url = printhost_url.rstrip('/')
+    with _lock_sesiones:
+        monitor = _monitores.get(url)
+        if monitor is None:
+            monitor = _monitores[url] = MonitorPrintHost(url)
+        return monitor
+
+
+def estado_printhosts() -> list:
+    with _lock_sesiones:
+        monitores = list(_monitores.values())
+    return [m.estado() for m in monitores]
+
+
+def armar_job(job_type: str,
+              payload: Dict[str, Any],
+              driver: Optional[str] = None,
+              feed: Optional[int] = None,
+              cut: Optional[bool] = None,
+              clave: Optional[str] = None,
+              ancho: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Cuerpo de un trabajo para /print/job o un elemento de /print/batch.
+    `clave` (idempotency_key) debe ser la misma en cada reintento del mismo
+    documento: el PrintHost no lo vuelve a imprimir.
+    `ancho` son los caracteres por línea de la impresora (42 si no viene).
+    """
+    body = {
+        'type': job_type,
+        'payload': payload,
+    }
+    if driver:
+        body['driver'] = driver
+    if feed is not None:
+        body['feed'] = feed
+    if cut is not None:
+        body['cut'] = cut
+    if clave:
+        body['idempotency_key'] = clave
+    if ancho:
+        body['ancho'] = ancho
+    return body
+
 
 class PrintHostClient:
     def __init__(self,
                  printhost_url: str = "http://localhost:8765",
-                 timeout: int = 10):
+                 timeout: float = READ_TIMEOUT,
+                 connect_timeout: float = CONNECT_TIMEOUT,
+                 comprimir: bool = True):
         self.printhost_url = printhost_url.rstrip('/')
-        self.timeout = timeout
+        # Solo se comprime si además el PrintHost anuncia 'gzip'
+        self.comprimir = comprimir
+        # (conexión, lectura) como espera requests
+        self.timeout = (connect_timeout, timeout)
+        self.session = sesion_printhost(self.printhost_url)
+        self.monitor = monitor_printhost(self.printhost_url)
+
+    def disponible(self) -> bool:
+        """Estado cacheado del PrintHost (sondea en línea solo al primer uso o medio abierto)"""
+        return self.monitor.disponible()
 
     # ===== Utils =====
     def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         url = f"{self.printhost_url}{path}"
+        if not self.monitor.disponible():
+            # Circuito abierto: fallar rápido hasta la próxima prueba medio abierta
+            return {'ok': False, 'error': f'PrintHost no disponible en {self.printhost_url}'}
+        cuerpo, headers = codificar_json(payload, self.comprimir and 'gzip' in self.monitor.capacidades)
         try:
-            resp = requests.post(url, json=payload, timeout=self.timeout)
-            if resp.status_code == 200:
+            resp = self.session.post(url, data=cuerpo, headers=headers, timeout=self.timeout)
+            self.monitor.registrar_exito()
+            # 202: el PrintHost lo guardó en su cola y lo imprime en cuanto pueda
+            if resp.status_code in (200, 202):
                 return resp.json()
             return {'ok': False, 'error': f"Status {resp.status_code}"}
-        except requests.exceptions.ConnectionError:
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            self.monitor.registrar_fallo(e)
             logger.error(f"❌ No se puede conectar a PrintHost: {self.printhost_url}")
             return {'ok': False, 'error': f'PrintHost no disponible en {self.printhost_url}'}
         except Exception as e:
@@ -35,16 +306,15 @@ class PrintHostClient:
 
     # ===== Health & discovery =====
     def health_check(self) -> bool:
-        try:
-            resp = requests.get(f"{self.printhost_url}/health", timeout=self.timeout)
-            return resp.status_code == 200
-        except Exception as e:
-            logger.warning(f"PrintHost no disponible: {e}")
-            return False
+        """Sondeo sincrónico (diagnóstico); las impresiones usan disponible()"""
+        ok = self.monitor.sondear()
+        if not ok:
+            logger.warning(f"PrintHost no disponible: {self.monitor.ultimo_error}")
+        return ok
 
     def list_printers(self) -> list:
         try:
-            resp = requests.get(f"{self.printhost_url}/printers", timeout=self.timeout)
+            resp = self.session.get(f"{self.printhost_url}/printers", timeout=self.timeout)
             if resp.status_code == 200:
                 return resp.json().get('printers', [])
             return []
@@ -58,20 +328,25 @@ class PrintHostClient:
                   payload: Dict[str, Any],
                   driver: Optional[str] = None,
                   feed: Optional[int] = None,
-                  cut: Optional[bool] = None) -> Dict[str, Any]:
+                  cut: Optional[bool] = None,
+                  clave: Optional[str] = None,
+                  ancho: Optional[int] = None) -> Dict[str, Any]:
         """Envía un trabajo de impresión genérico al PrintHost."""
-        body = {
-            'type': job_type,
-            'payload': payload,
-        }
-        if driver:
-            body['driver'] = driver
-        if feed is not None:
-            body['feed'] = feed
-        if cut is not None:
-            body['cut'] = cut
-
-        return self._post('/print/job', body)
+        return self._post('/print/job', armar_job(job_type, payload, driver, feed, cut, clave, ancho))
+
+    def print_batch(self, jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Envía varios trabajos (armados con `armar_job`) en una sola request.
+        El PrintHost imprime seguidos los de una misma impresora en un solo
+        trabajo de spool. Retorna {'ok', 'results': [uno por trabajo]}.
+        """
+        if not jobs:
+            return {'ok': True, 'results': []}
+        resultado = self._post('/print/batch', {'jobs': jobs})
+        if 'results' not in resultado:
+            # Falló la request completa: mismo error para cada trabajo
+            resultado['results'] = [{'ok': False, 'error': resultado.get('error')} for _ in jobs]
+        return resultado
 
     # ===== Backwards-compatible helpers =====
     def print_raw(self, driver: str, content: str, feed: int = 3, cut: bool = True) -> Dict[str, Any]:
@@ -98,4 +373,9 @@ def get_printhost_client(app=None) -> PrintHostClient:
         app = current_app
 
     printhost_url = app.config.get('PRINTHOST_URL', 'http://localhost:8765')
-    return PrintHostClient(printhost_url)
+    return PrintHostClient(
+        printhost_url,
+        timeout=app.config.get('PRINTHOST_READ_TIMEOUT', READ_TIMEOUT),
+        connect_timeout=app.config.get('PRINTHOST_CONNECT_TIMEOUT', CONNECT_TIMEOUT),
+        comprimir=app.config.get('PRINTHOST_COMPRIMIR', True),
+    )
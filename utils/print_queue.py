@@ -0,0 +1,463 @@
+"""
+Cola de impresión en segundo plano.
+
+Las rutas de pedidos registran un `PrintJob` después del commit con
+`encolar_impresion(...)` y responden de inmediato; un pool de hilos toma el
+trabajo, vuelve a cargar el pedido en su propio app context e imprime
+(PrintHost o win32print). Si la impresora falla se reintenta con espera
+creciente hasta `max_intentos`.
+
+La tabla `print_jobs` es el diario de la cola: un barrido periódico retoma
+los trabajos pendientes (por ejemplo tras reiniciar el worker) y cada
+trabajo se reclama con un UPDATE condicional, así dos hilos o workers no
+imprimen la misma comanda dos veces.
+
+Con PRINTHOST_MODO = 'pull' el servidor no llama al PrintHost: los trabajos
+quedan pendientes en la tabla y el PrintHost del local los pide por
+/api/print/pull y confirma con /api/print/ack (sin IP pública ni NAT).
+
+Con PRINT_QUEUE_EXTERNA la request solo registra el trabajo y un proceso
+aparte lo imprime: `flask cola-impresion` como tarea siempre activa
+(PythonAnywhere "Always-on task"), sin hilos en los web workers.
+
+Los hilos no se crean al importar la app: con uWSGI en prefork el master
+importa la app y los workers, al hacer fork, no heredan sus hilos. Cada
+proceso arranca su pool y su barrido en el primer `get_cola()`. Sin hilos
+los reintentos los hace `flask cola-impresion` (en modo síncrono basta
+`--una-vez` como tarea programada) y en modo pull el /api/print/pull.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from src.models.PrintJob_model import PrintJob
+from utils.db import db
+
+logger = logging.getLogger(__name__)
+
+TIPOS_JOB = ('comanda', 'agregados', 'eliminados', 'recibo_mostrador', 'comprobante_delivery')
+
+MAX_INTENTOS = 3
+# Segundos de espera antes de cada reintento
+ESPERA_REINTENTO = (5, 30, 120)
+# Cada cuánto se revisan trabajos pendientes o atascados
+INTERVALO_BARRIDO = 60
+# Un trabajo 'imprimiendo' por más tiempo se da por perdido y se reintenta
+TIMEOUT_IMPRIMIENDO = 300
+# Una comanda más vieja que esto ya no sirve en cocina: se marca como error
+VIGENCIA_JOB = 30 * 60
+# Pausa de `flask cola-impresion` cuando no hay trabajos
+INTERVALO_COLA_EXTERNA = 2
+
+
+class ColaImpresion:
+    """Pool de hilos que procesa los PrintJob de la app"""
+
+    def __init__(self, app, workers=2, asincrona=True, pull=False, externa=False):
+        self.app = app
+        self.workers = workers
+        self.asincrona = asincrona
+        self.pull = pull
+        self.externa = externa
+        self._executor = None
+        self._barrido = None
+        self._pid = None
+        self._ultimo_barrido = None
+        self._lock = threading.Lock()
+
+    @property
+    def con_hilos(self):
+        return self.asincrona and not (self.pull or self.externa)
+
+    def iniciar(self):
+        """
+        Arranca el pool y el barrido periódico en el proceso actual (modo
+        asíncrono). Se llama en cada get_cola(): un worker recién forkeado
+        tiene otro pid y crea sus propios hilos.
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            if self.con_hilos:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='print-queue')
+                self._barrido = threading.Thread(target=self._bucle_barrido, name='print-queue-barrido', daemon=True)
+                self._barrido.start()
+            self._ultimo_barrido = None
+            self._pid = pid
+
+    def enviar(self, job_id):
+        if self.pull or self.externa:
+            # Lo retira el PrintHost (/api/print/pull) o `flask cola-impresion`
+            return
+        if self.asincrona:
+            self._executor.submit(self._ejecutar, job_id)
+        else:
+            # Modo síncrono (PRINT_QUEUE_ASYNC = False): imprime solo este
+            # trabajo en la request; los reintentos quedan para el barrido
+            procesar_job(job_id)
+
+    def barrer_si_toca(self):
+        """
+        Barrido del modo pull, desde /api/print/pull: libera atascados y vence
+        los viejos (el PrintHost retira los pendientes). Como mucho uno cada
+        INTERVALO_BARRIDO por proceso.
+        """
+        if not self.pull:
+            return
+        ahora = time.monotonic()
+        if self._ultimo_barrido is not None and ahora - self._ultimo_barrido < INTERVALO_BARRIDO:
+            return
+        self._ultimo_barrido = ahora
+        try:
+            jobs_para_retomar()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Barrido de cola de impresión falló: {e}")
+
+    def _programar_reintento(self, job_id, espera):
+        if not self.con_hilos:
+            return
+        timer = threading.Timer(espera, self.enviar, args=(job_id,))
+        timer.daemon = True
+        timer.start()
+
+    def _ejecutar(self, job_id):
+        with self.app.app_context():
+            try:
+                espera = procesar_job(job_id)
+                if espera:
+                    self._programar_reintento(job_id, espera)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error procesando trabajo de impresión {job_id}: {e}")
+
+    def _bucle_barrido(self):
+        while True:
+            time.sleep(INTERVALO_BARRIDO)
+            with self.app.app_context():
+                try:
+                    for job_id in jobs_para_retomar():
+                        self.enviar(job_id)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning(f"Barrido de cola de impresión falló: {e}")
+
+
+def init_cola_impresion(app):
+    """
+    Registra la cola de la app según PRINT_QUEUE_WORKERS / PRINT_QUEUE_ASYNC /
+    PRINT_QUEUE_EXTERNA / PRINTHOST_MODO, sin arrancar hilos (los arranca
+    get_cola en cada worker).
+    El modo pull entrega datos de clientes: sin PRINTHOST_TOKEN no arranca.
+    """
+    pull = (app.config.get('PRINTHOST_MODO') or 'push').lower() == 'pull'
+    if pull and not app.config.get('PRINTHOST_TOKEN'):
+        raise RuntimeError("PRINTHOST_MODO = 'pull' requiere PRINTHOST_TOKEN")
+
+    cola = ColaImpresion(
+        app,
+        workers=int(app.config.get('PRINT_QUEUE_WORKERS', 2)),
+        asincrona=bool(app.config.get('PRINT_QUEUE_ASYNC', True)),
+        pull=pull,
+        externa=bool(app.config.get('PRINT_QUEUE_EXTERNA', False)),
+    )
+    app.extensions['print_queue'] = cola
+    return cola
+
+
+def get_cola(app=None):
+    """Cola de la app, con sus hilos arrancados en el proceso actual"""
+    if app is None:
+        app = current_app._get_current_object()
+    cola = app.extensions.get('print_queue')
+    if cola is None:
+        cola = init_cola_impresion(app)
+    cola.iniciar()
+    return cola
+
+
+def procesar_pendientes():
+    """Un barrido sin hilos: imprime los pendientes vencidos. Retorna cuántos tomó"""
+    pendientes = jobs_para_retomar()
+    for job_id in pendientes:
+        try:
+            procesar_job(job_id)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error procesando trabajo de impresión {job_id}: {e}")
+    return len(pendientes)
+
+
+def registrar_comandos(app):
+    """Comandos de consola de la cola de impresión (fuera del camino de las requests)"""
+    import click
+
+    @app.cli.command('cola-impresion')
+    @click.option('--una-vez', is_flag=True, help='Un solo barrido (tarea programada)')
+    def cola_impresion_comando(una_vez):
+        """Imprime los trabajos pendientes; sin --una-vez queda corriendo (tarea siempre activa)"""
+        if (app.config.get('PRINTHOST_MODO') or 'push').lower() == 'pull':
+            raise click.ClickException("En modo pull los trabajos los retira el PrintHost")
+        while True:
+            try:
+                procesados = procesar_pendientes()
+            except Exception as e:
+                db.session.rollback()
+                logger.warning(f"Barrido de cola de impresión falló: {e}")
+                procesados = 0
+            finally:
+                db.session.remove()
+            if una_vez:
+                click.echo(f"{procesados} trabajo(s) procesado(s)")
+                return
+            if not procesados:
+                time.sleep(INTERVALO_COLA_EXTERNA)
+
+
+def _enviar(job_id):
+    """Entrega el trabajo a la cola; un fallo no afecta al pedido ya guardado"""
+    try:
+        get_cola().enviar(job_id)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"No se pudo despachar el trabajo de impresión {job_id}: {e}")
+
+
+# ==========================================
+# API PARA LAS RUTAS
+# ==========================================
+
+def encolar_impresion(tipo, pedido_id, perfil=None, tipo_impresora=None, datos=None,
+                      max_intentos=MAX_INTENTOS):
+    """
+    Registra un trabajo de impresión y lo entrega a la cola.
+    Llamar después del commit del pedido. Retorna el id del trabajo o None
+    si no se pudo registrar (la venta ya quedó guardada igual).
+
+    - perfil/tipo_impresora: impresora por perfil (get_printer_by_profile);
+      sin perfil se usa la impresora de config (get_printer).
+    - datos: items ya resueltos que no se pueden recargar de la BD
+      (carrito de la comanda, productos agregados o eliminados).
+    """
+    if tipo not in TIPOS_JOB:
+        raise ValueError(f"Tipo de trabajo de impresión no soportado: {tipo}")
+
+    try:
+        job = PrintJob(
+            tipo=tipo,
+            pedido_id=pedido_id,
+            perfil=perfil,
+            tipo_impresora=tipo_impresora,
+            datos=json.dumps(datos, default=str) if datos is not None else None,
+            estado='pendiente',
+            max_intentos=max_intentos,
+        )
+        db.session.add(job)
+        db.session.flush()
+        job_id = job.id
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"No se pudo encolar impresión {tipo} del pedido {pedido_id}: {e}")
+        return None
+
+    _enviar(job_id)
+    return job_id
+
+
+def reintentar_job(job_id):
+    """Vuelve a poner en cola un trabajo en error (o pendiente). Retorna el job o None"""
+    job = db.session.get(PrintJob, job_id)
+    if not job or job.estado not in ('error', 'pendiente'):
+        return None
+    job.estado = 'pendiente'
+    job.intentos = 0
+    job.error = None
+    job.proximo_intento = None
+    db.session.commit()
+    _enviar(job_id)
+    return job
+
+
+# ==========================================
+# PROCESAMIENTO
+# ==========================================
+
+def _reclamar(job_id):
+    """Pasa el job de 'pendiente' a 'imprimiendo'; False si otro ya lo tomó"""
+    reclamados = PrintJob.query.filter(
+        PrintJob.id == job_id,
+        PrintJob.estado == 'pendiente'
+    ).update({
+        PrintJob.estado: 'imprimiendo',
+        PrintJob.intentos: PrintJob.intentos + 1,
+        PrintJob.updated_at: datetime.now(),
+    }, synchronize_session=False)
+    db.session.commit()
+    return reclamados == 1
+
+
+def _impresora(job):
+    from utils.printer import get_printer, get_printer_by_profile
+    if job.perfil:
+        return get_printer_by_profile(perfil=job.perfil, tipo=job.tipo_impresora)
+    return get_printer(current_app)
+
+
+def _impresora_job(job):
+    printer = _impresora(job)
+    # Mismo trabajo = misma clave: si un reintento llega dos veces al PrintHost no reimprime
+    printer.clave_idempotencia = f"printjob-{job.id}"
+    return printer
+
+
+def imprimir_job(job):
+    """Imprime un trabajo ya reclamado. Retorna True si la impresora lo aceptó"""
+    return _despachar(job, _impresora_job(job))
+
+
+def documentos_job(job):
+    """Trabajos PrintHost (cuerpos de /print/job) de un PrintJob, sin enviarlos (modo pull)"""
+    printer = _impresora_job(job)
+    with printer.capturar() as documentos:
+        _despachar(job, printer)
+    return documentos
+
+
+def _despachar(job, printer):
+    from src.models.Venta_model import Venta, ProductoVenta
+    from src.models.Cliente_model import Cliente
+
+    pedido = db.session.get(Venta, job.pedido_id) if job.pedido_id else None
+    if pedido is None:
+        raise ValueError(f"Pedido {job.pedido_id} no encontrado")
+    datos = json.loads(job.datos) if job.datos else {}
+
+    if job.tipo == 'comanda':
+        return printer.imprimir_comanda_cocina(pedido, datos.get('items', []), datos.get('tipo_pedido', 'MOSTRADOR'))
+    if job.tipo == 'agregados':
+        return printer.imprimir_comanda_agregados(pedido, datos.get('productos', []))
+    if job.tipo == 'eliminados':
+        return printer.imprimir_comanda_eliminados(pedido, datos.get('productos', []))
+    if job.tipo == 'recibo_mostrador':
+        items = ProductoVenta.query.filter_by(venta_id=pedido.id).all()
+        return printer.imprimir_pedido_mostrador(pedido, items)
+    if job.tipo == 'comprobante_delivery':
+        cliente = db.session.get(Cliente, pedido.cliente_id) if pedido.cliente_id else None
+        productos = ProductoVenta.query.filter_by(venta_id=pedido.id).all()
+        return printer.imprimir_comprobante_delivery(pedido, cliente, productos)
+    raise ValueError(f"Tipo de trabajo de impresión no soportado: {job.tipo}")
+
+
+def procesar_job(job_id):
+    """
+    Reclama e imprime un trabajo y registra el resultado.
+    Retorna los segundos hasta el próximo reintento, o None si terminó.
+    """
+    if not _reclamar(job_id):
+        return None
+
+    job = db.session.get(PrintJob, job_id)
+    try:
+        ok = bool(imprimir_job(job))
+        error = None if ok else 'La impresora no confirmó el trabajo'
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(PrintJob, job_id)
+        ok = False
+        error = str(e)
+    return registrar_resultado(job, ok, error)
+
+
+def registrar_resultado(job, ok, error=None):
+    """
+    Guarda el resultado de un intento: 'ok', 'pendiente' con próximo
+    reintento o 'error' si se agotaron. Retorna la espera del reintento o None.
+    """
+    error = error or 'Error de impresión'
+    espera = None
+    if ok:
+        job.estado = 'ok'
+        job.error = None
+        job.proximo_intento = None
+    elif job.intentos < job.max_intentos:
+        espera = ESPERA_REINTENTO[min(job.intentos, len(ESPERA_REINTENTO)) - 1]
+        job.estado = 'pendiente'
+        job.error = error[:255]
+        job.proximo_intento = datetime.now() + timedelta(seconds=espera)
+        logger.warning(f"Impresión {job.tipo} pedido {job.pedido_id} falló (intento {job.intentos}): {error}")
+    else:
+        job.estado = 'error'
+        job.error = error[:255]
+        job.proximo_intento = None
+        logger.error(f"Impresión {job.tipo} pedido {job.pedido_id} descartada tras {job.intentos} intentos: {error}")
+    db.session.commit()
+    return espera
+
+
+# ==========================================
+# MODO PULL (el PrintHost retira los trabajos)
+# ==========================================
+
+def reclamar_pendientes(limite):
+    """Reclama hasta `limite` trabajos pendientes vencidos, en orden. Retorna los PrintJob"""
+    ids = [job_id for (job_id,) in db.session.query(PrintJob.id).filter(
+        PrintJob.estado == 'pendiente',
+        db.or_(PrintJob.proximo_intento.is_(None), PrintJob.proximo_intento <= datetime.now())
+    ).order_by(PrintJob.id).limit(limite).all()]
+    db.session.commit()
+
+    reclamados = [job_id for job_id in ids if _reclamar(job_id)]
+    if not reclamados:
+        return []
+    return PrintJob.query.filter(PrintJob.id.in_(reclamados)).order_by(PrintJob.id).all()
+
+
+def confirmar_job(job_id, ok, error=None):
+    """
+    Resultado informado por el PrintHost para un trabajo que retiró.
+    Retorna False si el trabajo no existe o ya no estaba 'imprimiendo'.
+    """
+    job = db.session.get(PrintJob, job_id)
+    if not job or job.estado != 'imprimiendo':
+        return False
+    registrar_resultado(job, bool(ok), error)
+    return True
+
+
+def jobs_para_retomar():
+    """
+    Ids de trabajos pendientes cuyo reintento ya venció. De paso libera los
+    atascados en 'imprimiendo' y vence los demasiado viejos.
+    """
+    ahora = datetime.now()
+
+    PrintJob.query.filter(
+        PrintJob.estado == 'imprimiendo',
+        PrintJob.updated_at < ahora - timedelta(seconds=TIMEOUT_IMPRIMIENDO)
+    ).update({PrintJob.estado: 'pendiente'}, synchronize_session=False)
+
+    PrintJob.query.filter(
+        PrintJob.estado == 'pendiente',
+        PrintJob.created_at < ahora - timedelta(seconds=VIGENCIA_JOB)
+    ).update({
+        PrintJob.estado: 'error',
+        PrintJob.error: 'Vencido sin imprimir',
+    }, synchronize_session=False)
+    db.session.commit()
+
+    filas = db.session.query(PrintJob.id).filter(
+        PrintJob.estado == 'pendiente',
+        db.or_(PrintJob.proximo_intento.is_(None), PrintJob.proximo_intento <= ahora)
+    ).order_by(PrintJob.id).all()
+    return [job_id for (job_id,) in filas]
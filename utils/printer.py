@@ -1,75 +1,66 @@
 import platform
 import logging
+import threading
 from datetime import datetime
 import sys
+from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
-# DEBUG: Escribir información de diagnóstico a un archivo
-debug_file = "/tmp/printer_debug.log" if platform.system() != 'Windows' else "C:\\Temp\\printer_debug.log"
-try:
-    with open(debug_file, "a") as f:
-        f.write(f"\n[{datetime.now()}] Cargando utils/printer.py\n")
-        f.write(f"  Sistema: {platform.system()}\n")
-        f.write(f"  Python: {sys.version}\n")
-        f.write(f"  Path: {sys.path[:3]}\n")
-except:
-    pass
-
-# Imports condicionales para Windows (win32print solo disponible en Windows)
-HAS_WIN32 = platform.system().lower() == 'windows'
-if HAS_WIN32:
-    try:
-        import win32print
-        import win32api
-    except ImportError:
-        HAS_WIN32 = False
-        logger.warning("win32print no disponible - impresión térmica deshabilitada")
-else:
-    logger.info("Sistema no-Windows detectado - usando PrintHost para impresión")
-
-# PrintHost client (para Linux/PythonAnywhere)
-PRINTHOST_ENABLED = not HAS_WIN32
-
-if PRINTHOST_ENABLED:
-    try:
-        # DEBUG: Log de intento de import
-        try:
-            with open(debug_file, "a") as f:
-                f.write(f"[{datetime.now()}] Intentando importar PrintHostClient...\n")
-        except:
-            pass
-        
-        from utils.print_client import PrintHostClient
-        logger.info("PrintHostClient disponible para impresión remota")
-        
-        try:
-            with open(debug_file, "a") as f:
-                f.write(f"[{datetime.now()}] PrintHostClient importado exitosamente\n")
-        except:
-            pass
-            
-    except ImportError as e:
-        PRINTHOST_ENABLED = False
-        logger.error(f"ImportError cargando PrintHostClient: {e}")
-        try:
-            with open(debug_file, "a") as f:
-                f.write(f"[{datetime.now()}] ImportError: {e}\n")
-                import traceback
-                f.write(traceback.format_exc())
-        except:
-            pass
-            
-    except Exception as e:
-        PRINTHOST_ENABLED = False
-        logger.error(f"Error inesperado cargando PrintHostClient: {type(e).__name__}: {e}")
-        try:
-            with open(debug_file, "a") as f:
-                f.write(f"[{datetime.now()}] Exception ({type(e).__name__}): {e}\n")
-                import traceback
-                f.write(traceback.format_exc())
-        except:
-            pass
+# Backend de impresión, resuelto en la primera impresora que se crea (no al
+# importar: todas las rutas importan este módulo y el arranque del worker
+# no debe pagar los imports de win32print / requests)
+_backend = None
+_lock_backend = threading.Lock()
+win32print = None
+PrintHostClient = None
+
+
+def backend_impresion():
+    """
+    Detecta una vez por proceso cómo se imprime:
+    - 'win32': win32print local (Windows)
+    - 'printhost': PrintHostClient por HTTP (Linux / PythonAnywhere)
+    - None: ninguno disponible (ver 'error')
+    """
+    global _backend, win32print, PrintHostClient
+    with _lock_backend:
+        if _backend is not None:
+            return _backend
+
+        backend = {
+            'backend': None,
+            'sistema': platform.system(),
+            'python': sys.version.split()[0],
+            'error': None,
+            'detectado': datetime.now().isoformat(timespec='seconds'),
+        }
+        if platform.system().lower() == 'windows':
+            try:
+                import win32print as _win32print
+                win32print = _win32print
+                backend['backend'] = 'win32'
+            except ImportError as e:
+                backend['error'] = f"win32print no disponible: {e}"
+                logger.warning("win32print no disponible - impresión térmica deshabilitada")
+        else:
+            try:
+                from utils.print_client import PrintHostClient as _PrintHostClient
+                PrintHostClient = _PrintHostClient
+                backend['backend'] = 'printhost'
+                logger.info("Sistema no-Windows: impresión remota con PrintHostClient")
+            except Exception as e:
+                backend['error'] = f"{type(e).__name__}: {e}"
+                logger.exception("Error cargando PrintHostClient")
+
+        _backend = backend
+        return _backend
+
+
+def diagnostico_impresion():
+    """Estado del backend de impresión del proceso (para /api/print/diagnostico)"""
+    return dict(backend_impresion())
+
 
 # Comandos ESC/POS para impresoras térmicas
 ESC = b'\x1b'  # Escape
@@ -80,18 +71,22 @@ CUT_PAPER = GS + b'V\x01'  # Corte parcial
 # Comando de corte de papel (total)  
 CUT_PAPER_FULL = GS + b'V\x00'  # Corte total
 
+# Caracteres por línea de una impresora de 80mm
+ANCHO_DEFAULT = 42
+
 # Avance de líneas
 FEED_LINES = lambda n: ESC + b'd' + bytes([n])  # Avanza n líneas
 
 
 class ThermalPrinter:
-    def __init__(self, printer_name=None, printhost_url=None):
+    def __init__(self, printer_name=None, printhost_url=None, ancho_caracteres=None):
         """
         Inicializa la impresora térmica
         
         Args:
             printer_name: Nombre de la impresora (ej: "EPSON TM-T88V Receipt5")
             printhost_url: URL del PrintHost (solo Linux, ej: "http://192.168.1.50:8765")
+            ancho_caracteres: Caracteres por línea (Printer.ancho_caracteres, 42 en 80mm)
         
         Modo de operación:
             - Windows: usa win32print directo
@@ -99,12 +94,18 @@ class ThermalPrinter:
         """
         self.printer_name = printer_name
         self.printhost_url = printhost_url
+        self.ancho_caracteres = ancho_caracteres or ANCHO_DEFAULT
         self.printer = None
         self.printhost_client = None
+        self._lote = None
+        self.resultado_lote = None
+        # Base de la clave de idempotencia para el PrintHost (la fija la cola de impresión)
+        self.clave_idempotencia = None
+        self.backend = backend_impresion()['backend']
         
-        logger.debug(f"ThermalPrinter.__init__: printer_name={printer_name}, printhost_url={printhost_url}, HAS_WIN32={HAS_WIN32}, PRINTHOST_ENABLED={PRINTHOST_ENABLED}")
+        logger.debug(f"ThermalPrinter.__init__: printer_name={printer_name}, printhost_url={printhost_url}, backend={self.backend}")
         
-        if HAS_WIN32:
+        if self.backend == 'win32':
             # ===== MODO WINDOWS: win32print local =====
             try:
                 if not printer_name:
@@ -117,19 +118,17 @@ class ThermalPrinter:
                 logger.error(f"❌ Error al inicializar impresora Windows: {str(e)}")
                 self.printer = None
         
-        elif PRINTHOST_ENABLED and printhost_url:
+        elif self.backend == 'printhost' and printhost_url:
             # ===== MODO LINUX: PrintHost remoto =====
+            # Sin health check aquí: el monitor del proceso sondea en segundo
+            # plano y el envío falla al instante si el PrintHost está caído
             try:
                 self.printhost_client = PrintHostClient(printhost_url)
-                if self.printhost_client.health_check():
-                    logger.info(f"✅ PrintHost conectado: {printhost_url}")
-                else:
-                    logger.warning(f"⚠️ PrintHost no responde a health check: {printhost_url}")
             except Exception as e:
                 logger.error(f"❌ Error al conectar PrintHost en {printhost_url}: {e}")
                 self.printhost_client = None
         else:
-            logger.warning(f"⚠️ No hay método de impresión disponible (HAS_WIN32={HAS_WIN32}, PRINTHOST_ENABLED={PRINTHOST_ENABLED}, printhost_url={printhost_url})")
+            logger.warning(f"⚠️ No hay método de impresión disponible (backend={self.backend}, printhost_url={printhost_url})")
 
     # ===== Funciones de formato =====
     def _format_precio(self, valor):
@@ -304,7 +303,18 @@ class ThermalPrinter:
             'items': items_serializados,
         }
 
+    def _usa_printhost(self):
+        """Formato PrintHost: cliente HTTP configurado o trabajos capturados"""
+        return self._lote is not None or (self.backend == 'printhost' and self.printhost_client is not None)
+
     def _enviar_printhost(self, job_type, payload, feed=None, cut=None):
+        clave = f"{self.clave_idempotencia}:{job_type}" if self.clave_idempotencia else None
+        if self._lote is not None:
+            # Dentro de capturar()/lote(): solo se junta el trabajo
+            from utils.print_client import armar_job
+            self._lote.append(armar_job(job_type, payload, self.printer_name, feed, cut, clave,
+                                        self.ancho_caracteres))
+            return True
         if not self.printhost_client:
             logger.error("PrintHost no disponible")
             return False
@@ -314,12 +324,46 @@ class ThermalPrinter:
             driver=self.printer_name,
             feed=feed,
             cut=cut,
+            clave=clave,
+            ancho=self.ancho_caracteres,
         )
         if resultado.get('ok'):
             return True
         logger.error(f"❌ PrintHost error: {resultado.get('error')}")
         return False
     
+    @contextmanager
+    def capturar(self):
+        """
+        Junta en una lista los trabajos PrintHost (armar_job) que generan los
+        imprimir_* del bloque, sin enviarlos (lotes y modo pull).
+        """
+        jobs = []
+        anterior, self._lote = self._lote, jobs
+        try:
+            yield jobs
+        finally:
+            self._lote = anterior
+
+    @contextmanager
+    def lote(self):
+        """
+        Agrupa los imprimir_* del bloque en un solo /print/batch al PrintHost:
+            with printer.lote():
+                printer.imprimir_pedido_mostrador(pedido, items)
+                printer.imprimir_comanda_cocina(pedido, items_comanda)
+        Dentro del bloque cada imprimir_* solo encola; el resultado real queda
+        en `resultado_lote`. En Windows local cada documento se imprime al momento.
+        """
+        if not self.printhost_client or self._lote is not None:
+            yield self
+            return
+        with self.capturar() as jobs:
+            yield self
+        self.resultado_lote = self.printhost_client.print_batch(jobs)
+        if not self.resultado_lote.get('ok'):
+            logger.error(f"❌ PrintHost error en lote: {self.resultado_lote.get('error') or self.resultado_lote.get('results')}")
+
     def imprimir_pedido(self, pedido, cliente, items, total_con_envio):
         """
         Imprime el detalle completo del pedido en formato de recibo
@@ -329,10 +373,10 @@ class ThermalPrinter:
         contenido = self._generar_recibo(pedido, cliente, items)
         
         # Seleccionar método de impresión
-        if PRINTHOST_ENABLED and self.printhost_client:
+        if self._usa_printhost():
             payload = self._payload_pedido(pedido, cliente, items, total_con_envio)
             return self._enviar_printhost('pedido', payload, feed=5, cut=True)
-        if HAS_WIN32 and self.printer:
+        if self.backend == 'win32' and self.printer:
             return self._imprimir_local_windows(contenido, "Recibo Pedido")
         logger.error("No hay impresora configurada (ni local ni PrintHost)")
         return False
@@ -375,7 +419,7 @@ class ThermalPrinter:
         """Genera el contenido del recibo en formato texto"""
         
         lineas = []
-        ancho = 42  # Ancho estándar para 80mm
+        ancho = self.ancho_caracteres
         
         # Encabezado
         lineas.append(self._centrar("MUNDO WAFFLES", ancho))
@@ -473,10 +517,10 @@ class ThermalPrinter:
         """
         contenido = self._generar_comanda_cocina(pedido, items, tipo_pedido)
         
-        if PRINTHOST_ENABLED and self.printhost_client:
+        if self._usa_printhost():
             payload = self._payload_comanda(pedido, items, tipo_pedido)
             return self._enviar_printhost('comanda', payload, feed=3, cut=False)
-        if HAS_WIN32 and self.printer:
+        if self.backend == 'win32' and self.printer:
             return self._imprimir_local_windows(contenido, "Comanda Cocina")
         logger.error("No hay impresora configurada")
         return False
@@ -492,7 +536,7 @@ class ThermalPrinter:
         """
         
         lineas = []
-        ancho = 42
+        ancho = self.ancho_caracteres
         
         # ===== ENCABEZADO COMPACTO =====
         # Tipo de venta (MOSTRADOR/DELIVERY) - centrado
@@ -551,7 +595,7 @@ class ThermalPrinter:
         """Imprime comanda con productos AGREGADOS a un pedido existente"""
         try:
             lineas = []
-            ancho = 42
+            ancho = self.ancho_caracteres
             
             lineas.append("")
             lineas.append(self._centrar("=== AGREGADOS ===", ancho))
@@ -571,10 +615,10 @@ class ThermalPrinter:
             
             contenido = "\n".join(lineas)
             
-            if PRINTHOST_ENABLED and self.printhost_client:
+            if self._usa_printhost():
                 payload = self._payload_agregados(pedido, productos)
                 return self._enviar_printhost('agregados', payload, feed=2, cut=False)
-            if HAS_WIN32 and self.printer:
+            if self.backend == 'win32' and self.printer:
                 return self._imprimir_local_windows(contenido, "Comanda Agregados")
             logger.error("No hay impresora configurada")
             return False
@@ -587,7 +631,7 @@ class ThermalPrinter:
         """Imprime comanda con productos ELIMINADOS de un pedido"""
         try:
             lineas = []
-            ancho = 42
+            ancho = self.ancho_caracteres
             
             lineas.append("")
             lineas.append(self._centrar("=== ELIMINADOS ===", ancho))
@@ -602,10 +646,10 @@ class ThermalPrinter:
             
             contenido = "\n".join(lineas)
             
-            if PRINTHOST_ENABLED and self.printhost_client:
+            if self._usa_printhost():
                 payload = self._payload_eliminados(pedido, productos)
                 return self._enviar_printhost('eliminados', payload, feed=2, cut=False)
-            if HAS_WIN32 and self.printer:
+            if self.backend == 'win32' and self.printer:
                 return self._imprimir_local_windows(contenido, "Comanda Eliminados")
             logger.error("No hay impresora configurada")
             return False
@@ -622,10 +666,10 @@ class ThermalPrinter:
         """
         contenido = self._generar_comprobante_delivery(pedido, cliente, productos)
         
-        if PRINTHOST_ENABLED and self.printhost_client:
+        if self._usa_printhost():
             payload = self._payload_delivery(pedido, cliente, productos)
             return self._enviar_printhost('delivery', payload, feed=4, cut=True)
-        if HAS_WIN32 and self.printer:
+        if self.backend == 'win32' and self.printer:
             return self._imprimir_local_windows(contenido, "Comprobante Delivery")
         logger.error("No hay impresora configurada")
         return False
@@ -633,7 +677,7 @@ class ThermalPrinter:
     def _generar_comprobante_delivery(self, pedido, cliente, productos):
         """Genera el contenido del comprobante de delivery"""
         lineas = []
-        ancho = 42
+        ancho = self.ancho_caracteres
         
         # Título
         lineas.append("")
@@ -718,10 +762,10 @@ class ThermalPrinter:
         """
         contenido = self._generar_recibo_mostrador(pedido, items)
         
-        if PRINTHOST_ENABLED and self.printhost_client:
+        if self._usa_printhost():
             payload = self._payload_mostrador(pedido, items)
             return self._enviar_printhost('pedido', payload, feed=5, cut=True)
-        if HAS_WIN32 and self.printer:
+        if self.backend == 'win32' and self.printer:
             return self._imprimir_local_windows(contenido, "Recibo Mostrador")
         logger.error("No hay impresora configurada")
         return False
@@ -730,7 +774,7 @@ class ThermalPrinter:
         """Genera el contenido del recibo de mostrador"""
         
         lineas = []
-        ancho = 42
+        ancho = self.ancho_caracteres
         
         # Encabezado
         lineas.append(self._centrar("MUNDO WAFFLES", ancho))
@@ -840,25 +884,15 @@ def get_printer_by_profile(perfil: str, tipo: str = None, app=None):
         app = current_app
     
     printhost_url = app.config.get('PRINTHOST_URL', None)
-    logger.info(f"🔍 get_printer_by_profile: perfil={perfil}, tipo={tipo}, PRINTHOST_URL_config={printhost_url}")
-    
-    try:
-        from utils.printer_manager import obtener_por_perfil
-        pr = obtener_por_perfil(perfil, tipo)
-        logger.info(f"Resultado obtener_por_perfil: {pr}")
-        
-        if pr and pr.driver_name:
-            logger.info(f"Impresora BD: nombre={pr.nombre}, driver={pr.driver_name}, printhost_url='{pr.printhost_url}'")
-            # Usar printhost_url de BD si existe y no está vacío
-            url_final = pr.printhost_url if pr.printhost_url and pr.printhost_url.strip() else printhost_url
-            logger.info(f"✅ URL final seleccionada: {url_final}")
-            return ThermalPrinter(pr.driver_name, url_final)
-        else:
-            logger.warning(f"❌ No se encontró impresora con perfil={perfil}, tipo={tipo}")
-    except Exception as e:
-        logger.error(f"❌ Error al buscar impresora por perfil: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-    
-    logger.info("⚠️ Usando impresora por defecto desde config")
+
+    # Lookup en el índice en memoria de printer_manager (sin BD ni logs por impresión)
+    from utils.printer_manager import obtener_por_perfil
+    pr = obtener_por_perfil(perfil, tipo)
+    if pr and pr.driver_name:
+        # Usar printhost_url de BD si existe y no está vacío
+        url_final = pr.printhost_url if pr.printhost_url and pr.printhost_url.strip() else printhost_url
+        logger.debug(f"Impresora {pr.nombre} para perfil={perfil}, tipo={tipo}: {url_final}")
+        return ThermalPrinter(pr.driver_name, url_final, pr.ancho_caracteres)
+
+    logger.warning(f"⚠️ Sin impresora para perfil={perfil}, tipo={tipo}; usando la de config")
     return get_printer(app)
\ No newline at end of file
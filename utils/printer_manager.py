@@ -1,8 +1,14 @@
+import json
+import logging
 import platform
+from collections import namedtuple
 from typing import Optional, List, Dict
 
 from src.models.Printer_model import Printer
 from utils.db import db
+from utils.catalogo import CacheCatalogo
+
+logger = logging.getLogger(__name__)
 
 # Import condicional de win32print (solo Windows)
 HAS_WIN32 = platform.system().lower() == 'windows'
@@ -23,75 +29,84 @@ def listar_impresoras_windows() -> List[str]:
         return []
 
 
-def obtener_por_perfil(perfil: str, tipo: Optional[str] = None) -> Optional[Printer]:
-    import json
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    logger.info(f"🔍 Buscando impresora: perfil={perfil}, tipo={tipo}")
-    
+# ==========================================
+# RUTEO (perfil, tipo) -> impresora
+# ==========================================
+
+# Datos de la impresora que usan get_printer_by_profile y /api/print, como
+# fila inmutable que se puede compartir entre requests e hilos
+RutaImpresora = namedtuple('RutaImpresora', [
+    'id', 'nombre', 'driver_name', 'printhost_url',
+    'ancho_caracteres', 'cortar_papel', 'feed_lines',
+])
+
+CANAL_IMPRESORAS = 'impresoras'
+
+
+def _lista_json(valor, printer, campo):
     try:
-        printers = Printer.query.filter_by(estado=1).all()
-        logger.info(f"📋 Total impresoras en BD: {len(printers)}")
-        
-        for p in printers:
-            logger.info(f"  📌 Revisando: {p.nombre} (id={p.id})")
-            try:
-                # Log valores crudos antes de parsear
-                logger.info(f"     perfil RAW: {repr(p.perfil)}")
-                logger.info(f"     tipo RAW: {repr(p.tipo)}")
-                
-                perfiles = json.loads(p.perfil) if isinstance(p.perfil, str) else p.perfil
-                tipos = json.loads(p.tipo) if isinstance(p.tipo, str) else p.tipo
-                
-                logger.info(f"     Perfiles parseados: {perfiles}")
-                logger.info(f"     Tipos parseados: {tipos}")
-                logger.info(f"     ¿'{perfil}' in {perfiles}? {perfil in perfiles}")
-                logger.info(f"     ¿'{tipo}' in {tipos}? {tipo in tipos if tipo else 'N/A'}")
-                
-                if perfil in perfiles:
-                    if tipo is None or tipo in tipos:
-                        logger.info(f"✅ Impresora encontrada: {p.nombre}")
-                        logger.info(f"   driver_name={p.driver_name}, printhost_url={p.printhost_url}")
-                        return p
-                    else:
-                        logger.info(f"   ⚠️ Perfil coincide pero tipo '{tipo}' no está en {tipos}")
-                else:
-                    logger.info(f"   ⚠️ Perfil '{perfil}' no está en {perfiles}")
-                    
-            except json.JSONDecodeError as e:
-                logger.warning(f"  ⚠️ Error parsing JSON para {p.nombre}: {e}")
-                continue
-            except Exception as e:
-                logger.warning(f"  ⚠️ Error procesando {p.nombre}: {e}")
-                import traceback
-                logger.warning(traceback.format_exc())
-                continue
-        
-        logger.warning(f"❌ No se encontró impresora con perfil={perfil}, tipo={tipo}")
-        return None
+        lista = json.loads(valor) if isinstance(valor, str) else valor
+    except json.JSONDecodeError as e:
+        logger.warning(f"⚠️ {campo} inválido en impresora {printer.nombre} (id={printer.id}): {e}")
+        return []
+    return lista or []
+
+
+def _cargar_rutas() -> Dict[tuple, RutaImpresora]:
+    """
+    Índice {(perfil, tipo): impresora} de las impresoras activas, más
+    {(perfil, None): impresora} para búsquedas sin tipo. Si varias coinciden
+    gana la de menor id, igual que el recorrido anterior.
+    """
+    rutas = {}
+    printers = Printer.query.filter_by(estado=1).order_by(Printer.id).all()
+    for p in printers:
+        ruta = RutaImpresora(
+            p.id, p.nombre, p.driver_name, p.printhost_url,
+            p.ancho_caracteres, p.cortar_papel, p.feed_lines,
+        )
+        tipos = _lista_json(p.tipo, p, 'tipo')
+        for perfil in _lista_json(p.perfil, p, 'perfil'):
+            rutas.setdefault((perfil, None), ruta)
+            for tipo in tipos:
+                rutas.setdefault((perfil, tipo), ruta)
+    logger.info(f"Índice de impresoras cargado: {len(printers)} activas, {len(rutas)} rutas")
+    return rutas
+
+
+cache_rutas = CacheCatalogo(1, _cargar_rutas, canal=CANAL_IMPRESORAS)
+
+
+def obtener_por_perfil(perfil: str, tipo: Optional[str] = None) -> Optional[RutaImpresora]:
+    """Impresora activa para un perfil (y tipo); lookup en memoria"""
+    try:
+        return cache_rutas.obtener().get((perfil, tipo))
     except Exception as e:
-        logger.error(f"❌ Error en obtener_por_perfil: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
+        db.session.rollback()
+        logger.error(f"❌ Error cargando índice de impresoras: {e}")
         return None
 
 
+def invalidar_rutas():
+    """Llamar después de cada commit sobre la tabla printers"""
+    cache_rutas.invalidar()
+
+
 def guardar_driver(printer_id: int, driver_name: str) -> bool:
     pr = Printer.query.get(printer_id)
     if not pr:
         return False
     pr.driver_name = driver_name
     db.session.commit()
+    invalidar_rutas()
     return True
 
 
-def mapear_perfiles() -> Dict[str, Dict[str, Optional[Printer]]]:
+def mapear_perfiles() -> Dict[str, Dict[str, Optional[RutaImpresora]]]:
     perfiles = ['general', 'delivery', 'mostrador', 'cocina']
     tipos = ['ticket', 'comanda', 'factura', 'cocina']
-    result: Dict[str, Dict[str, Optional[Printer]]] = {}
-    for perfil in perfiles:
-        result[perfil] = {}
-        for tipo in tipos:
-            result[perfil][tipo] = obtener_por_perfil(perfil, tipo)
-    return result
+    rutas = cache_rutas.obtener()
+    return {
+        perfil: {tipo: rutas.get((perfil, tipo)) for tipo in tipos}
+        for perfil in perfiles
+    }
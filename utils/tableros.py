@@ -0,0 +1,321 @@
+"""
+Consultas de los tableros de pedidos (mostrador y delivery).
+
+Los tableros se refrescan cada pocos segundos desde varias pestañas, por lo
+que cada consulta debe resolver filas, conteos y etiquetas en un número fijo
+de sentencias SQL, sin importar cuántos pedidos haya abiertos.
+
+Las consultas filtran por rangos [inicio, fin) de fecha_hora para usar los
+índices compuestos de `ventas` (`flask plan-tableros` revisa el plan).
+
+Además cada tablero (canal + estado) tiene un contador de versión que suben
+las rutas de escritura dentro de su propia transacción; los polls lo usan
+como ETag y reciben 304 sin tocar la tabla ventas ni renderizar Jinja cuando
+nada cambió. El tiempo transcurrido de cada pedido lo actualiza el navegador.
+"""
+
+import logging
+import re
+from datetime import date, datetime, timedelta
+
+from flask import request, make_response
+from sqlalchemy.orm import aliased
+
+from src.models.Venta_model import Venta, ProductoVenta
+from src.models.Comprobante_model import Comprobante
+from src.models.Cliente_model import Cliente
+from src.models.Persona_model import Persona
+from src.models.repartidores_model import Repartidor
+from src.models.TableroVersion_model import TableroVersion
+from utils.db import db
+
+logger = logging.getLogger(__name__)
+
+
+TIPOVENTA_MOSTRADOR = 1
+TIPOVENTA_DELIVERY = 2
+
+def _rango_hoy():
+    """
+    [inicio, fin) del día actual. Filtrar fecha_hora por rango (y no con
+    DATE(fecha_hora) = hoy) permite usar los índices que terminan en fecha_hora.
+    """
+    inicio = datetime.combine(date.today(), datetime.min.time())
+    return inicio, inicio + timedelta(days=1)
+
+
+def _cantidad_items():
+    """Cantidad de líneas (ProductoVenta) de cada venta, por el índice de venta_id"""
+    return db.session.query(
+        db.func.count(ProductoVenta.id)
+    ).filter(
+        ProductoVenta.venta_id == Venta.id
+    ).correlate(Venta).scalar_subquery()
+
+
+def _query_mostrador(estado):
+    items = _cantidad_items()
+
+    query = db.session.query(
+        Venta.id,
+        Venta.fecha_hora,
+        Venta.comentarios,
+        Venta.total,
+        Venta.comprobante_id,
+        Venta.estado_mostrador,
+        items.label('cantidad_items'),
+        Comprobante.tipo_comprobante,
+    ).outerjoin(
+        Comprobante, Comprobante.id == Venta.comprobante_id
+    ).filter(
+        Venta.tipoventa_id == TIPOVENTA_MOSTRADOR
+    )
+
+    inicio, fin = _rango_hoy()
+    if estado == 3:
+        # ix_ventas_tipo_fecha
+        query = query.filter(
+            Venta.comprobante_id.isnot(None),
+            Venta.fecha_hora >= inicio,
+            Venta.fecha_hora < fin
+        )
+    elif estado == 2:
+        # ix_ventas_mostrador
+        query = query.filter(
+            Venta.estado_mostrador == estado,
+            Venta.fecha_hora >= inicio,
+            Venta.fecha_hora < fin
+        )
+    else:
+        query = query.filter(Venta.estado_mostrador == estado)
+
+    return query.order_by(Venta.fecha_hora.desc())
+
+
+def pedidos_mostrador(estado):
+    """
+    Filas del tablero de mostrador para un estado.
+
+    Retorna una lista de filas planas con los campos que usa
+    `ventas/mostrador/_partials/pedidos.html`:
+    id, fecha_hora, comentarios, total, comprobante_id, estado_mostrador,
+    cantidad_items (líneas) y tipo_comprobante.
+
+    Estados:
+    - 1: En preparación
+    - 2: Listos (solo del día)
+    - 3: Pagados (solo del día, independiente de estado_mostrador)
+    """
+    return _query_mostrador(estado).all()
+
+
+def _query_delivery(estado):
+    persona_repartidor = aliased(Persona)
+
+    query = db.session.query(
+        Venta.id,
+        Venta.fecha_hora,
+        Persona.direccion,
+        Persona.telefono,
+        Persona.razon_social.label('nombre'),
+        # Cliente con persona, aunque algún dato (p. ej. razon_social) venga NULL
+        Persona.id.isnot(None).label('tiene_cliente'),
+        persona_repartidor.razon_social.label('repartidor'),
+        Venta.comprobante_id.isnot(None).label('pagado'),
+        Venta.total,
+        Venta.estado_delivery,
+    ).outerjoin(
+        Cliente, Cliente.id == Venta.cliente_id
+    ).outerjoin(
+        Persona, Persona.id == Cliente.persona_id
+    ).outerjoin(
+        Repartidor, Repartidor.id == Venta.repartidor_id
+    ).outerjoin(
+        persona_repartidor, persona_repartidor.id == Repartidor.id_persona
+    ).filter(
+        # ix_ventas_delivery
+        Venta.estado_delivery == estado,
+        Venta.tipoventa_id == TIPOVENTA_DELIVERY
+    )
+
+    if estado == 3:
+        inicio, fin = _rango_hoy()
+        query = query.filter(Venta.fecha_hora >= inicio, Venta.fecha_hora < fin)
+
+    return query.order_by(Venta.fecha_hora.desc())
+
+
+def pedidos_delivery(estado):
+    """
+    Filas del tablero de delivery para un estado, en una sola consulta.
+
+    Cliente, persona y repartidor se resuelven con outer joins, así
+    `ventas/delivery/_partials/pedidos.html` no dispara cargas perezosas.
+    Cada fila expone: id, fecha_hora, direccion, telefono, nombre,
+    tiene_cliente, repartidor, pagado, total y estado_delivery.
+
+    Estados:
+    - 1: En preparación
+    - 2: Enviados
+    - 3: Entregados (solo del día)
+    """
+    return _query_delivery(estado).all()
+
+
+_PLAN_SQLITE = re.compile(r'^(SCAN|SEARCH) (\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX (\w+))?')
+
+
+def _filas_sqlite(filas):
+    """
+    EXPLAIN QUERY PLAN de SQLite con los campos de EXPLAIN de MySQL que usa
+    plan_tableros: table, key, type ('ALL' = recorre la tabla sin índice) y rows.
+    """
+    normalizadas = []
+    for fila in filas:
+        coincide = _PLAN_SQLITE.match(fila['detail'])
+        if not coincide:
+            continue
+        operacion, tabla, indice = coincide.groups()
+        normalizadas.append({
+            'table': tabla,
+            'key': indice,
+            'type': 'ALL' if operacion == 'SCAN' and not indice else 'ref',
+            'rows': None,
+        })
+    return normalizadas
+
+
+def _explain(query):
+    """Filas de EXPLAIN (MySQL, o EXPLAIN QUERY PLAN en SQLite) de una consulta, como dicts"""
+    compilado = query.statement.compile(dialect=db.engine.dialect)
+    if compilado.positional:
+        # mysqlclient ('format') y sqlite ('qmark'): en el orden de positiontup
+        parametros = tuple(compilado.params[nombre] for nombre in compilado.positiontup)
+    else:
+        # pymysql ('pyformat'): %(nombre)s
+        parametros = dict(compilado.params)
+    sqlite = db.engine.dialect.name == 'sqlite'
+    explain = 'EXPLAIN QUERY PLAN' if sqlite else 'EXPLAIN'
+    resultado = db.session.connection().exec_driver_sql(f"{explain} {compilado}", parametros)
+    filas = [dict(fila._mapping) for fila in resultado]
+    return _filas_sqlite(filas) if sqlite else filas
+
+
+def plan_tableros():
+    """
+    EXPLAIN de las consultas de ambos tableros en cada estado. Marca
+    'escaneo_completo' si alguna lee la tabla ventas entera (type ALL),
+    es decir, si faltan los índices de la migración o se dejaron de usar.
+    Con muy pocas ventas MySQL puede preferir el escaneo aunque el índice exista.
+    """
+    consultas = [('mostrador', e, _query_mostrador) for e in (1, 2, 3)]
+    consultas += [('delivery', e, _query_delivery) for e in (1, 2, 3)]
+
+    planes = []
+    for canal, estado, armar in consultas:
+        filas = _explain(armar(estado))
+        ventas = [f for f in filas if f.get('table') == Venta.__tablename__]
+        planes.append({
+            'canal': canal,
+            'estado': estado,
+            'indices': [f.get('key') for f in ventas],
+            'filas': [f.get('rows') for f in ventas],
+            'escaneo_completo': any(f.get('type') == 'ALL' for f in ventas),
+        })
+    return planes
+
+
+def registrar_comandos(app):
+    """Comandos de consola de los tableros (fuera del camino de las requests)"""
+    import click
+
+    @app.cli.command('plan-tableros')
+    def plan_tableros_comando():
+        """EXPLAIN de las consultas de los tableros; sale con 1 si alguna recorre ventas completa"""
+        planes = plan_tableros()
+        for plan in planes:
+            marca = 'ESCANEO COMPLETO' if plan['escaneo_completo'] else 'ok'
+            click.echo(f"{plan['canal']:<10} estado {plan['estado']}  índices {plan['indices']}  "
+                       f"filas {plan['filas']}  {marca}")
+        if any(plan['escaneo_completo'] for plan in planes):
+            raise SystemExit(1)
+
+
+# ==========================================
+# VERSIONES DE TABLERO (ETag / 304)
+# ==========================================
+
+def version_tablero(canal, estado):
+    """Versión actual del tablero; None si no se pudo leer"""
+    try:
+        return db.session.query(TableroVersion.version).filter_by(
+            canal=canal, estado=estado
+        ).scalar() or 0
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"No se pudo leer versión de tablero {canal}:{estado}: {e}")
+        return None
+
+
+def _subir_versiones(canal, estados):
+    actualizadas = TableroVersion.query.filter(
+        TableroVersion.canal == canal,
+        TableroVersion.estado.in_(estados)
+    ).update(
+        {TableroVersion.version: TableroVersion.version + 1},
+        synchronize_session=False
+    )
+    if actualizadas < len(estados):
+        existentes = {e for (e,) in db.session.query(TableroVersion.estado).filter(
+            TableroVersion.canal == canal,
+            TableroVersion.estado.in_(estados)
+        )}
+        for estado in estados:
+            if estado not in existentes:
+                db.session.add(TableroVersion(canal=canal, estado=estado, version=1))
+
+
+def incrementar_versiones(canal, *estados, commit=True):
+    """
+    Sube la versión de los tableros afectados.
+    - commit=True: en una transacción propia, después del commit de la ruta
+      (cachés de catálogo); un fallo aquí no afecta lo ya guardado.
+    - commit=False: dentro de la transacción de la ruta, antes de su commit
+      (cambios de pedidos); se guarda o se descarta junto con el pedido.
+    """
+    estados = sorted({e for e in estados if e})
+    if not estados:
+        return
+    if not commit:
+        _subir_versiones(canal, estados)
+        return
+    try:
+        _subir_versiones(canal, estados)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"No se pudo incrementar versión de tablero {canal}:{estados}: {e}")
+
+
+def etag_tablero(canal, estado):
+    """ETag del fragmento: versión + día (filtros 'solo hoy')"""
+    version = version_tablero(canal, estado)
+    if version is None:
+        return None
+    return f"{canal}-{estado}-{version}-{date.today().isoformat()}"
+
+
+def respuesta_tablero(canal, estado, render):
+    """
+    GET condicional para un fragmento de tablero.
+    `render` solo se invoca si el ETag del cliente no coincide.
+    """
+    etag = etag_tablero(canal, estado)
+    if etag and request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(render())
+    if etag:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response